@@ -0,0 +1,323 @@
+"""Response compression for the large JSON/GeoJSON endpoints.
+
+A pure ASGI middleware (installed in app/main.py when EDOP_COMPRESSION is on)
+that compresses responses of the opted-in path prefixes
+(EDOP_COMPRESSION_PATHS), using the first encoding in EDOP_COMPRESSION_ENCODINGS
+that the client accepts and this process can produce: gzip always, br with
+the brotli package, zstd with the zstandard package.
+
+- Complete bodies below EDOP_COMPRESSION_MIN_BYTES, non-200 responses, already
+  encoded responses (the prebuilt eco_static .gz/.br files) and non-text media
+  types pass through untouched.
+- Bodies of EDOP_COMPRESSION_THREAD_MIN_BYTES or more are compressed in a
+  worker thread so the event loop keeps serving other requests.
+- Responses with an ETag (the pre-rendered /api/wh-sites and /api/societies
+  payloads) are compressed once per (path, ETag, encoding) and served
+  from a byte-bounded cache afterwards. A strong ETag must differ per content
+  coding (RFC 9110 8.8.3), so it gets the encoding as a suffix ("abc" ->
+  "abc-gzip"), as eco_static does for its variants; handlers compare
+  If-None-Match with etag_matches(), which accepts the suffixed forms, and a
+  304 for a suffixed tag is sent back with that tag. Weak ETags are left as is.
+- Streaming responses (NDJSON, streamed FeatureCollections) are compressed
+  chunk by chunk and flushed per chunk, so clients still see rows as they come.
+"""
+import gzip
+import re
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import anyio
+
+from app.db.cache import LRUCache
+from app.settings import settings
+
+try:
+    import brotli  # type: ignore
+except ImportError:  # optional: br is skipped
+    brotli = None
+
+try:
+    import zstandard  # type: ignore
+except ImportError:  # optional: zstd is skipped
+    zstandard = None
+
+_COMPRESSIBLE_TYPES = ("application/json", "application/geo+json", "application/x-ndjson",
+                       "text/", "application/javascript", "image/svg+xml")
+
+# (path, etag, encoding) -> compressed body
+_CACHE = LRUCache("compressed", max_items=1024, max_bytes=settings.COMPRESSION_CACHE_MAX_MB * 2**20,
+                  sizeof=len)
+# Counters are updated without a lock; they are indicative, not exact
+_STATS: Dict[str, int] = {"compressed": 0, "streamed": 0, "threaded": 0, "bytes_in": 0, "bytes_out": 0}
+
+
+# -----------------------
+# Encoders
+# -----------------------
+
+def _gzip(data: bytes) -> bytes:
+    return gzip.compress(data, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def _br(data: bytes) -> bytes:
+    return brotli.compress(data, quality=settings.COMPRESSION_BR_QUALITY)
+
+
+def _zstd(data: bytes) -> bytes:
+    return zstandard.ZstdCompressor(level=settings.COMPRESSION_ZSTD_LEVEL).compress(data)
+
+
+class _GzipStream:
+    def __init__(self):
+        self._z = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._z.compress(data) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._z.flush(zlib.Z_FINISH)
+
+
+class _BrStream:
+    def __init__(self):
+        self._c = brotli.Compressor(quality=settings.COMPRESSION_BR_QUALITY)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._c.process(data) + self._c.flush()
+
+    def finish(self) -> bytes:
+        return self._c.finish()
+
+
+class _ZstdStream:
+    def __init__(self):
+        self._c = zstandard.ZstdCompressor(level=settings.COMPRESSION_ZSTD_LEVEL).compressobj()
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._c.compress(data) + self._c.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._c.flush()
+
+
+# encoding -> (one-shot compress, streaming compressor class)
+_ENCODERS: Dict[str, Tuple[Callable[[bytes], bytes], Callable[[], Any]]] = {"gzip": (_gzip, _GzipStream)}
+if brotli is not None:
+    _ENCODERS["br"] = (_br, _BrStream)
+if zstandard is not None:
+    _ENCODERS["zstd"] = (_zstd, _ZstdStream)
+
+
+def available_encodings() -> List[str]:
+    """Configured encodings this process can produce, most preferred first."""
+    wanted = [e.strip().lower() for e in settings.COMPRESSION_ENCODINGS.split(",") if e.strip()]
+    return [e for e in wanted if e in _ENCODERS]
+
+
+def choose_encoding(accept_encoding: str, encodings: List[str]) -> Optional[str]:
+    """First of encodings the Accept-Encoding header allows (q=0 excludes; * matches)."""
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name] = q
+    for encoding in encodings:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > 0:
+            return encoding
+    return None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    return _ENCODERS[encoding][0](data)
+
+
+_ENCODED_ETAG = re.compile(r'^(W/)?"(.*?)(?:-(?:gzip|br|zstd))?"$')
+
+
+def encoded_etag(etag: str, encoding: Optional[str]) -> str:
+    """The ETag of the encoding variant of a representation: '"abc"' -> '"abc-gzip"'.
+
+    Weak ETags (and identity) are returned unchanged.
+    """
+    if not encoding or etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak If-None-Match comparison that also accepts etag's encoding variants; * matches anything."""
+    if not if_none_match:
+        return False
+    m = _ENCODED_ETAG.match(etag)
+    opaque = m.group(2) if m else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        cm = _ENCODED_ETAG.match(candidate)
+        if cm is not None and cm.group(2) == opaque:
+            return True
+    return False
+
+
+def stats() -> Dict[str, Any]:
+    out: Dict[str, Any] = {"enabled": settings.COMPRESSION, "encodings": available_encodings(), **_STATS}
+    if _STATS["bytes_in"]:
+        out["ratio"] = round(_STATS["bytes_out"] / _STATS["bytes_in"], 3)
+    out["cache"] = _CACHE.stats()
+    return out
+
+
+# -----------------------
+# ASGI middleware
+# -----------------------
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _without(headers: List[Tuple[bytes, bytes]], *names: bytes) -> List[Tuple[bytes, bytes]]:
+    return [(k, v) for k, v in headers if k.lower() not in names]
+
+
+class CompressionMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self.paths = tuple(p.strip() for p in settings.COMPRESSION_PATHS.split(",") if p.strip())
+        self.encodings = available_encodings()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths) or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+        accept = _header(scope["headers"], b"accept-encoding") or b""
+        encoding = choose_encoding(accept.decode("latin-1"), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        if_none_match = _header(scope["headers"], b"if-none-match")
+        responder = _Responder(send, encoding, scope["path"],
+                               if_none_match.decode("latin-1") if if_none_match else None)
+        await self.app(scope, receive, responder.send)
+
+
+class _Responder:
+    """Wraps send(): decides on the first body message whether and how to compress."""
+
+    def __init__(self, send, encoding: str, path: str, if_none_match: Optional[str] = None):
+        self._send = send
+        self.encoding = encoding
+        self.path = path
+        self.if_none_match = if_none_match
+        self.start: Optional[Dict[str, Any]] = None
+        self.mode: Optional[str] = None  # "pass" | "stream"
+        self.stream = None
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        if message["type"] == "http.response.start":
+            if message["status"] == 304:
+                message = self._not_modified(message)
+            self.start = message
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more = message.get("more_body", False)
+
+        if self.mode == "pass":
+            await self._send(message)
+            return
+        if self.mode == "stream":
+            await self._stream(body, more)
+            return
+
+        headers = list(self.start.get("headers", []))
+        ctype = (_header(headers, b"content-type") or b"").decode("latin-1").lower()
+        if (self.start["status"] != 200 or _header(headers, b"content-encoding") is not None
+                or not ctype.startswith(_COMPRESSIBLE_TYPES)
+                or (not more and len(body) < settings.COMPRESSION_MIN_BYTES)):
+            self.mode = "pass"
+            await self._send(self.start)
+            await self._send(message)
+            return
+
+        vary = _header(headers, b"vary")
+        if vary is None:
+            vary = b"Accept-Encoding"
+        elif b"accept-encoding" not in vary.lower():
+            vary += b", Accept-Encoding"
+        etag = _header(headers, b"etag")
+        headers = _without(headers, b"content-length", b"vary", b"etag")
+        headers += [(b"content-encoding", self.encoding.encode()), (b"vary", vary)]
+        if etag is not None:
+            headers.append((b"etag", encoded_etag(etag.decode("latin-1"), self.encoding).encode("latin-1")))
+
+        if more:
+            # Streaming: compress and flush each chunk as it comes
+            self.mode = "stream"
+            self.stream = _ENCODERS[self.encoding][1]()
+            _STATS["streamed"] += 1
+            await self._send({**self.start, "headers": headers})
+            await self._stream(body, more)
+            return
+
+        data = await self._compress_whole(body, etag)
+        headers.append((b"content-length", str(len(data)).encode()))
+        await self._send({**self.start, "headers": headers})
+        await self._send({"type": "http.response.body", "body": data})
+
+    def _not_modified(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer a 304 with the variant's ETag if that is what the client revalidated."""
+        headers = list(message.get("headers", []))
+        etag = _header(headers, b"etag")
+        if etag is None or not self.if_none_match:
+            return message
+        encoded = encoded_etag(etag.decode("latin-1"), self.encoding)
+        if encoded not in (c.strip() for c in self.if_none_match.split(",")):
+            return message
+        return {**message, "headers": _without(headers, b"etag") + [(b"etag", encoded.encode("latin-1"))]}
+
+    async def _compress_whole(self, body: bytes, etag: Optional[bytes]) -> bytes:
+        key = (self.path, etag, self.encoding) if etag else None
+        if key is not None:
+            cached = _CACHE.get(key)
+            if cached is not None:
+                return cached
+        if len(body) >= settings.COMPRESSION_THREAD_MIN_BYTES:
+            _STATS["threaded"] += 1
+            data = await anyio.to_thread.run_sync(compress, body, self.encoding)
+        else:
+            data = compress(body, self.encoding)
+        if key is not None:
+            _CACHE.set(key, data)
+        _STATS["compressed"] += 1
+        _STATS["bytes_in"] += len(body)
+        _STATS["bytes_out"] += len(data)
+        return data
+
+    async def _stream(self, body: bytes, more: bool) -> None:
+        if len(body) >= settings.COMPRESSION_THREAD_MIN_BYTES:
+            out = await anyio.to_thread.run_sync(self.stream.chunk, body)
+        else:
+            out = self.stream.chunk(body) if body else b""
+        if not more:
+            out += self.stream.finish()
+        _STATS["bytes_in"] += len(body)
+        _STATS["bytes_out"] += len(out)
+        await self._send({"type": "http.response.body", "body": out, "more_body": more})
@@ -0,0 +1,96 @@
+"""Serve prebuilt ecoregion hierarchy GeoJSON (scripts/build_eco_geojson.py).
+
+The 2023 biogeographic layers don't change between deploys, so the build step
+exports every level and per-parent subset once, simplified, with .gz and .br
+variants and a manifest of content hashes. The /api/eco/*/geom endpoints call
+serve() first and only fall back to PostGIS when no build is present.
+
+Responses carry a strong ETag (content hash, with the encoding as a suffix
+for the .gz/.br variants) and Cache-Control, answer 304 to a matching
+If-None-Match, and pick the smallest encoding the client accepts.
+"""
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+
+from app.api.compression import encoded_etag, etag_matches
+from app.settings import settings
+
+_MANIFEST_NAME = "manifest.json"
+
+# (manifest mtime, parsed manifest)
+_MANIFEST: Dict[str, Any] = {"mtime": None, "data": None}
+_LOCK = threading.Lock()
+
+# Preferred first; extension written by the build script
+_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _root() -> Path:
+    return Path(settings.ECO_GEOJSON_DIR)
+
+
+def manifest() -> Optional[Dict[str, Any]]:
+    """The build manifest, reloaded when the file changes (None if there is no build)."""
+    path = _root() / _MANIFEST_NAME
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return None
+    with _LOCK:
+        if _MANIFEST["mtime"] != mtime:
+            with open(path, encoding="utf-8") as f:
+                _MANIFEST["data"] = json.load(f)
+            _MANIFEST["mtime"] = mtime
+        return _MANIFEST["data"]
+
+
+def _accepted(request: Request) -> set:
+    """Content codings the client accepts (ignoring any listed with q=0)."""
+    out = set()
+    for part in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.replace(" ", "").lower()
+        if q in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if name:
+            out.add(name.strip().lower())
+    return out
+
+
+def serve(key: str, request: Request) -> Optional[Response]:
+    """Response for a prebuilt collection (e.g. "realms", "subrealms/<realm>"), or None."""
+    m = manifest()
+    entry = (m or {}).get("files", {}).get(key)
+    if entry is None:
+        return None
+
+    path = _root() / entry["path"]
+    chosen = None
+    accepted = _accepted(request)
+    for encoding, ext in _ENCODINGS:
+        if encoding in accepted and entry.get(encoding):
+            candidate = path.with_name(path.name + ext)
+            if candidate.exists():
+                path = candidate
+                chosen = encoding
+                break
+
+    etag = f'"{entry["sha256"][:32]}"'
+    headers = {
+        "ETag": encoded_etag(etag, chosen),
+        "Cache-Control": f"public, max-age={settings.ECO_GEOJSON_MAX_AGE_S}",
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if chosen is not None:
+        headers["Content-Encoding"] = chosen
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return None
+    return Response(content=data, media_type="application/geo+json", headers=headers)
@@ -0,0 +1,155 @@
+"""HTTP caching for endpoints whose data only changes when a batch script reruns.
+
+Routes declare which table families they read with a route-level dependency,
+which FastAPI resolves before the handler's own (get_db):
+
+    @router.get("/eco/realms", dependencies=[Depends(data_version("eco"))])
+
+The dependency derives a weak ETag and Last-Modified from the families'
+versions in the registry (app/db/data_versions.py, polled in the background)
+and answers a matching If-None-Match (or, without one, a satisfied
+If-Modified-Since) with 304 before a pooled connection is checked out.
+Routes that negotiate JSON vs NDJSON by Accept pass negotiated=True: the
+NDJSON representation then gets its own ETag and the 304 carries Vary: Accept.
+Otherwise it leaves the validators on the request scope and
+CacheHeadersMiddleware adds ETag, Last-Modified and Cache-Control to the
+200 response, without overriding headers the handler set itself (the
+content-hash ETags of eco_static and /api/societies).
+
+ETags are weak because the same version may be served gzip/br/zstd encoded
+(app/api/compression.py). A family missing from the registry disables
+caching for the routes that read it. Bump EDOP_HTTP_CACHE_ETAG_SALT when a
+deploy changes response shapes without a data change.
+"""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+
+from app.api.responses import wants_ndjson
+from app.db import data_versions
+from app.settings import settings
+
+_SCOPE_KEY = "edop.cache_headers"
+
+# Counters are updated without a lock; they are indicative, not exact
+_STATS: Dict[str, int] = {"tagged": 0, "not_modified": 0, "unversioned": 0}
+
+
+def validators(*families: str) -> Optional[Tuple[str, datetime]]:
+    """(ETag, Last-Modified) for the families' current versions, or None if any is unknown."""
+    parts = []
+    modified = None
+    for family in families:
+        entry = data_versions.get(family)
+        if entry is None:
+            return None
+        version, updated_at = entry
+        parts.append(f"{family}.{version}")
+        modified = updated_at if modified is None else max(modified, updated_at)
+    etag = f'W/"{settings.HTTP_CACHE_ETAG_SALT}-{"-".join(parts)}"'
+    return etag, modified.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison (RFC 9110 13.1.2): W/ prefixes are ignored; * matches anything."""
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if (candidate[2:] if candidate.startswith("W/") else candidate) == opaque:
+            return True
+    return False
+
+
+def _not_modified_since(if_modified_since: str, modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since is None or since.tzinfo is None:
+        return False
+    return modified <= since
+
+
+def cache_control() -> str:
+    if settings.HTTP_CACHE_MAX_AGE_S > 0:
+        return f"public, max-age={settings.HTTP_CACHE_MAX_AGE_S}"
+    # Stored, but revalidated on every use (a 304 when nothing changed)
+    return "public, no-cache"
+
+
+def data_version(*families: str, negotiated: bool = False) -> Callable[[Request], Any]:
+    """Dependency: 304 if the client's copy matches the families' versions, else tag the response.
+
+    negotiated=True for routes whose format follows wants_ndjson().
+    """
+    unknown = [f for f in families if f not in data_versions.FAMILIES]
+    if unknown:
+        raise ValueError(f"Unknown data families {unknown}; expected from {data_versions.FAMILIES}")
+
+    async def check(request: Request) -> None:
+        if not settings.HTTP_CACHE:
+            return
+        found = validators(*families)
+        if found is None:
+            _STATS["unversioned"] += 1
+            return
+        etag, modified = found
+        headers = {"ETag": etag, "Last-Modified": format_datetime(modified, usegmt=True),
+                   "Cache-Control": cache_control()}
+        if negotiated:
+            if wants_ndjson(request, request.query_params.get("format")):
+                etag = headers["ETag"] = f'{etag[:-1]}-ndjson"'
+            headers["Vary"] = "Accept"
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            fresh = _etag_matches(if_none_match, etag)
+        else:
+            if_modified_since = request.headers.get("if-modified-since")
+            fresh = if_modified_since is not None and _not_modified_since(if_modified_since, modified)
+        if fresh:
+            _STATS["not_modified"] += 1
+            raise HTTPException(status_code=304, headers=headers)
+
+        request.scope[_SCOPE_KEY] = headers
+
+    return check
+
+
+def stats() -> Dict[str, Any]:
+    return {"enabled": settings.HTTP_CACHE, **_STATS, "registry": data_versions.stats()}
+
+
+# -----------------------
+# ASGI middleware
+# -----------------------
+
+class CacheHeadersMiddleware:
+    """Adds the validators data_version() left on the scope to 200 responses."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Dict[str, Any]) -> None:
+            cache_headers = scope.get(_SCOPE_KEY)
+            if message["type"] == "http.response.start" and cache_headers and message["status"] == 200:
+                headers: List[Tuple[bytes, bytes]] = list(message.get("headers", []))
+                present = {k.lower() for k, _ in headers}
+                for name, value in cache_headers.items():
+                    key = name.lower().encode("latin-1")
+                    if key not in present:
+                        headers.append((key, value.encode("latin-1")))
+                message = {**message, "headers": headers}
+                _STATS["tagged"] += 1
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
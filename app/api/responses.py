@@ -0,0 +1,156 @@
+"""Fast JSON rendering and NDJSON streaming for the large API payloads.
+
+FastAPI passes a handler's return value through jsonable_encoder (a Python
+walk over every nested value) before JSONResponse serializes it. Handlers that
+return big lists instead return json_response(payload), which goes straight
+to dumps(): orjson when it is installed, else the stdlib encoder with the same
+Decimal/date handling.
+
+List endpoints also accept ?format=ndjson (or Accept: application/x-ndjson)
+and stream one JSON object per line from a server-side cursor, so rows go from
+Postgres to the socket in batches of STREAM_ITERSIZE instead of being
+materialized as one list first. Because the format can come from the Accept
+header, those endpoints send Vary: Accept (vary_on_accept()) on every response.
+
+GeoJSON endpoints go one step further: Postgres builds each Feature as json,
+iter_rows(raw_json=True) hands it over as the undecoded bytes, and
+feature_collection_response() splices those into the response, so geometries
+are never parsed into Python objects or re-serialized.
+"""
+import json
+from datetime import date
+from decimal import Decimal
+from typing import Any, Callable, Iterable, Iterator, Mapping, Optional
+
+import numpy as np
+import psycopg
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from psycopg.adapt import Loader
+
+try:
+    import orjson
+except ImportError:
+    # Optional speed-up; the stdlib encoder produces the same documents
+    orjson = None
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+GEOJSON_MEDIA_TYPE = "application/geo+json"
+
+# Rows fetched per round trip by iter_rows()
+STREAM_ITERSIZE = 500
+
+
+def json_default(o: Any) -> Any:
+    """Encoder fallback for DB/numpy values FastAPI would otherwise encode for us."""
+    if isinstance(o, Decimal):
+        return float(o)
+    if isinstance(o, date):
+        return o.isoformat()
+    if isinstance(o, np.generic):
+        return o.item()
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=json_default, option=_ORJSON_OPTIONS)
+else:
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, default=json_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with dumps() (orjson when available)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def json_response(content: Any, status_code: int = 200, headers: Optional[Mapping[str, str]] = None) -> FastJSONResponse:
+    """Return this from a handler to skip FastAPI's jsonable_encoder pass."""
+    return FastJSONResponse(content, status_code=status_code, headers=headers)
+
+
+def wants_ndjson(request: Request, format: Optional[str]) -> bool:
+    if format:
+        return format.lower() == "ndjson"
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def vary_on_accept(response: Response) -> Response:
+    """Mark a response of an endpoint that negotiates NDJSON by Accept (see wants_ndjson)."""
+    response.headers.add_vary_header("Accept")
+    return response
+
+
+def ndjson_response(items: Iterable[Any], headers: Optional[Mapping[str, str]] = None) -> StreamingResponse:
+    """Stream items as NDJSON, one dumps() line per item."""
+    def lines() -> Iterator[bytes]:
+        for item in items:
+            yield dumps(item) + b"\n"
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE, headers=headers)
+
+
+def feature_collection_response(features: Iterable[bytes]) -> StreamingResponse:
+    """Stream a GeoJSON FeatureCollection from already-serialized Feature documents."""
+    def chunks() -> Iterator[bytes]:
+        yield b'{"type":"FeatureCollection","features":['
+        sep = b""
+        for feature in features:
+            yield sep + feature
+            sep = b","
+        yield b"]}"
+
+    return StreamingResponse(chunks(), media_type=GEOJSON_MEDIA_TYPE)
+
+
+def raw_ndjson_response(docs: Iterable[bytes]) -> StreamingResponse:
+    """Stream already-serialized JSON documents as NDJSON."""
+    return StreamingResponse((doc + b"\n" for doc in docs), media_type=NDJSON_MEDIA_TYPE)
+
+
+class RawJSONLoader(Loader):
+    """Load json columns as the bytes Postgres sent: no decode, no json.loads."""
+
+    def load(self, data) -> bytes:
+        return bytes(data)
+
+
+def iter_rows(
+    conn: psycopg.Connection,
+    sql: str,
+    params: Optional[Any] = None,
+    to_item: Callable[[tuple], Any] = lambda row: row,
+    name: str = "edop_stream",
+    itersize: int = STREAM_ITERSIZE,
+    raw_json: bool = False,
+) -> Iterator[Any]:
+    """Rows of sql from a server-side cursor, itersize per fetch, mapped by to_item.
+
+    raw_json=True returns json columns as raw bytes (see RawJSONLoader). The
+    query is declared before this returns, so SQL errors surface while the
+    handler can still answer 500; the connection must stay checked out until
+    the stream is consumed (get_db() holds it until the response is done).
+    """
+    cur = conn.cursor(name=name)
+    cur.itersize = itersize
+    if raw_json:
+        cur.adapters.register_loader("json", RawJSONLoader)
+    try:
+        cur.execute(sql, params)
+    except Exception:
+        cur.close()
+        raise
+
+    def rows() -> Iterator[Any]:
+        with cur:
+            for row in cur:
+                yield to_item(row)
+
+    return rows()
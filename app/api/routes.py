@@ -1,102 +1,82 @@
-from fastapi import APIRouter, HTTPException
-from typing import Any, Dict, List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Literal, Optional, Tuple
+from contextlib import ExitStack, contextmanager
+import itertools
 import json
-import urllib.parse
-import urllib.request
-import ssl
-import certifi
-
-from app.db.signature import get_signature
+import psycopg
+import sys
+
+from app import metrics
+from app.api import compression, eco_static, http_cache, wh_catalogue, whg
+from app.api.http_cache import data_version
+from app.api.responses import (
+    RawJSONLoader,
+    feature_collection_response,
+    iter_rows,
+    json_response,
+    ndjson_response,
+    raw_ndjson_response,
+    vary_on_accept,
+    wants_ndjson,
+)
+from app.db import basin_index, basin_neighbours, elevation, pca_index, whc_vectors
+from app.db import gaz_suggest as gaz_suggest_index
+from app.db import societies as society_summary
+from app.db.pool import get_db, get_pool, pool_stats
+from app.db.signature import BATCH_MAX_POINTS, cache_stats, get_signature, iter_signatures
 from app.settings import settings
 
-from pathlib import Path
 import re
+import time
 
 router = APIRouter(prefix="/api", tags=["api"])
 
+# Conditional-request checks for routes serving batch-loaded data, by the
+# table families they read (app/api/http_cache.py)
+_ECO_VERSION = data_version("eco")
+_ECO_WIKITEXT_VERSION = data_version("eco", "eco_wikitext")
+_WHC_VERSION = data_version("whc", negotiated=True)
+_ECO_NEGOTIATED_VERSION = data_version("eco", negotiated=True)
+_BASIN_CLUSTERS_VERSION = data_version("basin_clusters", "whc")
+_SOCIETIES_VERSION = data_version("societies")
+
 
 # -----------------------
 # WHG API and utility helpers
 # -----------------------
 
-def _http_get_json(url: str, timeout_sec: int = 20) -> Dict[str, Any]:
-    ctx = ssl.create_default_context(cafile=certifi.where())
-    req = urllib.request.Request(url, headers={
-        "Accept": "application/json",
-        "User-Agent": "EDOP/1.0"
-    })
-    with urllib.request.urlopen(req, timeout=timeout_sec, context=ctx) as resp:
-        raw = resp.read().decode("utf-8")
-    return json.loads(raw)
-
-
-def _http_post_json(url: str, payload: Dict[str, Any], headers: Dict[str, str] = None, timeout_sec: int = 20) -> Dict[str, Any]:
-    """POST JSON to URL and return parsed response."""
-    ctx = ssl.create_default_context(cafile=certifi.where())
-    data = json.dumps(payload).encode("utf-8")
-    req_headers = {
-        "Accept": "application/json",
-        "Content-Type": "application/json",
-        "User-Agent": "EDOP/1.0"
-    }
-    if headers:
-        req_headers.update(headers)
-    req = urllib.request.Request(url, data=data, headers=req_headers, method="POST")
-    with urllib.request.urlopen(req, timeout=timeout_sec, context=ctx) as resp:
-        raw = resp.read().decode("utf-8")
-    return json.loads(raw)
+def _require_whg_token() -> None:
+    if not settings.WHG_API_TOKEN:
+        raise HTTPException(status_code=500, detail="WHG_API_TOKEN not configured on server")
 
 
 def _whg_suggest_first(prefix: str) -> Optional[Dict[str, Any]]:
     """Call WHG suggest endpoint and return the top-ranked result, if any."""
-    if not settings.WHG_API_TOKEN:
-        raise HTTPException(status_code=500, detail="WHG_API_TOKEN not configured on server")
+    _require_whg_token()
 
-    params = {
-        "prefix": prefix,
-        "limit": 3,
-        "cursor": 0,
-        "exact": "false",
-    }
-    # WHG may require authentication for suggest; include token when configured.
-    if settings.WHG_API_TOKEN:
-        params["token"] = settings.WHG_API_TOKEN
-
-    url = "https://whgazetteer.org/suggest/entity?" + urllib.parse.urlencode(params)
-    data = _http_get_json(url)
+    data = whg.suggest(prefix, limit=3, exact=False)
     results = data.get("result") or []
     return results[0] if results else None
 
 
+def _filter_places(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Filter to places only (IDs prefixed with "place:")
+    return [r for r in results if r.get("id", "").startswith("place:")]
+
+
 def _whg_suggest(prefix: str, limit: int = 5) -> List[Dict[str, Any]]:
     """Call WHG suggest endpoint and return up to `limit` results."""
-    if not settings.WHG_API_TOKEN:
-        raise HTTPException(status_code=500, detail="WHG_API_TOKEN not configured on server")
+    _require_whg_token()
 
-    params = {
-        "prefix": prefix,
-        "limit": limit,
-        "cursor": 0,
-        "exact": "true",
-        "token": settings.WHG_API_TOKEN,
-    }
-
-    url = "https://whgazetteer.org/suggest/entity?" + urllib.parse.urlencode(params)
-    data = _http_get_json(url)
-    results = data.get("result") or []
-    # Filter to places only (IDs prefixed with "place:")
-    return [r for r in results if r.get("id", "").startswith("place:")]
+    data = whg.suggest(prefix, limit=limit, exact=True)
+    return _filter_places(data.get("result") or [])
 
 
 def _whg_entity(place_id: str) -> Dict[str, Any]:
     """Fetch WHG entity detail for a place id (e.g. 'place:5424806')."""
-    if not settings.WHG_API_TOKEN:
-        raise HTTPException(status_code=500, detail="WHG_API_TOKEN not configured on server")
-
-    encoded_id = urllib.parse.quote(place_id, safe="")
-    token = urllib.parse.quote(settings.WHG_API_TOKEN)
-    url = f"https://whgazetteer.org/entity/{encoded_id}/api?token={token}"
-    return _http_get_json(url)
+    _require_whg_token()
+    return whg.entity(place_id)
 
 
 def _extract_lonlat(entity: Dict[str, Any]) -> Optional[Tuple[float, float]]:
@@ -126,15 +106,7 @@ def _extract_lonlat(entity: Dict[str, Any]) -> Optional[Tuple[float, float]]:
     return None
 
 
-def _whg_reconcile_query(query: str, countries: List[str] = None, bounds: Dict = None, size: int = 10) -> Dict[str, Any]:
-    """
-    Call WHG /reconcile endpoint to search for places.
-    Returns candidates with id, name, score, match, alt_names, description.
-    """
-    if not settings.WHG_API_TOKEN:
-        raise HTTPException(status_code=500, detail="WHG_API_TOKEN not configured on server")
-
-    # Build query payload
+def _whg_reconcile_payload(query: str, countries: List[str] = None, bounds: Dict = None, size: int = 10) -> Dict[str, Any]:
     # NOTE: "fuzzy" mode returns results ranked by prominence (alt names, etc.)
     # "exact" mode returns exact matches but without prominence ranking
     q_params = {
@@ -151,56 +123,51 @@ def _whg_reconcile_query(query: str, countries: List[str] = None, bounds: Dict =
     if bounds:
         q_params["bounds"] = bounds
 
-    payload = {
+    return {
         "queries": {
             "q1": q_params
         }
     }
 
-    headers = {
-        "Authorization": f"Bearer {settings.WHG_API_TOKEN}"
-    }
 
-    url = "https://whgazetteer.org/reconcile"
-    data = _http_post_json(url, payload, headers=headers)
+def _whg_reconcile_query(query: str, countries: List[str] = None, bounds: Dict = None, size: int = 10) -> Dict[str, Any]:
+    """
+    Call WHG /reconcile endpoint to search for places.
+    Returns candidates with id, name, score, match, alt_names, description.
+    """
+    _require_whg_token()
+
+    payload = _whg_reconcile_payload(query, countries=countries, bounds=bounds, size=size)
+    data = whg.reconcile(payload)
 
     # Extract results from q1
     q1_result = data.get("q1", {})
     return q1_result.get("result", [])
 
 
-def _whg_reconcile_extend(place_ids: List[str]) -> Dict[str, Dict]:
+def _whg_reconcile_extend(place_ids: List[str]) -> Tuple[Dict[str, Dict], int]:
     """
     Call WHG /reconcile extend to get geometry and details for place IDs.
-    Returns dict keyed by place_id with geometry_wkt, countries, types, names.
+    Returns (dict keyed by place_id with geometry_wkt, countries, types, names,
+    number of IDs fetched from WHG rather than the per-place cache).
     """
-    if not settings.WHG_API_TOKEN:
-        raise HTTPException(status_code=500, detail="WHG_API_TOKEN not configured on server")
+    _require_whg_token()
 
     if not place_ids:
-        return {}
-
-    payload = {
-        "extend": {
-            "ids": place_ids,
-            "type": "https://whgazetteer.org/static/whg_schema.jsonld#Place",
-            "properties": [
-                {"id": "whg:geometry_wkt"},
-                {"id": "whg:countries_objects"},
-                {"id": "whg:types_objects"},
-                {"id": "whg:names_summary"}
-            ]
-        }
-    }
+        return {}, 0
 
-    headers = {
-        "Authorization": f"Bearer {settings.WHG_API_TOKEN}"
-    }
+    return whg.extend(place_ids)
 
-    url = "https://whgazetteer.org/reconcile"
-    data = _http_post_json(url, payload, headers=headers)
 
-    return data.get("rows", {})
+def _server_timing(response: Response, *entries: Tuple[str, float, Optional[str]]) -> None:
+    """Set a Server-Timing header from (name, milliseconds, description) triples."""
+    parts = []
+    for name, ms, desc in entries:
+        part = f"{name};dur={ms:.1f}"
+        if desc:
+            part += f';desc="{desc}"'
+        parts.append(part)
+    response.headers["Server-Timing"] = ", ".join(parts)
 
 
 def _parse_wkt_point_coords(wkt: str) -> Optional[Tuple[float, float]]:
@@ -279,99 +246,176 @@ def _merge_reconcile_results(candidates: List[Dict], extended: Dict[str, Dict])
     return results
 
 
-# -----------------------
-# World Heritage seed helpers
-# -----------------------
-
-_WH_SEED_PATH = Path(__file__).resolve().parents[1] / "data" / "world_heritage_seed.json"
+def _resolved_place(name: str, first: Dict[str, Any], place_id: str, entity: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a /resolve response from the top suggest hit and its entity detail."""
+    lonlat = _extract_lonlat(entity)
+    if not lonlat:
+        return {
+            "label": entity.get("title") or first.get("name") or name,
+            "source": "whg",
+            "meta": {
+                "status": "no_geometry",
+                "whg_id": place_id,
+                "score": first.get("score"),
+                "description": first.get("description"),
+            },
+        }
 
+    lon, lat = lonlat
+    return {
+        "label": entity.get("title") or first.get("name") or name,
+        "source": "whg",
+        "location": {
+            "type": "Point",
+            "coordinates": [lon, lat],
+        },
+        "meta": {
+            "status": "ok",
+            "whg_id": place_id,
+            "score": first.get("score"),
+            "description": first.get("description"),
+            "ccodes": entity.get("ccodes"),
+            "dataset": entity.get("dataset"),
+            "dataset_id": entity.get("dataset_id"),
+        },
+    }
 
-def _parse_wkt_point(wkt: str) -> Optional[Tuple[float, float]]:
-    """Parse WKT like 'POINT (lon lat)' or 'POINT(lon lat)' into (lon, lat)."""
-    if not wkt:
-        return None
-    m = re.match(r"^\s*POINT\s*\(\s*([-0-9.]+)\s+([-0-9.]+)\s*\)\s*$", wkt)
-    if not m:
-        return None
-    return float(m.group(1)), float(m.group(2))
-
-
-def _load_wh_seed() -> list[Dict[str, Any]]:
-    """Load and normalize the WH seed JSON into a list of dicts with GeoJSON Point."""
-    if not _WH_SEED_PATH.exists():
-        raise FileNotFoundError(f"World Heritage seed file not found at {_WH_SEED_PATH}")
-
-    raw = json.loads(_WH_SEED_PATH.read_text(encoding="utf-8"))
-    out: list[Dict[str, Any]] = []
-
-    if not isinstance(raw, list):
-        raise ValueError("World Heritage seed file must be a JSON array")
-
-    for row in raw:
-        if not isinstance(row, dict):
-            continue
-        wkt = row.get("geom")
-        lonlat = _parse_wkt_point(wkt) if isinstance(wkt, str) else None
-        if not lonlat:
-            continue
-        lon, lat = lonlat
-        out.append(
-            {
-                "id_no": row.get("id_no"),
-                "name_en": row.get("name_en"),
-                "states_name_en": row.get("states_name_en"),
-                "short_description_en": row.get("short_description_en"),
-                "location": {"type": "Point", "coordinates": [lon, lat]},
-            }
-        )
 
-    return out
+def _whg_place_payload(id: str, entity: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a /whg-place response from a WHG entity."""
+    lonlat = _extract_lonlat(entity)
+    if not lonlat:
+        return {
+            "id": id,
+            "label": entity.get("title"),
+            "source": "whg",
+            "meta": {
+                "status": "no_geometry",
+                "ccodes": entity.get("ccodes"),
+                "fclasses": entity.get("fclasses"),
+            },
+        }
 
+    lon, lat = lonlat
+    return {
+        "id": id,
+        "label": entity.get("title"),
+        "source": "whg",
+        "location": {
+            "type": "Point",
+            "coordinates": [lon, lat],
+        },
+        "meta": {
+            "status": "ok",
+            "ccodes": entity.get("ccodes"),
+            "fclasses": entity.get("fclasses"),
+            "dataset": entity.get("dataset"),
+        },
+    }
 
-def _get_cluster_labels() -> Dict[int, str]:
-    """Fetch cluster labels for WH sites from database."""
-    import psycopg
-    import os
 
-    try:
-        conn = psycopg.connect(
-            host=os.environ.get("PGHOST", "localhost"),
-            port=os.environ.get("PGPORT", "5435"),
-            dbname=os.environ.get("PGDATABASE", "edop"),
-            user=os.environ.get("PGUSER", "postgres"),
-            password=os.environ.get("PGPASSWORD", ""),
-        )
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT s.id_no, c.cluster_label
-                FROM edop_clusters c
-                JOIN edop_wh_sites s ON s.site_id = c.site_id
-            """)
-            return {row[0]: row[1] for row in cur.fetchall()}
-    except Exception:
-        return {}
-    finally:
-        if 'conn' in locals():
-            conn.close()
+def _suggest_results(raw: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Reshape for frontend: flatten to essentials
+    results = []
+    for r in raw:
+        results.append({
+            "id": r.get("id"),
+            "name": r.get("name"),
+            "score": r.get("score"),
+            "description": r.get("description"),  # e.g. "Country: ML"
+            "alt_names": r.get("alt_names") or [],
+        })
+    return results
 
 
 # -----------------------
 # API endpoints
 # -----------------------
 
+def _health_payload() -> Dict[str, Any]:
+    """Process stats shown by /api/health; shared with the async-mode handler so the two can't drift."""
+    return {"status": "ok", "db_pool": pool_stats(), "basin_index": basin_index.stats(),
+            "pca_index": pca_index.stats(), "basin_neighbours": basin_neighbours.stats(),
+            "whc_vectors": whc_vectors.stats(), "gaz_suggest": gaz_suggest_index.stats(),
+            "whg": whg.stats(), "wh_catalogue": wh_catalogue.stats(),
+            "societies": society_summary.stats(),
+            "caches": cache_stats(), "elevation": elevation.stats(),
+            "compression": compression.stats(), "http_cache": http_cache.stats(),
+            "metrics": metrics.stats()}
+
+
 @router.get("/health")
 def health():
-    return {"status": "ok"}
+    return _health_payload()
+
+
+@router.get("/metrics")
+def prometheus_metrics():
+    """Request, DB and external HTTP metrics in Prometheus text format.
+
+    Summed over all workers when EDOP_METRICS_DIR is set, else only this worker's (app/metrics.py).
+    """
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+GeometryMode = Literal["full", "simplified", "bbox", "none"]
 
 
 @router.get("/signature")
-def signature(lat: float, lon: float):
-    sig = get_signature(lat=lat, lon=lon)
+def signature(
+    lat: float,
+    lon: float,
+    geometry: GeometryMode = "full",
+    tolerance: Optional[float] = Query(None, gt=0, description="Simplification tolerance in degrees"),
+    conn: psycopg.Connection = Depends(get_db),
+):
+    """Basin signature for a point.
+
+    geometry: full (default) | simplified (precomputed, `tolerance` snaps to the
+    nearest available) | bbox | none.
+    """
+    sig = get_signature(lat=lat, lon=lon, conn=conn, geometry=geometry, tolerance=tolerance)
     if sig is None:
         raise HTTPException(status_code=404, detail="No basin covers this point")
     return sig
 
 
+class SignaturePoint(BaseModel):
+    lat: float = Field(ge=-90, le=90)
+    lon: float = Field(ge=-180, le=180)
+
+
+class SignatureBatch(BaseModel):
+    points: List[SignaturePoint]
+    geom: bool = False      # include basin GeoJSON per row (large)
+    profile: bool = False   # include profile_summary / profile_groups per row
+
+
+@router.post("/signatures")
+def signatures(batch: SignatureBatch, conn: psycopg.Connection = Depends(get_db)):
+    """Environmental signatures for many points, streamed as NDJSON in input order.
+
+    Body: {"points": [{"lat": .., "lon": ..}, ...], "geom": false, "profile": false}
+    Each output line is the /signature payload plus the input lat/lon, or
+    {"lat", "lon", "error": "no_basin"} for points outside every basin.
+    """
+    if not batch.points:
+        raise HTTPException(status_code=400, detail="No points given")
+    if len(batch.points) > BATCH_MAX_POINTS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_POINTS} points per call")
+
+    points = [(p.lat, p.lon) for p in batch.points]
+    rows = iter_signatures(points, conn, include_geom=batch.geom, profile=batch.profile)
+
+    # Resolve the first row before committing to a 200 so DB errors still surface as 500
+    try:
+        first = next(rows)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return ndjson_response(itertools.chain([first], rows))
+
+
 @router.get("/resolve")
 def resolve(name: str):
     """Resolve a place name using WHG suggest + entity detail.
@@ -410,37 +454,7 @@ def resolve(name: str):
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"WHG entity failed: {e}")
 
-    lonlat = _extract_lonlat(entity)
-    if not lonlat:
-        return {
-            "label": entity.get("title") or first.get("name") or name,
-            "source": "whg",
-            "meta": {
-                "status": "no_geometry",
-                "whg_id": place_id,
-                "score": first.get("score"),
-                "description": first.get("description"),
-            },
-        }
-
-    lon, lat = lonlat
-    return {
-        "label": entity.get("title") or first.get("name") or name,
-        "source": "whg",
-        "location": {
-            "type": "Point",
-            "coordinates": [lon, lat],
-        },
-        "meta": {
-            "status": "ok",
-            "whg_id": place_id,
-            "score": first.get("score"),
-            "description": first.get("description"),
-            "ccodes": entity.get("ccodes"),
-            "dataset": entity.get("dataset"),
-            "dataset_id": entity.get("dataset_id"),
-        },
-    }
+    return _resolved_place(name, first, place_id, entity)
 
 
 @router.get("/whg-suggest")
@@ -465,18 +479,7 @@ def whg_suggest(q: str, limit: int = 5):
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"WHG suggest failed: {e}")
 
-    # Reshape for frontend: flatten to essentials
-    results = []
-    for r in raw:
-        results.append({
-            "id": r.get("id"),
-            "name": r.get("name"),
-            "score": r.get("score"),
-            "description": r.get("description"),  # e.g. "Country: ML"
-            "alt_names": r.get("alt_names") or [],
-        })
-
-    return {"results": results}
+    return {"results": _suggest_results(raw)}
 
 
 @router.get("/whg-place")
@@ -496,43 +499,17 @@ def whg_place(id: str):
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"WHG entity failed: {e}")
 
-    lonlat = _extract_lonlat(entity)
-    if not lonlat:
-        return {
-            "id": id,
-            "label": entity.get("title"),
-            "source": "whg",
-            "meta": {
-                "status": "no_geometry",
-                "ccodes": entity.get("ccodes"),
-                "fclasses": entity.get("fclasses"),
-            },
-        }
-
-    lon, lat = lonlat
-    return {
-        "id": id,
-        "label": entity.get("title"),
-        "source": "whg",
-        "location": {
-            "type": "Point",
-            "coordinates": [lon, lat],
-        },
-        "meta": {
-            "status": "ok",
-            "ccodes": entity.get("ccodes"),
-            "fclasses": entity.get("fclasses"),
-            "dataset": entity.get("dataset"),
-        },
-    }
+    return _whg_place_payload(id, entity)
 
 
 @router.get("/whg-reconcile")
-def whg_reconcile(q: str, countries: str = None, size: int = 10):
+def whg_reconcile(response: Response, q: str, countries: str = None, size: int = 10):
     """
     Search WHG using reconcile API with optional country filter.
 
     Returns up to `size` candidates with geometry, countries, types, and names.
+    A Server-Timing header breaks the latency down into the query and extend
+    steps; extend only goes to WHG for place IDs not in the per-place cache.
 
     Args:
         q: Search query (place name)
@@ -558,14 +535,23 @@ def whg_reconcile(q: str, countries: str = None, size: int = 10):
 
     try:
         # Step 1: Query for candidates
+        t0 = time.perf_counter()
         candidates = _whg_reconcile_query(q, countries=country_list, size=size)
+        query_ms = (time.perf_counter() - t0) * 1000.0
 
         if not candidates:
+            _server_timing(response, ("whg-query", query_ms, None))
             return {"results": []}
 
-        # Step 2: Get geometry for all candidates
+        # Step 2: Get geometry for the candidates (cached per place ID)
+        t0 = time.perf_counter()
         place_ids = [c.get("id") for c in candidates if c.get("id")]
-        extended = _whg_reconcile_extend(place_ids)
+        extended, fetched = _whg_reconcile_extend(place_ids)
+        _server_timing(
+            response,
+            ("whg-query", query_ms, None),
+            ("whg-extend", (time.perf_counter() - t0) * 1000.0, f"{fetched}/{len(place_ids)} fetched"),
+        )
 
         # Step 3: Merge results
         results = _merge_reconcile_results(candidates, extended)
@@ -579,37 +565,20 @@ def whg_reconcile(q: str, countries: str = None, size: int = 10):
 
 
 @router.get("/wh-sites")
-def wh_sites():
-    """Return the small World Heritage seed set used by the pilot UI."""
+def wh_sites(request: Request):
+    """Return the small World Heritage seed set used by the pilot UI (see app/api/wh_catalogue.py)."""
     try:
-        sites = _load_wh_seed()
-        cluster_labels = _get_cluster_labels()
-
-        # Add cluster_label to each site
-        for site in sites:
-            id_no = site.get("id_no")
-            site["cluster_label"] = cluster_labels.get(id_no)
-
+        catalogue = wh_catalogue.get()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-    return {"count": len(sites), "sites": sites}
+    return catalogue.response(request)
 
 
 @router.get("/similar")
-def similar(id_no: int, limit: int = 5):
+def similar(id_no: int, limit: int = 5, conn: psycopg.Connection = Depends(get_db)):
     """Return most similar WH sites to the given site by id_no."""
-    import psycopg
-    import os
-
     try:
-        conn = psycopg.connect(
-            host=os.environ.get("PGHOST", "localhost"),
-            port=os.environ.get("PGPORT", "5435"),
-            dbname=os.environ.get("PGDATABASE", "edop"),
-            user=os.environ.get("PGUSER", "postgres"),
-            password=os.environ.get("PGPASSWORD", ""),
-        )
         with conn.cursor() as cur:
             cur.execute("""
                 SELECT
@@ -643,25 +612,12 @@ def similar(id_no: int, limit: int = 5):
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 
 @router.get("/similar-text")
-def similar_text(id_no: int, limit: int = 5):
+def similar_text(id_no: int, limit: int = 5, conn: psycopg.Connection = Depends(get_db)):
     """Return most similar WH sites by text/semantic similarity."""
-    import psycopg
-    import os
-
     try:
-        conn = psycopg.connect(
-            host=os.environ.get("PGHOST", "localhost"),
-            port=os.environ.get("PGPORT", "5435"),
-            dbname=os.environ.get("PGDATABASE", "edop"),
-            user=os.environ.get("PGUSER", "postgres"),
-            password=os.environ.get("PGPASSWORD", ""),
-        )
         with conn.cursor() as cur:
             cur.execute("""
                 SELECT
@@ -695,85 +651,70 @@ def similar_text(id_no: int, limit: int = 5):
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 
 # -----------------------
 # WH Cities (258) endpoints
 # -----------------------
 
-@router.get("/whc-cities")
-def whc_cities():
-    """Return World Heritage Cities with coordinates and cluster info (excludes 4 without basin data)."""
-    import psycopg
-    import os
+_WHC_CITIES_SQL = """
+    SELECT
+        c.id,
+        c.city,
+        c.country,
+        c.region,
+        ST_X(c.geom) as lon,
+        ST_Y(c.geom) as lat,
+        ec.cluster_id as env_cluster,
+        ec.cluster_label as env_cluster_label
+    FROM gaz.wh_cities c
+    LEFT JOIN whc_clusters ec ON ec.city_id = c.id
+    WHERE c.geom IS NOT NULL
+      AND c.basin_id IS NOT NULL
+    ORDER BY c.region, c.country, c.city
+"""
+
+
+def _whc_city(row: Tuple) -> Dict[str, Any]:
+    return {
+        "id": row[0],
+        "city": row[1],
+        "country": row[2],
+        "region": row[3],
+        "location": {
+            "type": "Point",
+            "coordinates": [float(row[4]), float(row[5])]
+        } if row[4] and row[5] else None,
+        "env_cluster": row[6],
+        "env_cluster_label": row[7]
+    }
+
 
+@router.get("/whc-cities", dependencies=[Depends(_WHC_VERSION)])
+def whc_cities(request: Request, format: Optional[str] = None, conn: psycopg.Connection = Depends(get_db)):
+    """Return World Heritage Cities with coordinates and cluster info (excludes 4 without basin data).
+
+    format=ndjson (or Accept: application/x-ndjson) streams one city per line.
+    """
     try:
-        conn = psycopg.connect(
-            host=os.environ.get("PGHOST", "localhost"),
-            port=os.environ.get("PGPORT", "5435"),
-            dbname=os.environ.get("PGDATABASE", "edop"),
-            user=os.environ.get("PGUSER", "postgres"),
-            password=os.environ.get("PGPASSWORD", ""),
-        )
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT
-                    c.id,
-                    c.city,
-                    c.country,
-                    c.region,
-                    ST_X(c.geom) as lon,
-                    ST_Y(c.geom) as lat,
-                    ec.cluster_id as env_cluster,
-                    ec.cluster_label as env_cluster_label
-                FROM gaz.wh_cities c
-                LEFT JOIN whc_clusters ec ON ec.city_id = c.id
-                WHERE c.geom IS NOT NULL
-                  AND c.basin_id IS NOT NULL
-                ORDER BY c.region, c.country, c.city
-            """)
+        if wants_ndjson(request, format):
+            return vary_on_accept(ndjson_response(iter_rows(conn, _WHC_CITIES_SQL, to_item=_whc_city,
+                                                            name="whc_cities")))
 
-            cities = []
-            for row in cur.fetchall():
-                cities.append({
-                    "id": row[0],
-                    "city": row[1],
-                    "country": row[2],
-                    "region": row[3],
-                    "location": {
-                        "type": "Point",
-                        "coordinates": [float(row[4]), float(row[5])]
-                    } if row[4] and row[5] else None,
-                    "env_cluster": row[6],
-                    "env_cluster_label": row[7]
-                })
+        with conn.cursor() as cur:
+            cur.execute(_WHC_CITIES_SQL)
+            cities = [_whc_city(row) for row in cur.fetchall()]
 
-            return {"count": len(cities), "cities": cities}
+        return vary_on_accept(json_response({"count": len(cities), "cities": cities}))
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 
 @router.get("/whc-similar")
-def whc_similar(city_id: int, limit: int = 5):
+def whc_similar(city_id: int, limit: int = 5, conn: psycopg.Connection = Depends(get_db)):
     """Return most similar WH cities by environmental signature."""
-    import psycopg
-    import os
-
     try:
-        conn = psycopg.connect(
-            host=os.environ.get("PGHOST", "localhost"),
-            port=os.environ.get("PGPORT", "5435"),
-            dbname=os.environ.get("PGDATABASE", "edop"),
-            user=os.environ.get("PGUSER", "postgres"),
-            password=os.environ.get("PGPASSWORD", ""),
-        )
         with conn.cursor() as cur:
             # whc_similarity stores upper triangle (city_a < city_b)
             # Need to query both directions
@@ -822,29 +763,16 @@ def whc_similar(city_id: int, limit: int = 5):
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 
 @router.get("/whc-similar-env-by-coord")
-def whc_similar_env_by_coord(lon: float, lat: float, limit: int = 5):
+def whc_similar_env_by_coord(lon: float, lat: float, limit: int = 5, conn: psycopg.Connection = Depends(get_db)):
     """Return most similar WH cities by environmental signature for any coordinate.
 
-    Uses basin-level PCA vectors (pgvector) to find WH cities in environmentally
-    similar basins to the input point.
+    Uses basin-level PCA vectors to find WH cities in environmentally similar
+    basins to the input point (see app/db/whc_vectors.py).
     """
-    import psycopg
-    import os
-
     try:
-        conn = psycopg.connect(
-            host=os.environ.get("PGHOST", "localhost"),
-            port=os.environ.get("PGPORT", "5435"),
-            dbname=os.environ.get("PGDATABASE", "edop"),
-            user=os.environ.get("PGUSER", "postgres"),
-            password=os.environ.get("PGPASSWORD", ""),
-        )
         with conn.cursor() as cur:
             # First, find which basin contains this point
             cur.execute("""
@@ -858,127 +786,33 @@ def whc_similar_env_by_coord(lon: float, lat: float, limit: int = 5):
 
             source_basin_id = row[0]
 
-            # Check if source basin has PCA vector
-            cur.execute("SELECT 1 FROM basin08_pca WHERE basin_id = %s", (source_basin_id,))
-            if not cur.fetchone():
-                return {"error": "Basin has no PCA vector", "similar": []}
+        # Distances to every WH city basin, percentile stats and ranking in one
+        # vectorized pass over the cached WH city vector block
+        source_vec = whc_vectors.source_vector(conn, source_basin_id)
+        if source_vec is None:
+            return {"error": "Basin has no PCA vector", "similar": []}
 
-            # Get distance distribution stats (source basin to all WH city basins)
-            cur.execute("""
-                WITH whc_basin_distances AS (
-                    SELECT p1.pca <-> p2.pca AS distance
-                    FROM basin08_pca p1, basin08_pca p2
-                    JOIN gaz.wh_cities c ON c.basin_id = p2.basin_id
-                    WHERE p1.basin_id = %s
-                      AND p2.basin_id != %s
-                      AND c.basin_id IS NOT NULL
-                )
-                SELECT
-                    MIN(distance),
-                    PERCENTILE_CONT(0.25) WITHIN GROUP (ORDER BY distance),
-                    PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY distance),
-                    PERCENTILE_CONT(0.75) WITHIN GROUP (ORDER BY distance),
-                    MAX(distance),
-                    COUNT(*)
-                FROM whc_basin_distances
-            """, (source_basin_id, source_basin_id))
-            stats_row = cur.fetchone()
-            dist_stats = {
-                "min": round(float(stats_row[0]), 4) if stats_row[0] else None,
-                "p25": round(float(stats_row[1]), 4) if stats_row[1] else None,
-                "median": round(float(stats_row[2]), 4) if stats_row[2] else None,
-                "p75": round(float(stats_row[3]), 4) if stats_row[3] else None,
-                "max": round(float(stats_row[4]), 4) if stats_row[4] else None,
-                "count": int(stats_row[5]) if stats_row[5] else 0
-            }
+        dist_stats, results = whc_vectors.get_block(conn).rank(source_basin_id, source_vec, limit)
 
-            # Find WH cities in the most similar basins by PCA vector distance
-            # Also compute percentile rank for each result
-            cur.execute("""
-                WITH whc_basin_distances AS (
-                    SELECT
-                        c.id as city_id,
-                        p1.pca <-> p2.pca AS distance
-                    FROM basin08_pca p1, basin08_pca p2
-                    JOIN gaz.wh_cities c ON c.basin_id = p2.basin_id
-                    WHERE p1.basin_id = %s
-                      AND p2.basin_id != %s
-                      AND c.basin_id IS NOT NULL
-                ),
-                ranked AS (
-                    SELECT
-                        city_id,
-                        distance,
-                        PERCENT_RANK() OVER (ORDER BY distance) as pct_rank
-                    FROM whc_basin_distances
-                )
-                SELECT
-                    c.id,
-                    c.city,
-                    c.country,
-                    c.region,
-                    ST_X(c.geom) as lon,
-                    ST_Y(c.geom) as lat,
-                    ROUND(r.distance::numeric, 4) as distance,
-                    ROUND((r.pct_rank * 100)::numeric, 1) as percentile,
-                    ec.cluster_id as env_cluster,
-                    ec.cluster_label as env_cluster_label
-                FROM ranked r
-                JOIN gaz.wh_cities c ON c.id = r.city_id
-                LEFT JOIN whc_clusters ec ON ec.city_id = c.id
-                ORDER BY r.distance ASC
-                LIMIT %s
-            """, (source_basin_id, source_basin_id, limit))
-
-            results = []
-            for row in cur.fetchall():
-                results.append({
-                    "id": row[0],
-                    "city": row[1],
-                    "country": row[2],
-                    "region": row[3],
-                    "location": {
-                        "type": "Point",
-                        "coordinates": [float(row[4]), float(row[5])]
-                    } if row[4] and row[5] else None,
-                    "distance": float(row[6]) if row[6] is not None else None,
-                    "percentile": float(row[7]) if row[7] is not None else None,
-                    "env_cluster": row[8],
-                    "env_cluster_label": row[9]
-                })
-
-            return {
-                "source_basin_id": source_basin_id,
-                "count": len(results),
-                "dist_stats": dist_stats,
-                "similar": results
-            }
+        return {
+            "source_basin_id": source_basin_id,
+            "count": len(results),
+            "dist_stats": dist_stats,
+            "similar": results
+        }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 
 @router.get("/whc-similar-text")
-def whc_similar_text(city_id: int, band: str = "composite", limit: int = 5):
+def whc_similar_text(city_id: int, band: str = "composite", limit: int = 5, conn: psycopg.Connection = Depends(get_db)):
     """Return most similar WH cities by text/semantic similarity."""
-    import psycopg
-    import os
-
     valid_bands = ['history', 'environment', 'culture', 'modern', 'composite']
     if band not in valid_bands:
         raise HTTPException(status_code=400, detail=f"Invalid band. Must be one of: {valid_bands}")
 
     try:
-        conn = psycopg.connect(
-            host=os.environ.get("PGHOST", "localhost"),
-            port=os.environ.get("PGPORT", "5435"),
-            dbname=os.environ.get("PGDATABASE", "edop"),
-            user=os.environ.get("PGUSER", "postgres"),
-            password=os.environ.get("PGPASSWORD", ""),
-        )
         with conn.cursor() as cur:
             cur.execute("""
                 SELECT
@@ -1015,25 +849,12 @@ def whc_similar_text(city_id: int, band: str = "composite", limit: int = 5):
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 
 @router.get("/whc-summaries")
-def whc_summaries(city_id: int):
+def whc_summaries(city_id: int, conn: psycopg.Connection = Depends(get_db)):
     """Return band summaries for a WH city."""
-    import psycopg
-    import os
-
     try:
-        conn = psycopg.connect(
-            host=os.environ.get("PGHOST", "localhost"),
-            port=os.environ.get("PGPORT", "5435"),
-            dbname=os.environ.get("PGDATABASE", "edop"),
-            user=os.environ.get("PGUSER", "postgres"),
-            password=os.environ.get("PGPASSWORD", ""),
-        )
         with conn.cursor() as cur:
             # Get city name
             cur.execute("SELECT city, country FROM gaz.wh_cities WHERE id = %s", (city_id,))
@@ -1072,29 +893,16 @@ def whc_summaries(city_id: int):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 
 # -----------------------
 # Basin Cluster endpoints
 # -----------------------
 
-@router.get("/basin-clusters")
-def basin_clusters():
+@router.get("/basin-clusters", dependencies=[Depends(_BASIN_CLUSTERS_VERSION)])
+def basin_clusters(conn: psycopg.Connection = Depends(get_db)):
     """Return all basin clusters with basin and city counts."""
-    import psycopg
-    import os
-
     try:
-        conn = psycopg.connect(
-            host=os.environ.get("PGHOST", "localhost"),
-            port=os.environ.get("PGPORT", "5435"),
-            dbname=os.environ.get("PGDATABASE", "edop"),
-            user=os.environ.get("PGUSER", "postgres"),
-            password=os.environ.get("PGPASSWORD", ""),
-        )
         with conn.cursor() as cur:
             cur.execute("""
                 SELECT
@@ -1120,25 +928,12 @@ def basin_clusters():
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 
-@router.get("/basin-clusters/{cluster_id}/cities")
-def basin_cluster_cities(cluster_id: int):
+@router.get("/basin-clusters/{cluster_id}/cities", dependencies=[Depends(_BASIN_CLUSTERS_VERSION)])
+def basin_cluster_cities(cluster_id: int, conn: psycopg.Connection = Depends(get_db)):
     """Return cities in basins of a given cluster."""
-    import psycopg
-    import os
-
     try:
-        conn = psycopg.connect(
-            host=os.environ.get("PGHOST", "localhost"),
-            port=os.environ.get("PGPORT", "5435"),
-            dbname=os.environ.get("PGDATABASE", "edop"),
-            user=os.environ.get("PGUSER", "postgres"),
-            password=os.environ.get("PGPASSWORD", ""),
-        )
         with conn.cursor() as cur:
             cur.execute("""
                 SELECT
@@ -1173,34 +968,130 @@ def basin_cluster_cities(cluster_id: int):
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if 'conn' in locals():
-            conn.close()
+
+
+# Nearest basins by pgvector distance (self-join; fallback when neither the
+# precomputed neighbours nor the in-process index can answer)
+_SIMILAR_BASINS_SQL = """
+    SELECT
+        p2.basin_id,
+        p1.pca <-> p2.pca AS distance
+    FROM basin08_pca p1, basin08_pca p2
+    WHERE p1.basin_id = %(basin_id)s
+      AND p2.basin_id != %(basin_id)s
+    ORDER BY p1.pca <-> p2.pca
+    LIMIT %(n_basins)s
+"""
+
+# Nearest basins already ranked in-process (app/db/basin_neighbours.py)
+_SIMILAR_BASINS_ANN_SQL = """
+    SELECT * FROM unnest(%(basin_ids)s::int[], %(distances)s::float8[]) AS sb(basin_id, distance)
+"""
+
+
+@router.get("/basin-similar")
+def basin_similar(basin_id: int, limit: int = 10, conn: psycopg.Connection = Depends(get_db)):
+    """Return the environmentally nearest basins to a basin by PCA vector distance.
+
+    Read by primary key from the precomputed neighbour arrays
+    (scripts/build_basin_neighbours.py) when available, else from the
+    in-process PCA index, else computed with pgvector.
+    """
+    if limit < 1:
+        limit = 1
+    elif limit > 100:
+        limit = 100
+
+    try:
+        source, neighbours = basin_neighbours.similar_basins(basin_id, limit)
+        with conn.cursor() as cur:
+            if source is None:
+                source = "sql"
+                cur.execute(_SIMILAR_BASINS_SQL, {"basin_id": basin_id, "n_basins": limit})
+                rows = cur.fetchall()
+                neighbours = ([r[0] for r in rows], [r[1] for r in rows]) if rows else None
+            if neighbours is None:
+                return {"error": "Basin has no PCA vector", "similar": []}
+
+            ids, distances = [int(b) for b in neighbours[0]], [float(d) for d in neighbours[1]]
+            cur.execute("SELECT id, cluster_id FROM basin08 WHERE id = ANY(%s)", (ids,))
+            clusters = dict(cur.fetchall())
+
+        return {
+            "basin_id": basin_id,
+            "source": source,
+            "count": len(ids),
+            "similar": [
+                {"basin_id": b, "distance": round(d, 4), "cluster_id": clusters.get(b)}
+                for b, d in zip(ids, distances)
+            ]
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 
 # -----------------------
 # Gazetteer endpoints
 # -----------------------
 
+# How many nearest basins to draw places from (one place per basin)
+_GAZ_SIMILAR_BASINS = 500
+
+# One representative place per similar basin (sql/mv_gaz_basin_rep.sql): a
+# primary-key join, deterministic
+_GAZ_SIMILAR_SQL = """
+    WITH similar_basins AS ({similar_basins})
+    SELECT r.gaz_id, r.title, r.source, r.ccodes, r.lon, r.lat,
+           ROUND(sb.distance::numeric, 4) as distance, r.cluster_id
+    FROM similar_basins sb
+    JOIN gaz.mv_gaz_basin_rep r ON r.basin_id = sb.basin_id
+    WHERE r.gaz_id != %(gaz_id)s
+    ORDER BY sb.distance, sb.basin_id
+    LIMIT %(limit)s
+"""
+
+# Seeded sampling: a different place per basin for each seed, reproducible
+_GAZ_SIMILAR_SEEDED_SQL = """
+    WITH similar_basins AS ({similar_basins}),
+    ranked_places AS (
+        SELECT
+            g.id, g.title, g.source, g.ccodes, g.lon, g.lat,
+            sb.distance,
+            sb.basin_id,
+            b.cluster_id,
+            ROW_NUMBER() OVER (
+                PARTITION BY g.basin_id ORDER BY md5(g.id::text || ':' || %(seed)s::text), g.id
+            ) as rn
+        FROM gaz.edop_gaz g
+        JOIN similar_basins sb ON sb.basin_id = g.basin_id
+        JOIN basin08 b ON b.id = g.basin_id
+        WHERE g.id != %(gaz_id)s
+          AND g.lon IS NOT NULL
+    )
+    SELECT id, title, source, ccodes, lon, lat,
+           ROUND(distance::numeric, 4) as distance, cluster_id
+    FROM ranked_places
+    WHERE rn = 1
+    ORDER BY distance, basin_id
+    LIMIT %(limit)s
+"""
+
+
 @router.get("/gaz-similar")
-def gaz_similar(gaz_id: int, limit: int = 10):
-    """Find environmentally similar gazetteer places using PCA vector distance."""
-    import psycopg
-    import os
+def gaz_similar(gaz_id: int, limit: int = 10, seed: Optional[int] = None,
+                conn: psycopg.Connection = Depends(get_db)):
+    """Find environmentally similar gazetteer places using PCA vector distance.
 
+    One place per similar basin: its representative place (stable) by default,
+    or a per-seed sample of the basin's places when `seed` is given.
+    """
     if limit < 1:
         limit = 1
     elif limit > 25:
         limit = 25
 
     try:
-        conn = psycopg.connect(
-            host=os.environ.get("PGHOST", "localhost"),
-            port=os.environ.get("PGPORT", "5435"),
-            dbname=os.environ.get("PGDATABASE", "edop"),
-            user=os.environ.get("PGUSER", "postgres"),
-            password=os.environ.get("PGPASSWORD", ""),
-        )
         with conn.cursor() as cur:
             # Get the source place's basin
             cur.execute("""
@@ -1217,43 +1108,28 @@ def gaz_similar(gaz_id: int, limit: int = 10):
             if source_basin_id is None:
                 return {"error": "Place has no basin assignment", "similar": []}
 
-            # Check if source basin has PCA vector
-            cur.execute("SELECT 1 FROM basin08_pca WHERE basin_id = %s", (source_basin_id,))
-            if not cur.fetchone():
-                return {"error": "Basin has no PCA vector", "similar": []}
+            params = {"basin_id": source_basin_id, "n_basins": _GAZ_SIMILAR_BASINS,
+                      "gaz_id": gaz_id, "limit": limit, "seed": seed}
+            template = _GAZ_SIMILAR_SQL if seed is None else _GAZ_SIMILAR_SEEDED_SQL
 
             # Find places in the most similar basins by PCA vector distance
             # We find more similar basins than needed, then pick places from them
-            cur.execute("""
-                WITH similar_basins AS (
-                    SELECT
-                        p2.basin_id,
-                        p1.pca <-> p2.pca AS distance
-                    FROM basin08_pca p1, basin08_pca p2
-                    WHERE p1.basin_id = %s
-                      AND p2.basin_id != %s
-                    ORDER BY p1.pca <-> p2.pca
-                    LIMIT 500
-                ),
-                ranked_places AS (
-                    SELECT
-                        g.id, g.title, g.source, g.ccodes, g.lon, g.lat,
-                        sb.distance,
-                        b.cluster_id,
-                        ROW_NUMBER() OVER (PARTITION BY g.basin_id ORDER BY random()) as rn
-                    FROM gaz.edop_gaz g
-                    JOIN similar_basins sb ON sb.basin_id = g.basin_id
-                    JOIN basin08 b ON b.id = g.basin_id
-                    WHERE g.id != %s
-                      AND g.lon IS NOT NULL
-                )
-                SELECT id, title, source, ccodes, lon, lat,
-                       ROUND(distance::numeric, 4) as distance, cluster_id
-                FROM ranked_places
-                WHERE rn = 1
-                ORDER BY distance
-                LIMIT %s
-            """, (source_basin_id, source_basin_id, gaz_id, limit))
+            ranked_by, neighbours = basin_neighbours.similar_basins(source_basin_id, _GAZ_SIMILAR_BASINS)
+            if ranked_by is not None:
+                if neighbours is None:
+                    return {"error": "Basin has no PCA vector", "similar": []}
+                basin_ids, distances = neighbours
+                params["basin_ids"] = basin_ids.tolist()
+                params["distances"] = distances.tolist()
+                sql = template.format(similar_basins=_SIMILAR_BASINS_ANN_SQL)
+            else:
+                # Check if source basin has PCA vector
+                cur.execute("SELECT 1 FROM basin08_pca WHERE basin_id = %s", (source_basin_id,))
+                if not cur.fetchone():
+                    return {"error": "Basin has no PCA vector", "similar": []}
+                sql = template.format(similar_basins=_SIMILAR_BASINS_SQL)
+
+            cur.execute(sql, params)
 
             results = []
             for row in cur.fetchall():
@@ -1276,17 +1152,38 @@ def gaz_similar(gaz_id: int, limit: int = 10):
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if 'conn' in locals():
-            conn.close()
+
+
+# Case-insensitive prefix search on title
+_GAZ_SUGGEST_SQL = """
+    SELECT id, source, source_id, title, ccodes, lon, lat
+    FROM gaz.edop_gaz
+    WHERE title ILIKE %s
+    ORDER BY title
+    LIMIT %s
+"""
+
+
+def _gaz_suggest_row(row: Tuple) -> Dict[str, Any]:
+    return {
+        "id": row[0],
+        "source": row[1],
+        "source_id": row[2],
+        "title": row[3],
+        "ccodes": row[4],  # already an array
+        "lon": float(row[5]) if row[5] else None,
+        "lat": float(row[6]) if row[6] else None,
+    }
 
 
 @router.get("/gaz-suggest")
 def gaz_suggest(q: str, limit: int = 10):
-    """Search the edop_gaz gazetteer for autocomplete suggestions."""
-    import psycopg
-    import os
+    """Search the edop_gaz gazetteer for autocomplete suggestions.
 
+    Served by the in-memory suggest index (ranked, diacritics-insensitive) when
+    enabled and built; otherwise an alphabetical title ILIKE prefix query. A
+    pooled connection is only taken for the SQL fallback.
+    """
     q = (q or "").strip()
     if not q or len(q) < 3:
         return {"results": []}
@@ -1296,63 +1193,27 @@ def gaz_suggest(q: str, limit: int = 10):
     elif limit > 25:
         limit = 25
 
-    try:
-        conn = psycopg.connect(
-            host=os.environ.get("PGHOST", "localhost"),
-            port=os.environ.get("PGPORT", "5435"),
-            dbname=os.environ.get("PGDATABASE", "edop"),
-            user=os.environ.get("PGUSER", "postgres"),
-            password=os.environ.get("PGPASSWORD", ""),
-        )
-        with conn.cursor() as cur:
-            # Case-insensitive prefix search on title
-            cur.execute("""
-                SELECT id, source, source_id, title, ccodes, lon, lat
-                FROM gaz.edop_gaz
-                WHERE title ILIKE %s
-                ORDER BY title
-                LIMIT %s
-            """, (q + '%', limit))
-
-            results = []
-            for row in cur.fetchall():
-                results.append({
-                    "id": row[0],
-                    "source": row[1],
-                    "source_id": row[2],
-                    "title": row[3],
-                    "ccodes": row[4],  # already an array
-                    "lon": float(row[5]) if row[5] else None,
-                    "lat": float(row[6]) if row[6] else None,
-                })
+    ready, rows = gaz_suggest_index.suggest(q, limit)
+    if ready:
+        return {"results": [_gaz_suggest_row(row) for row in rows]}
 
-            return {"results": results}
+    try:
+        with get_pool().connection() as conn, conn.cursor() as cur:
+            cur.execute(_GAZ_SUGGEST_SQL, (q + '%', limit))
+            return {"results": [_gaz_suggest_row(row) for row in cur.fetchall()]}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 
 # -----------------------
 # Ecoregion Hierarchy endpoints
 # -----------------------
 
-@router.get("/eco/realms")
-def eco_realms():
+@router.get("/eco/realms", dependencies=[Depends(_ECO_VERSION)])
+def eco_realms(conn: psycopg.Connection = Depends(get_db)):
     """List all realms (top level of hierarchy)."""
-    import psycopg
-    import os
-
     try:
-        conn = psycopg.connect(
-            host=os.environ.get("PGHOST", "localhost"),
-            port=os.environ.get("PGPORT", "5435"),
-            dbname=os.environ.get("PGDATABASE", "edop"),
-            user=os.environ.get("PGUSER", "postgres"),
-            password=os.environ.get("PGPASSWORD", ""),
-        )
         with conn.cursor() as cur:
             cur.execute("""
                 SELECT r.realm, r.biogeorelm, COUNT(s.subrealmid) as subrealm_count
@@ -1372,25 +1233,12 @@ def eco_realms():
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 
-@router.get("/eco/subrealms")
-def eco_subrealms(realm: str):
+@router.get("/eco/subrealms", dependencies=[Depends(_ECO_VERSION)])
+def eco_subrealms(realm: str, conn: psycopg.Connection = Depends(get_db)):
     """List subrealms within a realm."""
-    import psycopg
-    import os
-
     try:
-        conn = psycopg.connect(
-            host=os.environ.get("PGHOST", "localhost"),
-            port=os.environ.get("PGPORT", "5435"),
-            dbname=os.environ.get("PGDATABASE", "edop"),
-            user=os.environ.get("PGUSER", "postgres"),
-            password=os.environ.get("PGPASSWORD", ""),
-        )
         with conn.cursor() as cur:
             cur.execute("""
                 SELECT s.subrealmid, s.subrealm_n, COUNT(b.bioregions) as bioregion_count
@@ -1411,25 +1259,12 @@ def eco_subrealms(realm: str):
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 
-@router.get("/eco/bioregions")
-def eco_bioregions(subrealm_id: int):
+@router.get("/eco/bioregions", dependencies=[Depends(_ECO_VERSION)])
+def eco_bioregions(subrealm_id: int, conn: psycopg.Connection = Depends(get_db)):
     """List bioregions within a subrealm."""
-    import psycopg
-    import os
-
     try:
-        conn = psycopg.connect(
-            host=os.environ.get("PGHOST", "localhost"),
-            port=os.environ.get("PGPORT", "5435"),
-            dbname=os.environ.get("PGDATABASE", "edop"),
-            user=os.environ.get("PGUSER", "postgres"),
-            password=os.environ.get("PGPASSWORD", ""),
-        )
         with conn.cursor() as cur:
             # Get subrealm name for context
             cur.execute('SELECT subrealm_n FROM gaz."Subrealm2023" WHERE subrealmid = %s', (subrealm_id,))
@@ -1462,25 +1297,12 @@ def eco_bioregions(subrealm_id: int):
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 
-@router.get("/eco/ecoregions")
-def eco_ecoregions(bioregion: str):
+@router.get("/eco/ecoregions", dependencies=[Depends(_ECO_VERSION)])
+def eco_ecoregions(bioregion: str, conn: psycopg.Connection = Depends(get_db)):
     """List ecoregions within a bioregion."""
-    import psycopg
-    import os
-
     try:
-        conn = psycopg.connect(
-            host=os.environ.get("PGHOST", "localhost"),
-            port=os.environ.get("PGPORT", "5435"),
-            dbname=os.environ.get("PGDATABASE", "edop"),
-            user=os.environ.get("PGUSER", "postgres"),
-            password=os.environ.get("PGPASSWORD", ""),
-        )
         with conn.cursor() as cur:
             cur.execute("""
                 SELECT e.eco_id, e.eco_name, e.biome_name, e.realm
@@ -1500,260 +1322,205 @@ def eco_ecoregions(bioregion: str):
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 
-@router.get("/eco/realms/geom")
-def eco_realms_geom():
-    """Get GeoJSON FeatureCollection of all realm geometries."""
-    import psycopg
-    import os
-
+# Eco geometry endpoints: Postgres builds each GeoJSON Feature (or document)
+# and the bytes are spliced into the response unparsed (see
+# app/api/responses.py); geometries never become Python objects.
+
+# Features per server-side cursor fetch; an ecoregion multipolygon can be MBs
+_GEOM_ITERSIZE = 16
+
+_REALMS_FEATURES_SQL = """
+    SELECT json_build_object(
+        'type', 'Feature',
+        'properties', json_build_object('name', realm, 'id', biogeorelm),
+        'geometry', ST_AsGeoJSON(geom)::json
+    )
+    FROM gaz."Realm2023"
+    ORDER BY realm
+"""
+
+_SUBREALMS_FEATURES_SQL = """
+    SELECT json_build_object(
+        'type', 'Feature',
+        'properties', json_build_object('id', subrealmid, 'name', subrealm_n),
+        'geometry', ST_AsGeoJSON(geom)::json
+    )
+    FROM gaz."Subrealm2023"
+    WHERE biogeorelm = %s
+    ORDER BY subrealm_n
+"""
+
+# Joined with bioregion_meta for titles: title if available, else code
+_BIOREGIONS_FEATURES_SQL = """
+    SELECT json_build_object(
+        'type', 'Feature',
+        'properties', json_build_object(
+            'id', b.bioregions,
+            'name', coalesce(nullif(m.title, ''), b.bioregions::text),
+            'code', b.bioregions
+        ),
+        'geometry', ST_AsGeoJSON(b.geom)::json
+    )
+    FROM gaz."Bioregions2023" b
+    LEFT JOIN gaz.bioregion_meta m ON m.bioregion_id = b.bioregions
+    WHERE b.subrealm_id = %s
+    ORDER BY b.bioregions
+"""
+
+_ECOREGIONS_FEATURES_SQL = """
+    SELECT json_build_object(
+        'type', 'Feature',
+        'properties', json_build_object('id', eco_id, 'name', eco_name),
+        'geometry', ST_AsGeoJSON(geom)::json
+    )
+    FROM gaz."Ecoregions2017"
+    WHERE bioregion = %s
+    ORDER BY eco_name
+"""
+
+
+def _features_response(sql: str, params: Optional[Tuple], name: str, ndjson: bool = False):
+    """Stream Features from PostGIS on a pooled connection taken here, not via Depends(get_db).
+
+    The geom routes try the prebuilt files first, so only this fallback needs
+    the database; the connection is held until the stream ends (or fails).
+    """
+    stack = ExitStack()
+    conn = stack.enter_context(contextmanager(get_db)())
     try:
-        conn = psycopg.connect(
-            host=os.environ.get("PGHOST", "localhost"),
-            port=os.environ.get("PGPORT", "5435"),
-            dbname=os.environ.get("PGDATABASE", "edop"),
-            user=os.environ.get("PGUSER", "postgres"),
-            password=os.environ.get("PGPASSWORD", ""),
-        )
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT realm, biogeorelm, ST_AsGeoJSON(geom)::json
-                FROM gaz."Realm2023"
-                ORDER BY realm
-            """)
-            rows = cur.fetchall()
+        features = iter_rows(conn, sql, params, to_item=lambda row: row[0], name=name,
+                             itersize=_GEOM_ITERSIZE, raw_json=True)
+    except BaseException:
+        stack.__exit__(*sys.exc_info())
+        raise
 
-        features = []
-        for row in rows:
-            features.append({
-                "type": "Feature",
-                "properties": {"name": row[0], "id": row[1]},
-                "geometry": row[2]
-            })
+    def stream():
+        try:
+            yield from features
+        except BaseException:
+            stack.__exit__(*sys.exc_info())
+            raise
+        stack.close()
 
-        return {
-            "type": "FeatureCollection",
-            "features": features
-        }
+    return raw_ndjson_response(stream()) if ndjson else feature_collection_response(stream())
+
+
+@router.get("/eco/realms/geom", dependencies=[Depends(_ECO_VERSION)])
+def eco_realms_geom(request: Request):
+    """Get GeoJSON FeatureCollection of all realm geometries."""
+    prebuilt = eco_static.serve("realms", request)
+    if prebuilt is not None:
+        return prebuilt
 
+    try:
+        return _features_response(_REALMS_FEATURES_SQL, None, "realms_geom")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 
-@router.get("/eco/subrealms/geom")
-def eco_subrealms_geom(realm: str):
+@router.get("/eco/subrealms/geom", dependencies=[Depends(_ECO_VERSION)])
+def eco_subrealms_geom(realm: str, request: Request):
     """Get GeoJSON FeatureCollection of subrealm geometries within a realm."""
-    import psycopg
-    import os
+    prebuilt = eco_static.serve(f"subrealms/{realm}", request)
+    if prebuilt is not None:
+        return prebuilt
 
     try:
-        conn = psycopg.connect(
-            host=os.environ.get("PGHOST", "localhost"),
-            port=os.environ.get("PGPORT", "5435"),
-            dbname=os.environ.get("PGDATABASE", "edop"),
-            user=os.environ.get("PGUSER", "postgres"),
-            password=os.environ.get("PGPASSWORD", ""),
-        )
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT subrealmid, subrealm_n, ST_AsGeoJSON(geom)::json
-                FROM gaz."Subrealm2023"
-                WHERE biogeorelm = %s
-                ORDER BY subrealm_n
-            """, (realm,))
-            rows = cur.fetchall()
-
-        features = []
-        for row in rows:
-            features.append({
-                "type": "Feature",
-                "properties": {"id": row[0], "name": row[1]},
-                "geometry": row[2]
-            })
-
-        return {
-            "type": "FeatureCollection",
-            "features": features
-        }
-
+        return _features_response(_SUBREALMS_FEATURES_SQL, (realm,), "subrealms_geom")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 
-@router.get("/eco/bioregions/geom")
-def eco_bioregions_geom(subrealm_id: int):
+@router.get("/eco/bioregions/geom", dependencies=[Depends(_ECO_VERSION)])
+def eco_bioregions_geom(subrealm_id: int, request: Request):
     """Get GeoJSON FeatureCollection of bioregion geometries within a subrealm."""
-    import psycopg
-    import os
+    prebuilt = eco_static.serve(f"bioregions/{subrealm_id}", request)
+    if prebuilt is not None:
+        return prebuilt
 
     try:
-        conn = psycopg.connect(
-            host=os.environ.get("PGHOST", "localhost"),
-            port=os.environ.get("PGPORT", "5435"),
-            dbname=os.environ.get("PGDATABASE", "edop"),
-            user=os.environ.get("PGUSER", "postgres"),
-            password=os.environ.get("PGPASSWORD", ""),
-        )
-        with conn.cursor() as cur:
-            # Join with bioregion_meta for titles
-            cur.execute("""
-                SELECT b.bioregions, ST_AsGeoJSON(b.geom)::json, m.title
-                FROM gaz."Bioregions2023" b
-                LEFT JOIN gaz.bioregion_meta m ON m.bioregion_id = b.bioregions
-                WHERE b.subrealm_id = %s
-                ORDER BY b.bioregions
-            """, (subrealm_id,))
-            rows = cur.fetchall()
-
-        features = []
-        for row in rows:
-            features.append({
-                "type": "Feature",
-                "properties": {
-                    "id": row[0],
-                    "name": row[2] if row[2] else row[0],  # Title if available, else code
-                    "code": row[0]
-                },
-                "geometry": row[1]
-            })
-
-        return {
-            "type": "FeatureCollection",
-            "features": features
-        }
-
+        return _features_response(_BIOREGIONS_FEATURES_SQL, (subrealm_id,), "bioregions_geom")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 
-@router.get("/eco/ecoregions/geom")
-def eco_ecoregions_geom(bioregion: str):
-    """Get GeoJSON FeatureCollection of ecoregion geometries within a bioregion."""
-    import psycopg
-    import os
+@router.get("/eco/ecoregions/geom", dependencies=[Depends(_ECO_NEGOTIATED_VERSION)])
+def eco_ecoregions_geom(bioregion: str, request: Request, format: Optional[str] = None):
+    """Get GeoJSON FeatureCollection of ecoregion geometries within a bioregion.
+
+    format=ndjson (or Accept: application/x-ndjson) streams one Feature per line
+    straight from the database instead (the prebuilt files are not used).
+    """
+    ndjson = wants_ndjson(request, format)
+    if not ndjson:
+        prebuilt = eco_static.serve(f"ecoregions/{bioregion}", request)
+        if prebuilt is not None:
+            return vary_on_accept(prebuilt)
 
     try:
-        conn = psycopg.connect(
-            host=os.environ.get("PGHOST", "localhost"),
-            port=os.environ.get("PGPORT", "5435"),
-            dbname=os.environ.get("PGDATABASE", "edop"),
-            user=os.environ.get("PGUSER", "postgres"),
-            password=os.environ.get("PGPASSWORD", ""),
-        )
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT eco_id, eco_name, ST_AsGeoJSON(geom)::json
-                FROM gaz."Ecoregions2017"
-                WHERE bioregion = %s
-                ORDER BY eco_name
-            """, (bioregion,))
-            rows = cur.fetchall()
+        return vary_on_accept(_features_response(_ECOREGIONS_FEATURES_SQL, (bioregion,), "ecoregions_geom",
+                                                 ndjson=ndjson))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        features = []
-        for row in rows:
-            features.append({
-                "type": "Feature",
-                "properties": {"id": row[0], "name": row[1]},
-                "geometry": row[2]
-            })
 
-        return {
-            "type": "FeatureCollection",
-            "features": features
-        }
+# level -> (name column, table, key column, key type)
+_ECO_GEOM_LEVELS = {
+    "realm": ("realm", '"Realm2023"', "biogeorelm", str),
+    "subrealm": ("subrealm_n", '"Subrealm2023"', "subrealmid", int),
+    "bioregion": ("bioregions", '"Bioregions2023"', "bioregions", str),
+    "ecoregion": ("eco_name", '"Ecoregions2017"', "eco_id", int),
+}
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if 'conn' in locals():
-            conn.close()
+_ECO_GEOM_SQL = """
+    SELECT json_build_object(
+        'level', %(level)s::text,
+        'id', %(id)s::text,
+        'name', {name},
+        'geometry', ST_AsGeoJSON(geom)::json
+    )
+    FROM gaz.{table} WHERE {key} = %(key)s
+"""
 
 
-@router.get("/eco/geom")
-def eco_geom(level: str, id: str):
+@router.get("/eco/geom", dependencies=[Depends(_ECO_VERSION)])
+def eco_geom(level: str, id: str, conn: psycopg.Connection = Depends(get_db)):
     """Get GeoJSON geometry for a hierarchy level item."""
-    import psycopg
-    import os
-
     valid_levels = ['realm', 'subrealm', 'bioregion', 'ecoregion']
     if level not in valid_levels:
         raise HTTPException(status_code=400, detail=f"Invalid level. Must be one of: {valid_levels}")
 
     try:
-        conn = psycopg.connect(
-            host=os.environ.get("PGHOST", "localhost"),
-            port=os.environ.get("PGPORT", "5435"),
-            dbname=os.environ.get("PGDATABASE", "edop"),
-            user=os.environ.get("PGUSER", "postgres"),
-            password=os.environ.get("PGPASSWORD", ""),
-        )
+        name, table, key, key_type = _ECO_GEOM_LEVELS[level]
         with conn.cursor() as cur:
-            if level == 'realm':
-                cur.execute("""
-                    SELECT realm, ST_AsGeoJSON(geom)::json
-                    FROM gaz."Realm2023" WHERE biogeorelm = %s
-                """, (id,))
-            elif level == 'subrealm':
-                cur.execute("""
-                    SELECT subrealm_n, ST_AsGeoJSON(geom)::json
-                    FROM gaz."Subrealm2023" WHERE subrealmid = %s
-                """, (int(id),))
-            elif level == 'bioregion':
-                cur.execute("""
-                    SELECT bioregions, ST_AsGeoJSON(geom)::json
-                    FROM gaz."Bioregions2023" WHERE bioregions = %s
-                """, (id,))
-            elif level == 'ecoregion':
-                cur.execute("""
-                    SELECT eco_name, ST_AsGeoJSON(geom)::json
-                    FROM gaz."Ecoregions2017" WHERE eco_id = %s
-                """, (int(id),))
-
+            cur.adapters.register_loader("json", RawJSONLoader)
+            cur.execute(_ECO_GEOM_SQL.format(name=name, table=table, key=key),
+                        {"level": level, "id": id, "key": key_type(id)})
             row = cur.fetchone()
-            if not row:
-                return {"error": "Not found"}
 
-            return {
-                "level": level,
-                "id": id,
-                "name": row[0],
-                "geometry": row[1]
-            }
+        if not row:
+            return {"error": "Not found"}
+
+        return Response(content=row[0], media_type="application/json")
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 
-@router.get("/eco/wikitext")
-def eco_wikitext(eco_id: int):
+@router.get("/eco/wikitext", dependencies=[Depends(_ECO_WIKITEXT_VERSION)])
+def eco_wikitext(eco_id: int, conn: psycopg.Connection = Depends(get_db)):
     """Get Wikipedia summary and URL for an ecoregion."""
-    import psycopg
-    import os
-
     try:
-        conn = psycopg.connect(
-            host=os.environ.get("PGHOST", "localhost"),
-            port=os.environ.get("PGPORT", "5435"),
-            dbname=os.environ.get("PGDATABASE", "edop"),
-            user=os.environ.get("PGUSER", "postgres"),
-            password=os.environ.get("PGPASSWORD", ""),
-        )
         with conn.cursor() as cur:
             cur.execute("""
                 SELECT e.eco_name, w.summary, w.wiki_url
@@ -1775,137 +1542,22 @@ def eco_wikitext(eco_id: int):
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 
 # -----------------------
 # D-PLACE Societies
 # -----------------------
 
-@router.get("/societies")
-def societies():
-    """Return all D-PLACE societies with coordinates, bioregion, and cultural variables."""
-    import psycopg
-    import os
+@router.get("/societies", dependencies=[Depends(_SOCIETIES_VERSION)])
+def societies(request: Request):
+    """Return all D-PLACE societies with coordinates, bioregion, and cultural variables.
 
+    Served from the materialized summary (sql/mv_dplace_societies.sql) via an
+    in-memory, ETag'd copy of the response (app/db/societies.py).
+    """
     try:
-        conn = psycopg.connect(
-            host=os.environ.get("PGHOST", "localhost"),
-            port=os.environ.get("PGPORT", "5435"),
-            dbname=os.environ.get("PGDATABASE", "edop"),
-            user=os.environ.get("PGUSER", "postgres"),
-            password=os.environ.get("PGPASSWORD", ""),
-        )
-        with conn.cursor() as cur:
-            # Get societies with bioregion, ecoregion, realm, basin cluster, EA042 (subsistence), EA034 (religion)
-            cur.execute("""
-                SELECT s.id, s.name, s.region, s.bioregion_id,
-                       m.title as bioregion_name,
-                       ST_X(s.geom) as lon, ST_Y(s.geom) as lat,
-                       c.name as subsistence,
-                       s.eco_id, e.eco_name,
-                       r.realm,
-                       ba.cluster_id,
-                       rel.name as religion
-                FROM gaz.dplace_societies s
-                LEFT JOIN gaz.bioregion_meta m ON m.bioregion_id = s.bioregion_id
-                LEFT JOIN gaz.dplace_data d ON d.soc_id = s.id AND d.var_id = 'EA042'
-                LEFT JOIN gaz.dplace_codes c ON c.id = d.code_id
-                    AND c.name NOT IN ('Missing data', '', 'Missing for at least 1 activity', 'Two or more sources')
-                LEFT JOIN gaz.dplace_data rd ON rd.soc_id = s.id AND rd.var_id = 'EA034'
-                LEFT JOIN gaz.dplace_codes rel ON rel.id = rd.code_id
-                    AND rel.name != 'Missing data'
-                LEFT JOIN gaz."Ecoregions2017" e ON e.eco_id = s.eco_id
-                LEFT JOIN gaz."Bioregions2023" b ON b.bioregions = s.bioregion_id
-                LEFT JOIN gaz."Subrealm2023" sr ON sr.subrealmid = b.subrealm_id
-                LEFT JOIN gaz."Realm2023" r ON r.biogeorelm = sr.biogeorelm
-                LEFT JOIN basin08 ba ON ba.hybas_id::bigint = s.basin_id
-                ORDER BY s.bioregion_id, s.name
-            """)
-            rows = cur.fetchall()
-
-            societies = []
-            for row in rows:
-                # Strip parenthetical content from realm
-                realm = row[10]
-                if realm and '(' in realm:
-                    realm = realm.split('(')[0].strip()
-                societies.append({
-                    "id": row[0],
-                    "name": row[1],
-                    "region": row[2],
-                    "bioregion_id": row[3],
-                    "bioregion_name": row[4],
-                    "lon": row[5],
-                    "lat": row[6],
-                    "subsistence": row[7],
-                    "eco_id": row[8],
-                    "eco_name": row[9],
-                    "realm": realm,
-                    "cluster_id": row[11],
-                    "religion": row[12]
-                })
-
-            # Get unique bioregions for legend
-            bioregions = []
-            seen = set()
-            for s in societies:
-                if s["bioregion_id"] and s["bioregion_id"] not in seen:
-                    seen.add(s["bioregion_id"])
-                    bioregions.append({
-                        "id": s["bioregion_id"],
-                        "name": s["bioregion_name"]
-                    })
-            bioregions.sort(key=lambda x: x["id"])
-
-            # Get subsistence categories with counts
-            subsistence_counts = {}
-            for s in societies:
-                sub = s["subsistence"]
-                if sub:
-                    subsistence_counts[sub] = subsistence_counts.get(sub, 0) + 1
-            subsistence_categories = [
-                {"name": k, "count": v}
-                for k, v in sorted(subsistence_counts.items(), key=lambda x: -x[1])
-            ]
-
-            # Get religion categories with counts (ordered by conceptual progression)
-            religion_order = ['Absent', 'Otiose', 'Active, but not supporting morality', 'Active, supporting morality']
-            religion_counts = {}
-            for s in societies:
-                rel = s["religion"]
-                if rel:
-                    religion_counts[rel] = religion_counts.get(rel, 0) + 1
-            religion_categories = [
-                {"name": k, "count": religion_counts.get(k, 0)}
-                for k in religion_order if k in religion_counts
-            ]
-
-            # Get variable descriptions for tooltips
-            cur.execute("""
-                SELECT id, name, description
-                FROM gaz.dplace_variables
-                WHERE id IN ('EA042', 'EA034')
-            """)
-            var_rows = cur.fetchall()
-            variable_info = {
-                row[0]: {"name": row[1], "description": row[2]}
-                for row in var_rows
-            }
-
-            return {
-                "count": len(societies),
-                "bioregions": bioregions,
-                "subsistence_categories": subsistence_categories,
-                "religion_categories": religion_categories,
-                "variable_info": variable_info,
-                "societies": societies
-            }
-
+        payload = society_summary.get(get_pool().connection)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if 'conn' in locals():
-            conn.close()
\ No newline at end of file
+
+    return payload.response(request)
@@ -0,0 +1,263 @@
+"""Async variant of the hot API endpoints (EDOP_API_MODE=async).
+
+Handlers here are `async def` and do their I/O on the event loop: Postgres via
+the shared AsyncConnectionPool and WHG/elevation calls via one pooled httpx
+AsyncClient. Concurrency is then bounded by the pool size rather than by
+Starlette's threadpool.
+
+app/main.py includes this router *before* the sync one, so the paths below
+take precedence and every other /api path keeps being served by routes.py.
+"""
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import psycopg
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+
+from app.api.routes import (
+    GeometryMode,
+    _GAZ_SUGGEST_SQL,
+    _filter_places,
+    _gaz_suggest_row,
+    _health_payload,
+    _merge_reconcile_results,
+    _require_whg_token,
+    _resolved_place,
+    _server_timing,
+    _suggest_results,
+    _whg_place_payload,
+    _whg_reconcile_payload,
+)
+from app.api import whg
+from app.db import gaz_suggest as gaz_suggest_index
+from app.db.pool import get_async_db, open_async_pool
+from app.db.elevation import _ssl_context
+from app.db.signature import get_signature_async
+from app.settings import settings
+
+router = APIRouter(prefix="/api", tags=["api"])
+
+
+# -----------------------
+# Shared async HTTP client (keep-alive, one per worker)
+# -----------------------
+
+_CLIENT: Optional[httpx.AsyncClient] = None
+
+
+async def open_http_client() -> httpx.AsyncClient:
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = httpx.AsyncClient(
+            verify=_ssl_context(),
+            timeout=20.0,
+            limits=httpx.Limits(
+                max_connections=settings.ASYNC_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.ASYNC_HTTP_MAX_CONNECTIONS,
+            ),
+            headers={"User-Agent": "EDOP/1.0", "Accept": "application/json"},
+        )
+    return _CLIENT
+
+
+async def close_http_client() -> None:
+    global _CLIENT
+    if _CLIENT is not None:
+        await _CLIENT.aclose()
+        _CLIENT = None
+
+
+async def get_http_client() -> httpx.AsyncClient:
+    return await open_http_client()
+
+
+# -----------------------
+# WHG helpers (async twins of those in routes.py; same caches via app/api/whg.py)
+# -----------------------
+
+async def _whg_suggest_first(client: httpx.AsyncClient, prefix: str) -> Optional[Dict[str, Any]]:
+    _require_whg_token()
+    data = await whg.suggest_async(client, prefix, limit=3, exact=False)
+    results = data.get("result") or []
+    return results[0] if results else None
+
+
+async def _whg_suggest(client: httpx.AsyncClient, prefix: str, limit: int = 5) -> List[Dict[str, Any]]:
+    _require_whg_token()
+    data = await whg.suggest_async(client, prefix, limit=limit, exact=True)
+    return _filter_places(data.get("result") or [])
+
+
+async def _whg_entity(client: httpx.AsyncClient, place_id: str) -> Dict[str, Any]:
+    _require_whg_token()
+    return await whg.entity_async(client, place_id)
+
+
+async def _whg_reconcile_query(client: httpx.AsyncClient, query: str, countries: List[str] = None,
+                               size: int = 10) -> List[Dict[str, Any]]:
+    _require_whg_token()
+    payload = _whg_reconcile_payload(query, countries=countries, size=size)
+    data = await whg.reconcile_async(client, payload)
+    return data.get("q1", {}).get("result", [])
+
+
+async def _whg_reconcile_extend(client: httpx.AsyncClient, place_ids: List[str]) -> Tuple[Dict[str, Dict], int]:
+    """(extend rows keyed by place ID, number fetched from WHG); shares the sync per-place cache."""
+    _require_whg_token()
+    return await whg.extend_async(client, place_ids)
+
+
+# -----------------------
+# API endpoints
+# -----------------------
+
+@router.get("/health")
+async def health():
+    return {**_health_payload(), "mode": "async"}
+
+
+@router.get("/signature")
+async def signature(
+    lat: float,
+    lon: float,
+    geometry: GeometryMode = "full",
+    tolerance: Optional[float] = Query(None, gt=0, description="Simplification tolerance in degrees"),
+    conn: psycopg.AsyncConnection = Depends(get_async_db),
+    client: httpx.AsyncClient = Depends(get_http_client),
+):
+    sig = await get_signature_async(lat=lat, lon=lon, conn=conn, client=client,
+                                    geometry=geometry, tolerance=tolerance)
+    if sig is None:
+        raise HTTPException(status_code=404, detail="No basin covers this point")
+    return sig
+
+
+@router.get("/resolve")
+async def resolve(name: str, client: httpx.AsyncClient = Depends(get_http_client)):
+    """Resolve a place name using WHG suggest + entity detail (see routes.resolve)."""
+    name = (name or "").strip()
+    if not name:
+        raise HTTPException(status_code=400, detail="Missing required query parameter: name")
+
+    try:
+        first = await _whg_suggest_first(client, name)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"WHG suggest failed: {e}")
+
+    if not first:
+        return {
+            "label": name,
+            "source": "whg",
+            "meta": {"status": "not_found"},
+        }
+
+    place_id = first.get("id")
+    if not place_id:
+        return {
+            "label": first.get("name") or name,
+            "source": "whg",
+            "meta": {"status": "no_id", "suggest": first},
+        }
+
+    try:
+        entity = await _whg_entity(client, str(place_id))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"WHG entity failed: {e}")
+
+    return _resolved_place(name, first, place_id, entity)
+
+
+@router.get("/whg-suggest")
+async def whg_suggest(q: str, limit: int = 5, client: httpx.AsyncClient = Depends(get_http_client)):
+    q = (q or "").strip()
+    if not q:
+        return {"results": []}
+
+    limit = max(1, min(limit, 20))
+
+    try:
+        raw = await _whg_suggest(client, q, limit=limit)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"WHG suggest failed: {e}")
+
+    return {"results": _suggest_results(raw)}
+
+
+@router.get("/whg-place")
+async def whg_place(id: str, client: httpx.AsyncClient = Depends(get_http_client)):
+    id = (id or "").strip()
+    if not id:
+        raise HTTPException(status_code=400, detail="Missing required query parameter: id")
+
+    try:
+        entity = await _whg_entity(client, id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"WHG entity failed: {e}")
+
+    return _whg_place_payload(id, entity)
+
+
+@router.get("/whg-reconcile")
+async def whg_reconcile(response: Response, q: str, countries: str = None, size: int = 10,
+                        client: httpx.AsyncClient = Depends(get_http_client)):
+    q = (q or "").strip()
+    if len(q) < 3:
+        return {"results": []}
+
+    size = max(1, min(size, 20))
+
+    country_list = None
+    if countries:
+        country_list = [c.strip().upper() for c in countries.split(",") if c.strip()]
+
+    try:
+        t0 = time.perf_counter()
+        candidates = await _whg_reconcile_query(client, q, countries=country_list, size=size)
+        query_ms = (time.perf_counter() - t0) * 1000.0
+        if not candidates:
+            _server_timing(response, ("whg-query", query_ms, None))
+            return {"results": []}
+
+        t0 = time.perf_counter()
+        place_ids = [c.get("id") for c in candidates if c.get("id")]
+        extended, fetched = await _whg_reconcile_extend(client, place_ids)
+        _server_timing(
+            response,
+            ("whg-query", query_ms, None),
+            ("whg-extend", (time.perf_counter() - t0) * 1000.0, f"{fetched}/{len(place_ids)} fetched"),
+        )
+        return {"results": _merge_reconcile_results(candidates, extended)}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"WHG reconcile failed: {e}")
+
+
+@router.get("/gaz-suggest")
+async def gaz_suggest(q: str, limit: int = 10):
+    q = (q or "").strip()
+    if not q or len(q) < 3:
+        return {"results": []}
+
+    limit = max(1, min(limit, 25))
+
+    # In-memory index first (app/db/gaz_suggest.py); the pool only for the SQL fallback
+    ready, rows = gaz_suggest_index.suggest(q, limit)
+    if ready:
+        return {"results": [_gaz_suggest_row(row) for row in rows]}
+
+    try:
+        pool = await open_async_pool()
+        async with pool.connection() as conn, conn.cursor() as cur:
+            await cur.execute(_GAZ_SUGGEST_SQL, (q + '%', limit))
+            return {"results": [_gaz_suggest_row(row) for row in await cur.fetchall()]}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,240 @@
+"""Mapbox Vector Tiles for the ecoregion hierarchy layers.
+
+    GET /api/tiles/{layer}/{z}/{x}/{y}.mvt     layer: realms | subrealms | bioregions | ecoregions
+
+Tiles are cut in PostGIS (ST_TileEnvelope + ST_AsMVTGeom + ST_AsMVT): source
+polygons are clipped to the tile (plus a small buffer) and simplified to about
+half a pixel at the requested zoom, so each tile carries only what is visible.
+
+Rendered tiles are cached on disk under EDOP_TILE_CACHE_DIR as
+{layer}/{version}/{z}/{x}/{y}.mvt. A layer's version combines LAYERS[...]
+["version"] (bump when the SQL or properties change) with a cheap fingerprint
+of its source table (row count + max xmin), re-checked every
+EDOP_TILE_VERSION_TTL_S; when it changes, tiles of older versions are removed.
+Disk hits and 304s within the TTL are answered without a pooled connection;
+one is taken only to re-check a version or render a missing tile.
+Properties include parent ids so clients can filter/style per hierarchy level.
+"""
+import os
+import shutil
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import psycopg
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from app.api.compression import etag_matches
+from app.db.pool import get_db
+from app.settings import settings
+
+router = APIRouter(prefix="/api", tags=["tiles"])
+
+# Tile extent and clip buffer in tile units (ST_AsMVTGeom defaults)
+_EXTENT = 4096
+_BUFFER = 64
+
+# layer -> source table, feature properties and zoom range
+LAYERS: Dict[str, Dict[str, Any]] = {
+    "realms": {
+        "table": 'gaz."Realm2023"',
+        "columns": "t.biogeorelm AS id, t.realm AS name",
+        "join": "",
+        "minzoom": 0,
+        "maxzoom": 8,
+        "version": "1",
+    },
+    "subrealms": {
+        "table": 'gaz."Subrealm2023"',
+        "columns": "t.subrealmid AS id, t.subrealm_n AS name, t.biogeorelm AS realm",
+        "join": "",
+        "minzoom": 0,
+        "maxzoom": 10,
+        "version": "1",
+    },
+    "bioregions": {
+        "table": 'gaz."Bioregions2023"',
+        "columns": "t.bioregions AS id, coalesce(m.title, t.bioregions) AS name, t.subrealm_id",
+        "join": "LEFT JOIN gaz.bioregion_meta m ON m.bioregion_id = t.bioregions",
+        "minzoom": 0,
+        "maxzoom": 12,
+        "version": "1",
+    },
+    "ecoregions": {
+        "table": 'gaz."Ecoregions2017"',
+        "columns": "t.eco_id AS id, t.eco_name AS name, t.bioregion, t.biome_name AS biome",
+        "join": "",
+        "minzoom": 0,
+        "maxzoom": 14,
+        "version": "1",
+    },
+}
+
+_TILE_SQL = """
+WITH bounds AS (
+  SELECT ST_TileEnvelope(%(z)s, %(x)s, %(y)s) AS env,
+         ST_Transform(ST_TileEnvelope(%(z)s, %(x)s, %(y)s, margin => %(margin)s), 4326) AS env4326
+),
+mvtgeom AS (
+  SELECT {columns},
+         ST_AsMVTGeom(
+           ST_Transform(ST_Simplify(ST_ClipByBox2D(t.geom, b.env4326::box2d), %(tolerance)s, true), 3857),
+           b.env, {extent}, {buffer}, true
+         ) AS geom
+  FROM {table} t
+  CROSS JOIN bounds b
+  {join}
+  WHERE t.geom && b.env4326
+)
+SELECT ST_AsMVT(mvtgeom.*, %(layer)s, {extent}, 'geom')
+FROM mvtgeom
+WHERE geom IS NOT NULL;
+"""
+
+_FINGERPRINT_SQL = "SELECT count(*), coalesce(max(xmin::text::bigint), 0) FROM {table}"
+
+
+def _tolerance(z: int) -> float:
+    """Simplification tolerance in degrees: about half a pixel of a 256px tile at zoom z."""
+    return 360.0 / (256 * 2 ** z) / 2
+
+
+# -----------------------
+# Layer versions + disk cache
+# -----------------------
+
+# layer -> (version, checked_at)
+_VERSIONS: Dict[str, Tuple[str, float]] = {}
+_VERSION_LOCK = threading.Lock()
+
+
+def cached_version(layer: str) -> Optional[str]:
+    """The layer's version if it was checked within EDOP_TILE_VERSION_TTL_S, else None."""
+    cached = _VERSIONS.get(layer)
+    if cached and time.monotonic() - cached[1] < settings.TILE_VERSION_TTL_S:
+        return cached[0]
+    return None
+
+
+def layer_version(conn: psycopg.Connection, layer: str) -> str:
+    """Current version string of a layer (cached for EDOP_TILE_VERSION_TTL_S)."""
+    version = cached_version(layer)
+    if version is not None:
+        return version
+
+    now = time.monotonic()
+    spec = LAYERS[layer]
+    with conn.cursor() as cur:
+        cur.execute(_FINGERPRINT_SQL.format(table=spec["table"]))
+        count, max_xmin = cur.fetchone()
+    version = f"v{spec['version']}-{count}-{max_xmin}"
+
+    with _VERSION_LOCK:
+        previous = _VERSIONS.get(layer)
+        _VERSIONS[layer] = (version, now)
+    if previous is None or previous[0] != version:
+        _prune_versions(layer, keep=version)
+    return version
+
+
+def _prune_versions(layer: str, keep: str) -> None:
+    layer_dir = Path(settings.TILE_CACHE_DIR) / layer
+    if not layer_dir.is_dir():
+        return
+    for d in layer_dir.iterdir():
+        if d.is_dir() and d.name != keep:
+            shutil.rmtree(d, ignore_errors=True)
+
+
+def _tile_path(layer: str, version: str, z: int, x: int, y: int) -> Path:
+    return Path(settings.TILE_CACHE_DIR) / layer / version / str(z) / str(x) / f"{y}.mvt"
+
+
+def _write_tile(path: Path, data: bytes) -> None:
+    # Write-then-rename so concurrent readers never see a partial tile
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        tmp.replace(path)
+    except OSError:
+        pass
+
+
+def render_tile(conn: psycopg.Connection, layer: str, z: int, x: int, y: int) -> bytes:
+    spec = LAYERS[layer]
+    sql = _TILE_SQL.format(
+        columns=spec["columns"],
+        table=spec["table"],
+        join=spec["join"],
+        extent=_EXTENT,
+        buffer=_BUFFER,
+    )
+    params = {
+        "z": z, "x": x, "y": y,
+        "margin": _BUFFER / _EXTENT,
+        "tolerance": _tolerance(z),
+        "layer": layer,
+    }
+    with conn.cursor() as cur:
+        cur.execute(sql, params)
+        row = cur.fetchone()
+    return bytes(row[0]) if row and row[0] is not None else b""
+
+
+# -----------------------
+# Endpoint
+# -----------------------
+
+_MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+
+@router.get("/tiles/{layer}/{z}/{x}/{y}.mvt")
+def tile(layer: str, z: int, x: int, y: int, request: Request):
+    """One vector tile of an ecoregion hierarchy layer (empty tiles answer 204)."""
+    spec = LAYERS.get(layer)
+    if spec is None:
+        raise HTTPException(status_code=404, detail=f"Unknown layer. Must be one of: {list(LAYERS)}")
+    if z < 0 or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=400, detail="Tile coordinates out of range")
+
+    headers = {"Cache-Control": f"public, max-age={settings.TILE_MAX_AGE_S}"}
+    if not spec["minzoom"] <= z <= spec["maxzoom"]:
+        return Response(status_code=204, headers=headers)
+
+    try:
+        # A pooled connection (via get_db, so a busy pool still answers 503) is
+        # only taken to re-check the version or render a tile not on disk
+        with ExitStack() as stack:
+            conn: Optional[psycopg.Connection] = None
+            version = cached_version(layer)
+            if version is None:
+                conn = stack.enter_context(contextmanager(get_db)())
+                version = layer_version(conn, layer)
+            etag = f'"{layer}-{version}-{z}-{x}-{y}"'
+            headers["ETag"] = etag
+            if etag_matches(request.headers.get("if-none-match"), etag):
+                return Response(status_code=304, headers=headers)
+
+            path = _tile_path(layer, version, z, x, y)
+            data: Optional[bytes] = None
+            if path.exists():
+                data = path.read_bytes()
+                headers["X-Tile-Cache"] = "hit"
+            else:
+                if conn is None:
+                    conn = stack.enter_context(contextmanager(get_db)())
+                data = render_tile(conn, layer, z, x, y)
+                _write_tile(path, data)
+                headers["X-Tile-Cache"] = "miss"
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if not data:
+        return Response(status_code=204, headers=headers)
+    return Response(content=data, media_type=_MVT_MEDIA_TYPE, headers=headers)
@@ -0,0 +1,195 @@
+"""World Heritage site catalogue behind /api/wh-sites.
+
+The seed file (app/data/world_heritage_seed.json) is parsed once, cluster
+labels from edop_clusters are joined in, and the JSON response is rendered to
+bytes up front, so a request is a stat() of the seed file and a memory read.
+
+The catalogue is rebuilt when the seed file's mtime/size changes (checked per
+request) or when the cluster labels change: a background thread started from
+the app lifespan re-reads edop_clusters (a handful of rows) every
+EDOP_WH_CATALOGUE_REFRESH_S. Responses carry an ETag of the rendered body.
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import psycopg
+from fastapi import Request, Response
+
+from app.api.compression import etag_matches
+from app.api.responses import dumps
+from app.settings import settings
+
+SEED_PATH = Path(__file__).resolve().parents[1] / "data" / "world_heritage_seed.json"
+
+_CLUSTER_LABELS_SQL = """
+    SELECT s.id_no, c.cluster_label
+    FROM edop_clusters c
+    JOIN edop_wh_sites s ON s.site_id = c.site_id
+"""
+
+_WKT_POINT = re.compile(r"^\s*POINT\s*\(\s*([-0-9.]+)\s+([-0-9.]+)\s*\)\s*$")
+
+
+def _parse_wkt_point(wkt: str) -> Optional[Tuple[float, float]]:
+    """Parse WKT like 'POINT (lon lat)' or 'POINT(lon lat)' into (lon, lat)."""
+    if not wkt:
+        return None
+    m = _WKT_POINT.match(wkt)
+    if not m:
+        return None
+    return float(m.group(1)), float(m.group(2))
+
+
+def load_seed(path: Path = SEED_PATH) -> List[Dict[str, Any]]:
+    """Load and normalize the WH seed JSON into a list of dicts with GeoJSON Point."""
+    if not path.exists():
+        raise FileNotFoundError(f"World Heritage seed file not found at {path}")
+
+    raw = json.loads(path.read_text(encoding="utf-8"))
+    out: List[Dict[str, Any]] = []
+
+    if not isinstance(raw, list):
+        raise ValueError("World Heritage seed file must be a JSON array")
+
+    for row in raw:
+        if not isinstance(row, dict):
+            continue
+        wkt = row.get("geom")
+        lonlat = _parse_wkt_point(wkt) if isinstance(wkt, str) else None
+        if not lonlat:
+            continue
+        lon, lat = lonlat
+        out.append(
+            {
+                "id_no": row.get("id_no"),
+                "name_en": row.get("name_en"),
+                "states_name_en": row.get("states_name_en"),
+                "short_description_en": row.get("short_description_en"),
+                "location": {"type": "Point", "coordinates": [lon, lat]},
+            }
+        )
+
+    return out
+
+
+def fetch_cluster_labels(conn: psycopg.Connection) -> Dict[int, str]:
+    """Cluster labels for WH sites keyed by id_no ({} if the tables aren't there)."""
+    try:
+        with conn.cursor() as cur:
+            cur.execute(_CLUSTER_LABELS_SQL)
+            return {row[0]: row[1] for row in cur.fetchall()}
+    except psycopg.Error:
+        # Labels are optional; clear the failed transaction so the pooled connection stays usable
+        conn.rollback()
+        return {}
+
+
+class Catalogue:
+    """Immutable snapshot: the sites with labels joined in, and the rendered response."""
+
+    __slots__ = ("seed_stamp", "labels", "count", "body", "etag")
+
+    def __init__(self, seed_stamp: Tuple[int, int], labels: Dict[int, str], sites: List[Dict[str, Any]]):
+        self.seed_stamp = seed_stamp
+        self.labels = labels
+        self.count = len(sites)
+        for site in sites:
+            site["cluster_label"] = labels.get(site.get("id_no"))
+        self.body = dumps({"count": len(sites), "sites": sites})
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+
+    def response(self, request: Optional[Request] = None) -> Response:
+        headers = {"ETag": self.etag}
+        if request is not None and etag_matches(request.headers.get("if-none-match"), self.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=self.body, media_type="application/json", headers=headers)
+
+
+# -----------------------
+# Process-wide instance
+# -----------------------
+
+_CATALOGUE: Optional[Catalogue] = None
+# Labels from the last successful edop_clusters read
+_LABELS: Dict[int, str] = {}
+_STATS: Dict[str, Any] = {"rebuilds": 0, "label_checks": 0}
+_LOCK = threading.Lock()
+_STARTED = False
+
+
+def _seed_stamp() -> Tuple[int, int]:
+    st = SEED_PATH.stat()
+    return st.st_mtime_ns, st.st_size
+
+
+def _rebuild(stamp: Tuple[int, int], labels: Dict[int, str]) -> Catalogue:
+    global _CATALOGUE
+    _CATALOGUE = Catalogue(stamp, labels, load_seed())
+    _STATS["rebuilds"] += 1
+    _STATS["built_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    return _CATALOGUE
+
+
+def get() -> Catalogue:
+    """The current catalogue, rebuilt first if the seed file changed."""
+    stamp = _seed_stamp()
+    catalogue = _CATALOGUE
+    if catalogue is not None and catalogue.seed_stamp == stamp:
+        return catalogue
+    with _LOCK:
+        if _CATALOGUE is not None and _CATALOGUE.seed_stamp == stamp:
+            return _CATALOGUE
+        return _rebuild(stamp, _LABELS)
+
+
+def refresh_labels(conn: psycopg.Connection) -> bool:
+    """Re-read the cluster labels; rebuild the catalogue if they changed. Returns True on rebuild."""
+    global _LABELS
+    labels = fetch_cluster_labels(conn)
+    _STATS["label_checks"] += 1
+    with _LOCK:
+        if labels == _LABELS and _CATALOGUE is not None:
+            return False
+        _LABELS = labels
+        _rebuild(_seed_stamp(), labels)
+        return True
+
+
+def _run(conn_factory) -> None:
+    while True:
+        try:
+            with conn_factory() as conn:
+                refresh_labels(conn)
+            _STATS.pop("error", None)
+        except Exception as e:
+            _STATS["error"] = str(e)
+        time.sleep(settings.WH_CATALOGUE_REFRESH_S)
+
+
+def start(conn_factory) -> None:
+    """Load the catalogue now and keep its cluster labels fresh in a background thread."""
+    global _STARTED
+    with _LOCK:
+        if _STARTED:
+            return
+        _STARTED = True
+    try:
+        get()
+    except (OSError, ValueError) as e:
+        # /api/wh-sites reports the problem per request; keep the app starting
+        _STATS["error"] = str(e)
+    threading.Thread(target=_run, args=(conn_factory,), name="wh-catalogue", daemon=True).start()
+
+
+def stats() -> Dict[str, Any]:
+    catalogue = _CATALOGUE
+    out = dict(_STATS)
+    out["status"] = "ready" if catalogue is not None else "empty"
+    if catalogue is not None:
+        out.update({"sites": catalogue.count, "labels": len(catalogue.labels), "bytes": len(catalogue.body)})
+    return out
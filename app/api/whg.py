@@ -0,0 +1,365 @@
+"""World Historical Gazetteer client for the API routes.
+
+One process-wide httpx.Client keeps HTTP/1.1 connections to WHG alive across
+requests (instead of a new TLS handshake per urllib call), responses are kept
+in a TTL cache keyed on the normalized query, and concurrent identical calls
+are coalesced so only one of them goes upstream while the others wait for its
+result (or its error, which is not cached).
+
+Reconcile extend rows (geometry, countries, types, names) are cached per WHG
+place ID rather than per request, since the same places come back for many
+different queries; an extend call only asks WHG for the IDs not cached yet.
+
+The async routes (EDOP_API_MODE=async) use the *_async twins below with their
+own httpx.AsyncClient; they share the same caches and cache keys, and coalesce
+concurrent identical calls on the event loop.
+
+The base URL is configurable (EDOP_WHG_BASE_URL) so the client can be pointed
+at scripts/stub_whg_server.py.
+"""
+import asyncio
+import json
+import threading
+import urllib.parse
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import httpx
+
+from app import metrics
+from app.db.cache import LRUCache
+from app.db.elevation import _ssl_context
+from app.settings import settings
+
+_CACHE = LRUCache("whg", max_items=settings.WHG_CACHE_MAX_ITEMS, ttl_s=settings.WHG_CACHE_TTL_S)
+# place_id -> extend row
+_EXTEND_CACHE = LRUCache("whg_extend", max_items=settings.WHG_EXTEND_CACHE_MAX_ITEMS,
+                         ttl_s=settings.WHG_EXTEND_CACHE_TTL_S)
+# Counters are updated without a lock; they are indicative, not exact
+_STATS = {"upstream": 0, "coalesced": 0, "errors": 0}
+
+
+def _base() -> str:
+    return settings.WHG_BASE_URL.rstrip("/")
+
+
+def suggest_url(prefix: str, limit: int, exact: bool) -> str:
+    params = {
+        "prefix": prefix,
+        "limit": limit,
+        "cursor": 0,
+        "exact": "true" if exact else "false",
+        # WHG may require authentication for suggest; include token when configured.
+        "token": settings.WHG_API_TOKEN,
+    }
+    return f"{_base()}/suggest/entity?" + urllib.parse.urlencode(params)
+
+
+def entity_url(place_id: str) -> str:
+    encoded_id = urllib.parse.quote(place_id, safe="")
+    token = urllib.parse.quote(settings.WHG_API_TOKEN or "")
+    return f"{_base()}/entity/{encoded_id}/api?token={token}"
+
+
+def reconcile_url() -> str:
+    return f"{_base()}/reconcile"
+
+
+def auth_headers() -> Dict[str, str]:
+    return {
+        "Authorization": f"Bearer {settings.WHG_API_TOKEN}"
+    }
+
+
+def extend_payload(place_ids: List[str]) -> Dict[str, Any]:
+    return {
+        "extend": {
+            "ids": place_ids,
+            "type": "https://whgazetteer.org/static/whg_schema.jsonld#Place",
+            "properties": [
+                {"id": "whg:geometry_wkt"},
+                {"id": "whg:countries_objects"},
+                {"id": "whg:types_objects"},
+                {"id": "whg:names_summary"}
+            ]
+        }
+    }
+
+
+def normalize_query(q: str) -> str:
+    """Cache-key form of a free-text query: casefolded, whitespace collapsed."""
+    return " ".join(q.split()).casefold()
+
+
+# -----------------------
+# Pooled client
+# -----------------------
+
+_CLIENT: Optional[httpx.Client] = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def get_client() -> httpx.Client:
+    global _CLIENT
+    if _CLIENT is None:
+        with _CLIENT_LOCK:
+            if _CLIENT is None:
+                _CLIENT = httpx.Client(
+                    verify=_ssl_context(),
+                    timeout=settings.WHG_TIMEOUT_S,
+                    limits=httpx.Limits(
+                        max_connections=settings.WHG_MAX_CONNECTIONS,
+                        max_keepalive_connections=settings.WHG_MAX_CONNECTIONS,
+                    ),
+                    headers={"User-Agent": "EDOP/1.0", "Accept": "application/json"},
+                )
+    return _CLIENT
+
+
+def close() -> None:
+    global _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is not None:
+            _CLIENT.close()
+            _CLIENT = None
+
+
+# -----------------------
+# Cache + request coalescing
+# -----------------------
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+_INFLIGHT: Dict[Hashable, _Call] = {}
+_INFLIGHT_LOCK = threading.Lock()
+
+
+def _singleflight(key: Hashable, fetch: Callable[[], Any]) -> Any:
+    """Run fetch() once for every concurrent caller with the same key."""
+    with _INFLIGHT_LOCK:
+        call = _INFLIGHT.get(key)
+        leader = call is None
+        if leader:
+            call = _INFLIGHT[key] = _Call()
+
+    if not leader:
+        _STATS["coalesced"] += 1
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        _STATS["upstream"] += 1
+        call.result = fetch()
+        return call.result
+    except BaseException as e:
+        _STATS["errors"] += 1
+        call.error = e
+        raise
+    finally:
+        with _INFLIGHT_LOCK:
+            _INFLIGHT.pop(key, None)
+        call.done.set()
+
+
+_ASYNC_INFLIGHT: Dict[Hashable, "asyncio.Future[Any]"] = {}
+
+
+class _LeaderCancelled(Exception):
+    """Set on a shared future whose leader was cancelled: followers retry instead of failing."""
+
+
+async def _singleflight_async(key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+    """Event-loop twin of _singleflight(): one fetch() per key for concurrent coroutines."""
+    while True:
+        pending = _ASYNC_INFLIGHT.get(key)
+        if pending is None:
+            break
+        _STATS["coalesced"] += 1
+        try:
+            # shield: a follower being cancelled must not cancel the leader's call
+            return await asyncio.shield(pending)
+        except _LeaderCancelled:
+            # The leader's own request went away (e.g. client disconnect); that is
+            # no reason to fail ours, so the first follower back fetches it again
+            continue
+
+    future = _ASYNC_INFLIGHT[key] = asyncio.get_running_loop().create_future()
+    try:
+        _STATS["upstream"] += 1
+        result = await fetch()
+        future.set_result(result)
+        return result
+    except asyncio.CancelledError:
+        _ASYNC_INFLIGHT.pop(key, None)
+        future.set_exception(_LeaderCancelled())
+        future.exception()
+        raise
+    except BaseException as e:
+        _STATS["errors"] += 1
+        future.set_exception(e)
+        future.exception()  # retrieved here, so an unawaited future doesn't log it
+        raise
+    finally:
+        if _ASYNC_INFLIGHT.get(key) is future:
+            del _ASYNC_INFLIGHT[key]
+
+
+def _cached(key: Hashable, fetch: Callable[[], Any]) -> Any:
+    """Cached value for key, else one fetch() shared by every concurrent caller."""
+    value = _CACHE.get(key)
+    if value is not None:
+        return value
+
+    def fetch_and_store():
+        result = fetch()
+        _CACHE.set(key, result)
+        return result
+
+    return _singleflight(key, fetch_and_store)
+
+
+async def _cached_async(key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+    value = _CACHE.get(key)
+    if value is not None:
+        return value
+
+    async def fetch_and_store():
+        result = await fetch()
+        _CACHE.set(key, result)
+        return result
+
+    return await _singleflight_async(key, fetch_and_store)
+
+
+def _get_json(url: str) -> Dict[str, Any]:
+    with metrics.external("whg"):
+        resp = get_client().get(url)
+        resp.raise_for_status()
+        return resp.json()
+
+
+def _post_json(url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    with metrics.external("whg"):
+        resp = get_client().post(url, json=payload, headers=auth_headers())
+        resp.raise_for_status()
+        return resp.json()
+
+
+async def _get_json_async(client: httpx.AsyncClient, url: str) -> Dict[str, Any]:
+    with metrics.external("whg"):
+        resp = await client.get(url)
+        resp.raise_for_status()
+        return resp.json()
+
+
+async def _post_json_async(client: httpx.AsyncClient, url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    with metrics.external("whg"):
+        resp = await client.post(url, json=payload, headers=auth_headers())
+        resp.raise_for_status()
+        return resp.json()
+
+
+# -----------------------
+# WHG calls (raw JSON responses)
+# -----------------------
+
+def _suggest_key(prefix: str, limit: int, exact: bool) -> Hashable:
+    return ("suggest", normalize_query(prefix), limit, exact)
+
+
+def _reconcile_key(payload: Dict[str, Any]) -> Hashable:
+    normalized = json.loads(json.dumps(payload))
+    for q in (normalized.get("queries") or {}).values():
+        if isinstance(q.get("query"), str):
+            q["query"] = normalize_query(q["query"])
+    return ("reconcile", json.dumps(normalized, sort_keys=True))
+
+
+def suggest(prefix: str, limit: int, exact: bool) -> Dict[str, Any]:
+    return _cached(_suggest_key(prefix, limit, exact),
+                   lambda: _get_json(suggest_url(" ".join(prefix.split()), limit, exact)))
+
+
+def entity(place_id: str) -> Dict[str, Any]:
+    return _cached(("entity", place_id), lambda: _get_json(entity_url(place_id)))
+
+
+def reconcile(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """POST a reconcile query payload (see routes._whg_reconcile_payload)."""
+    return _cached(_reconcile_key(payload), lambda: _post_json(reconcile_url(), payload))
+
+
+async def suggest_async(client: httpx.AsyncClient, prefix: str, limit: int, exact: bool) -> Dict[str, Any]:
+    return await _cached_async(_suggest_key(prefix, limit, exact),
+                               lambda: _get_json_async(client, suggest_url(" ".join(prefix.split()), limit, exact)))
+
+
+async def entity_async(client: httpx.AsyncClient, place_id: str) -> Dict[str, Any]:
+    return await _cached_async(("entity", place_id), lambda: _get_json_async(client, entity_url(place_id)))
+
+
+async def reconcile_async(client: httpx.AsyncClient, payload: Dict[str, Any]) -> Dict[str, Any]:
+    return await _cached_async(_reconcile_key(payload), lambda: _post_json_async(client, reconcile_url(), payload))
+
+
+def cached_extend_rows(place_ids: Iterable[str]) -> Tuple[Dict[str, Dict], List[str]]:
+    """Split place_ids into (cached extend rows, IDs still to fetch)."""
+    rows: Dict[str, Dict] = {}
+    missing: List[str] = []
+    for place_id in dict.fromkeys(place_ids):
+        row = _EXTEND_CACHE.get(place_id)
+        if row is None:
+            missing.append(place_id)
+        else:
+            rows[place_id] = row
+    return rows, missing
+
+
+def store_extend_rows(rows: Dict[str, Dict]) -> None:
+    for place_id, row in rows.items():
+        _EXTEND_CACHE.set(place_id, row)
+
+
+def extend(place_ids: List[str]) -> Tuple[Dict[str, Dict], int]:
+    """Extend rows keyed by place ID, and how many IDs had to be fetched from WHG.
+
+    IDs WHG returns no row for are not cached, so they are asked for again next time.
+    """
+    rows, missing = cached_extend_rows(place_ids)
+    if missing:
+        def fetch():
+            fetched = _post_json(reconcile_url(), extend_payload(missing)).get("rows", {})
+            store_extend_rows(fetched)
+            return fetched
+
+        fetched = _singleflight(("extend", tuple(missing)), fetch)
+        rows.update({pid: fetched[pid] for pid in missing if pid in fetched})
+    return rows, len(missing)
+
+
+async def extend_async(client: httpx.AsyncClient, place_ids: List[str]) -> Tuple[Dict[str, Dict], int]:
+    """Event-loop twin of extend()."""
+    rows, missing = cached_extend_rows(place_ids)
+    if missing:
+        async def fetch():
+            data = await _post_json_async(client, reconcile_url(), extend_payload(missing))
+            fetched = data.get("rows", {})
+            store_extend_rows(fetched)
+            return fetched
+
+        fetched = await _singleflight_async(("extend", tuple(missing)), fetch)
+        rows.update({pid: fetched[pid] for pid in missing if pid in fetched})
+    return rows, len(missing)
+
+
+def stats() -> Dict[str, Any]:
+    return {**_CACHE.stats(), **_STATS, "inflight": len(_INFLIGHT) + len(_ASYNC_INFLIGHT),
+            "extend_cache": _EXTEND_CACHE.stats()}
@@ -0,0 +1,237 @@
+"""Optional in-process point-in-basin index over basin08 geometries.
+
+Resolves (lat, lon) to basin08.id with an STRtree and precomputed geodesic
+areas, so get_signature() only has to fetch attributes by primary key instead
+of running ST_Covers + ST_Area(geom::geography) per request.
+
+Enabled with EDOP_BASIN_INDEX=1 (requires shapely>=2). The index warms up in a
+background thread at startup; until it is ready, lookup() reports the point
+as unresolved and callers fall back to the spatial SQL.
+
+Warm-up reads a snapshot file (EDOP_BASIN_INDEX_SNAPSHOT) when present, which
+is much cheaper than pulling 190k polygons from Postgres on every worker
+restart. Build or refresh the snapshot (after basin08 geometries change) with:
+
+    python -m app.db.basin_index
+"""
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import psycopg
+
+from app.settings import settings
+
+try:
+    import shapely  # type: ignore
+    from shapely import STRtree  # type: ignore
+except Exception:  # pragma: no cover
+    shapely = None
+    STRtree = None
+
+# Same geometry + area definition the SQL path orders by
+_LOAD_SQL = """
+SELECT id, ST_AsBinary(geom), ST_Area(geom::geography)
+FROM public.basin08
+WHERE geom IS NOT NULL
+ORDER BY id
+"""
+
+
+def _rss_bytes() -> int:
+    """Current resident set size of this process (Linux /proc; 0 if unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class BasinIndex:
+    """STRtree over basin polygons with per-basin area for smallest-basin tie-breaks."""
+
+    def __init__(self, ids: np.ndarray, geoms: np.ndarray, areas: np.ndarray):
+        self.ids = ids
+        self.areas = areas
+        shapely.prepare(geoms)
+        self.tree = STRtree(geoms)
+
+    @classmethod
+    def from_db(cls, conn: psycopg.Connection) -> "BasinIndex":
+        ids, wkbs, areas = [], [], []
+        with conn.cursor() as cur:
+            cur.execute(_LOAD_SQL)
+            for basin_id, wkb, area in cur:
+                ids.append(basin_id)
+                wkbs.append(bytes(wkb))
+                areas.append(area)
+        return cls(
+            np.asarray(ids, dtype=np.int64),
+            shapely.from_wkb(wkbs),
+            np.asarray(areas, dtype=np.float64),
+        )
+
+    @classmethod
+    def from_snapshot(cls, path: Path) -> "BasinIndex":
+        with np.load(path) as z:
+            blob = z["wkb"].tobytes()
+            offsets = z["offsets"]
+            wkbs = [blob[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+            return cls(z["ids"], shapely.from_wkb(wkbs), z["areas"])
+
+    def save_snapshot(self, path: Path) -> None:
+        # WKB blob + offsets keeps the file pickle-free and fast to reload
+        wkbs = shapely.to_wkb(self.tree.geometries)
+        offsets = np.zeros(len(wkbs) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(w) for w in wkbs])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp.npz")
+        np.savez(
+            tmp,
+            ids=self.ids,
+            areas=self.areas,
+            offsets=offsets,
+            wkb=np.frombuffer(b"".join(wkbs), dtype=np.uint8),
+        )
+        tmp.replace(path)
+
+    def lookup(self, lat: float, lon: float) -> Optional[int]:
+        """Return the id of the smallest basin covering (lat, lon), or None."""
+        hits = self.tree.query(shapely.Point(lon, lat), predicate="covered_by")
+        if len(hits) == 0:
+            return None
+        return int(self.ids[hits[np.argmin(self.areas[hits])]])
+
+    def lookup_many(self, points: Sequence[Tuple[float, float]]) -> list[Optional[int]]:
+        """Vectorized lookup for a sequence of (lat, lon); result is in input order."""
+        if not points:
+            return []
+        pts = np.asarray(points, dtype=np.float64)
+        input_idx, tree_idx = self.tree.query(shapely.points(pts[:, 1], pts[:, 0]), predicate="covered_by")
+        out: list[Optional[int]] = [None] * len(pts)
+        best_area = np.full(len(pts), np.inf)
+        for i, t in zip(input_idx.tolist(), tree_idx.tolist()):
+            if self.areas[t] < best_area[i]:
+                best_area[i] = self.areas[t]
+                out[i] = int(self.ids[t])
+        return out
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+# -----------------------
+# Process-wide instance
+# -----------------------
+
+_INDEX: Optional[BasinIndex] = None
+_STATS: Dict[str, Any] = {"status": "disabled"}
+# Lookup counters are updated without a lock; they are indicative, not exact
+_LOOKUPS = {"count": 0, "total_us": 0.0}
+_LOCK = threading.Lock()
+
+
+def _load(conn_factory) -> None:
+    global _INDEX
+    path = Path(settings.BASIN_INDEX_SNAPSHOT)
+    rss0 = _rss_bytes()
+    t0 = time.perf_counter()
+    try:
+        if path.exists():
+            index, source = BasinIndex.from_snapshot(path), "snapshot"
+        else:
+            with conn_factory() as conn:
+                index, source = BasinIndex.from_db(conn), "db"
+            try:
+                index.save_snapshot(path)
+            except OSError:
+                pass
+    except Exception as e:
+        _STATS.update({"status": "error", "error": str(e)})
+        return
+
+    _INDEX = index
+    _STATS.update({
+        "status": "ready",
+        "source": source,
+        "snapshot": str(path),
+        "basins": len(index),
+        "warmup_s": round(time.perf_counter() - t0, 3),
+        "rss_delta_mb": round((_rss_bytes() - rss0) / 2**20, 1),
+    })
+
+
+def start(conn_factory) -> None:
+    """Warm the index in a background thread if EDOP_BASIN_INDEX is on.
+
+    `conn_factory` is a zero-arg callable returning a connection context manager
+    (e.g. get_pool().connection); it is only used when no snapshot exists.
+    """
+    if not settings.BASIN_INDEX:
+        return
+    if shapely is None:
+        _STATS.update({"status": "unavailable", "error": "shapely>=2 is not installed"})
+        return
+    with _LOCK:
+        if _STATS.get("status") in ("loading", "ready"):
+            return
+        _STATS.clear()
+        _STATS["status"] = "loading"
+    threading.Thread(target=_load, args=(conn_factory,), name="basin-index", daemon=True).start()
+
+
+def lookup(lat: float, lon: float) -> Tuple[bool, Optional[int]]:
+    """Return (resolved, basin_id). resolved=False means the index isn't ready; use SQL."""
+    index = _INDEX
+    if index is None:
+        return False, None
+    t0 = time.perf_counter()
+    basin_id = index.lookup(lat, lon)
+    _LOOKUPS["count"] += 1
+    _LOOKUPS["total_us"] += (time.perf_counter() - t0) * 1e6
+    return True, basin_id
+
+
+def get_index() -> Optional[BasinIndex]:
+    return _INDEX
+
+
+def stats() -> Dict[str, Any]:
+    out = dict(_STATS)
+    if _LOOKUPS["count"]:
+        out["lookups"] = _LOOKUPS["count"]
+        out["avg_lookup_us"] = round(_LOOKUPS["total_us"] / _LOOKUPS["count"], 1)
+    return out
+
+
+def main() -> None:
+    """Rebuild the snapshot from Postgres and report warm-up cost of both paths."""
+    from app.db.pool import conninfo
+
+    path = Path(settings.BASIN_INDEX_SNAPSHOT)
+    rss0 = _rss_bytes()
+    t0 = time.perf_counter()
+    with psycopg.connect(conninfo()) as conn:
+        index = BasinIndex.from_db(conn)
+    t_db = time.perf_counter() - t0
+    print(f"Loaded {len(index)} basins from Postgres in {t_db:.1f}s "
+          f"(RSS +{(_rss_bytes() - rss0) / 2**20:.0f} MB)")
+
+    index.save_snapshot(path)
+    print(f"Wrote {path} ({path.stat().st_size / 2**20:.0f} MB)")
+
+    t0 = time.perf_counter()
+    BasinIndex.from_snapshot(path)
+    print(f"Reload from snapshot: {time.perf_counter() - t0:.1f}s")
+
+    # Timbuktu, as in app/db/signature.py main()
+    t0 = time.perf_counter()
+    basin_id = index.lookup(16.76618535, -3.00777252)
+    print(f"lookup(Timbuktu) -> {basin_id} in {(time.perf_counter() - t0) * 1e6:.0f} µs")
+
+
+if __name__ == "__main__":
+    main()
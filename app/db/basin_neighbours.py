@@ -0,0 +1,80 @@
+"""Precomputed top-K environmental neighbours per basin (scripts/build_basin_neighbours.py).
+
+The build writes two (max basin id + 1, K) arrays under EDOP_BASIN_NEIGHBOURS_DIR,
+row = basin08.id, which are memory-mapped here: a lookup is a primary-key row
+read, with no DB round trip and nothing held in RAM beyond the pages touched.
+The arrays are reopened when meta.json changes (a new build).
+
+similar_basins() is what endpoints call. It answers from the precomputed
+arrays when they hold enough neighbours, else from the in-process PCA index
+(app/db/pca_index.py), else reports not-ready so the caller can use SQL.
+"""
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from app.db import pca_index
+from app.settings import settings
+
+# (meta.json mtime, meta, neighbour ids, distances)
+_STATE: Dict[str, Any] = {"mtime": None, "meta": None, "ids": None, "dist": None}
+_LOCK = threading.Lock()
+
+
+def _arrays() -> Optional[Tuple[Dict[str, Any], np.ndarray, np.ndarray]]:
+    root = Path(settings.BASIN_NEIGHBOURS_DIR)
+    try:
+        mtime = (root / "meta.json").stat().st_mtime
+    except OSError:
+        return None
+    with _LOCK:
+        if _STATE["mtime"] != mtime:
+            try:
+                meta = json.loads((root / "meta.json").read_text(encoding="utf-8"))
+                ids = np.load(root / "neighbour_ids.npy", mmap_mode="r")
+                dist = np.load(root / "distances.npy", mmap_mode="r")
+            except (OSError, ValueError):
+                return None
+            _STATE.update({"mtime": mtime, "meta": meta, "ids": ids, "dist": dist})
+        return _STATE["meta"], _STATE["ids"], _STATE["dist"]
+
+
+def precomputed(basin_id: int, k: int) -> Tuple[bool, Optional[Tuple[np.ndarray, np.ndarray]]]:
+    """(available, result) from the precomputed arrays alone.
+
+    available=False when there is no build or it has fewer than k neighbours per
+    basin; result is None when the basin has no neighbours row.
+    """
+    loaded = _arrays()
+    if loaded is None or loaded[0]["k"] < k:
+        return False, None
+    _, ids, dist = loaded
+    if basin_id < 0 or basin_id >= len(ids):
+        return True, None
+    row_ids = np.asarray(ids[basin_id, :k])
+    keep = row_ids >= 0
+    if not keep.any():
+        return True, None
+    return True, (row_ids[keep].astype(np.int64), np.asarray(dist[basin_id, :k])[keep])
+
+
+def similar_basins(basin_id: int, k: int) -> Tuple[Optional[str], Optional[Tuple[np.ndarray, np.ndarray]]]:
+    """(source, (basin_ids, distances)) nearest first; source None means neither is ready: use SQL."""
+    available, result = precomputed(basin_id, k)
+    if available:
+        return "precomputed", result
+    ready, result = pca_index.neighbours(basin_id, k)
+    if ready:
+        return "index", result
+    return None, None
+
+
+def stats() -> Dict[str, Any]:
+    loaded = _arrays()
+    if loaded is None:
+        return {"status": "absent"}
+    meta, ids, _ = loaded
+    return {"status": "ready", "k": meta["k"], "basins": meta["basins"], "built_at": meta.get("built_at")}
@@ -0,0 +1,98 @@
+"""Data-version registry (public.edop_data_versions, sql/edop_data_versions.sql).
+
+Each table family the API serves (eco, eco_wikitext, whc, basin_clusters,
+societies) has a version number that the batch scripts bump after rewriting
+its tables. A background thread started from the app lifespan re-reads the
+registry (a handful of rows) every EDOP_DATA_VERSIONS_POLL_S, so lookups from
+request handlers are a dict read and never touch the database.
+
+Until the first successful read, or when the table does not exist, every
+family is unknown and app/api/http_cache.py leaves responses uncached.
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+import psycopg
+
+from app.settings import settings
+
+FAMILIES = ("eco", "eco_wikitext", "whc", "basin_clusters", "societies")
+
+_VERSIONS_SQL = "SELECT family, version, updated_at FROM public.edop_data_versions"
+
+_BUMP_SQL = """
+    INSERT INTO public.edop_data_versions (family, note)
+    VALUES (%(family)s, %(note)s)
+    ON CONFLICT (family) DO UPDATE
+    SET version = edop_data_versions.version + 1, updated_at = now(), note = excluded.note
+    RETURNING version
+"""
+
+# family -> (version, updated_at); replaced wholesale on each poll
+_VERSIONS: Dict[str, Tuple[int, datetime]] = {}
+_STATS: Dict[str, Any] = {"polls": 0, "changes": 0}
+_LOCK = threading.Lock()
+_STARTED = False
+
+
+def get(family: str) -> Optional[Tuple[int, datetime]]:
+    """(version, updated_at) of family, or None if it is not registered (yet)."""
+    return _VERSIONS.get(family)
+
+
+def refresh(conn: psycopg.Connection) -> bool:
+    """Re-read the registry. Returns True if any version changed."""
+    global _VERSIONS
+    with conn.cursor() as cur:
+        cur.execute(_VERSIONS_SQL)
+        versions = {row[0]: (row[1], row[2]) for row in cur.fetchall()}
+    _STATS["polls"] += 1
+    if versions == _VERSIONS:
+        return False
+    _VERSIONS = versions
+    _STATS["changes"] += 1
+    _STATS["changed_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    return True
+
+
+def bump(conn: psycopg.Connection, family: str, note: Optional[str] = None) -> int:
+    """Increment family's version (registering it if needed) and return the new version.
+
+    Called by the batch scripts after they rewrite a family's tables; runs in
+    the caller's transaction, so bump before commit to publish both together.
+    """
+    if family not in FAMILIES:
+        raise ValueError(f"Unknown data family {family!r}; expected one of {FAMILIES}")
+    with conn.cursor() as cur:
+        cur.execute(_BUMP_SQL, {"family": family, "note": note})
+        return cur.fetchone()[0]
+
+
+def _run(conn_factory) -> None:
+    while True:
+        try:
+            with conn_factory() as conn:
+                refresh(conn)
+            _STATS.pop("error", None)
+        except Exception as e:
+            # Keep the last versions we saw; a missing table leaves caching off
+            _STATS["error"] = str(e)
+        time.sleep(settings.DATA_VERSIONS_POLL_S)
+
+
+def start(conn_factory) -> None:
+    """Poll the registry in a background thread (first read happens right away)."""
+    global _STARTED
+    with _LOCK:
+        if _STARTED:
+            return
+        _STARTED = True
+    threading.Thread(target=_run, args=(conn_factory,), name="data-versions", daemon=True).start()
+
+
+def stats() -> Dict[str, Any]:
+    out = dict(_STATS)
+    out["versions"] = {family: version for family, (version, _) in sorted(_VERSIONS.items())}
+    return out
@@ -0,0 +1,846 @@
+"""Point elevation for signatures: a chain of swappable providers.
+
+Providers are tried in the order given by EDOP_ELEV_PROVIDERS (default
+"local,opentopodata,open-meteo"):
+
+  - local        : LocalDEM, bilinear samples from 1°x1° numpy tiles on disk,
+                   memory-mapped (microseconds per point, works offline)
+  - opentopodata : OpenTopoData /mapzen (~30m), HTTPS
+  - open-meteo   : Open-Meteo elevation (Copernicus GLO-90), HTTPS
+
+The local backend is skipped when EDOP_ELEV_DEM_DIR has no dem.json. Points
+outside the local tile set (or on nodata cells) fall through to the HTTP
+providers, whose results are cached in-process; local samples are not cached.
+
+Remote providers each carry a circuit breaker (EDOP_ELEV_BREAKER_*) and a
+latency histogram, both reported in /api/health. With EDOP_ELEV_HEDGE_MS > 0
+the next provider is fired when the current one is slower than the budget and
+the first good answer wins. Base URLs are configurable (EDOP_OPENTOPODATA_URL,
+EDOP_OPEN_METEO_URL) so the chain can be exercised against the stub servers in
+scripts/stub_elevation_servers.py.
+
+Tile layout (EDOP_ELEV_DEM_DIR):
+
+    dem.json          {"dataset": "...", "resolution_m": 90, "nodata": -32768}
+    N16W004.npy       2-D array for lat 16..17, lon -4..-3; row 0 = north edge,
+    ...               last row/col = south/east edge (grid-registered, (n+1)x(n+1))
+
+Cut tiles from any GeoTIFF (needs rasterio) with:
+
+    python -m app.db.elevation build --src copernicus_glo90.tif --size 1200
+"""
+import abc
+import argparse
+import asyncio
+import bisect
+import contextvars
+import json
+import math
+import os
+import ssl
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+import httpx
+import numpy as np
+
+from app import metrics
+from app.db.cache import LRUCache
+from app.settings import settings
+
+try:
+    import certifi  # type: ignore
+except Exception:  # pragma: no cover
+    certifi = None
+
+# -----------------------
+# Cache
+# -----------------------
+
+# In-process elevation cache (per worker) to avoid repeated HTTP lookups.
+# Key is rounded (lat, lon) to 5 decimals (~1m-2m at equator in lat; good enough for caching).
+# Failed lookups are cached too, but only briefly so a flaky provider gets retried.
+_ELEV_CACHE = LRUCache(
+    "elevation",
+    max_items=settings.ELEV_CACHE_MAX_ITEMS,
+    ttl_s=settings.ELEV_CACHE_TTL_S,
+)
+
+
+def _coord_key(lat: float, lon: float) -> Tuple[float, float]:
+    return (round(float(lat), 5), round(float(lon), 5))
+
+
+def _cache_get(lat: float, lon: float) -> Optional[Dict[str, Any]]:
+    return _ELEV_CACHE.get(_coord_key(lat, lon))
+
+
+def _cache_set(lat: float, lon: float, val: Dict[str, Any]) -> None:
+    ttl = settings.ELEV_CACHE_ERROR_TTL_S if val.get("elev_point") is None else None
+    _ELEV_CACHE.set(_coord_key(lat, lon), val, ttl_s=ttl)
+
+
+# -----------------------
+# HTTP helpers
+# -----------------------
+
+def _ssl_context() -> ssl.SSLContext:
+    # Some environments (notably minimal Linux images) lack CA certificates,
+    # causing CERTIFICATE_VERIFY_FAILED. Prefer certifi's bundle when available.
+    # For local/dev emergency only, set EDOP_SSL_NO_VERIFY=1 to bypass verification.
+    no_verify = os.getenv("EDOP_SSL_NO_VERIFY", "0") in ("1", "true", "True", "yes", "YES")
+
+    if no_verify:
+        return ssl._create_unverified_context()
+    if certifi is not None:
+        return ssl.create_default_context(cafile=certifi.where())
+    return ssl.create_default_context()
+
+
+_HTTP_HEADERS = {
+    "Accept": "application/json",
+    "User-Agent": "edop-pilot/0.1",
+}
+
+# Errors a provider may raise that mean "try the next one"
+_SYNC_ERRORS = (HTTPError, URLError, TimeoutError, ValueError, RuntimeError)
+_ASYNC_ERRORS = (httpx.HTTPError, ValueError, RuntimeError)
+
+
+def _http_get_json(url: str, timeout_s: float = 4.0) -> Dict[str, Any]:
+    req = Request(url, headers=_HTTP_HEADERS, method="GET")
+    with metrics.external("elevation"), urlopen(req, timeout=timeout_s, context=_ssl_context()) as resp:
+        data = resp.read().decode("utf-8")
+        return json.loads(data)
+
+
+async def _http_get_json_async(client: httpx.AsyncClient, url: str, timeout_s: float = 4.0) -> Dict[str, Any]:
+    with metrics.external("elevation"):
+        resp = await client.get(url, headers=_HTTP_HEADERS, timeout=timeout_s)
+        resp.raise_for_status()
+        return resp.json()
+
+
+# -----------------------
+# Provider health: latency histogram + circuit breaker
+# -----------------------
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram in ms (cumulative "le" counts, Prometheus-style)."""
+
+    BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2000, 4000, 8000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        i = bisect.bisect_left(self.BUCKETS_MS, ms)
+        with self._lock:
+            self._counts[i] += 1
+            self.count += 1
+            self.sum_ms += ms
+            if ms > self.max_ms:
+                self.max_ms = ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = list(self._counts)
+            count, sum_ms, max_ms = self.count, self.sum_ms, self.max_ms
+        buckets: Dict[str, int] = {}
+        running = 0
+        for le, n in zip([str(b) for b in self.BUCKETS_MS] + ["+Inf"], counts):
+            running += n
+            buckets[le] = running
+        return {
+            "count": count,
+            "avg_ms": round(sum_ms / count, 1) if count else None,
+            "max_ms": round(max_ms, 1),
+            "buckets": buckets,
+        }
+
+
+class CircuitBreaker:
+    """Skip a provider after `threshold` consecutive failures, for `cooldown_s`.
+
+    After the cooldown, calls are let through again (half-open); the next failure
+    re-opens the circuit immediately and a success closes it.
+    """
+
+    def __init__(self, threshold: int, cooldown_s: float):
+        self.threshold = threshold
+        self.cooldown_s = cooldown_s
+        self._lock = threading.Lock()
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.successes = 0
+        self.failures = 0
+
+    def state(self) -> str:
+        if self.threshold <= 0 or self.consecutive_failures < self.threshold:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.cooldown_s:
+            return "open"
+        return "half-open"
+
+    def allow(self) -> bool:
+        return self.state() != "open"
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            if ok:
+                self.successes += 1
+                self.consecutive_failures = 0
+                return
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.threshold > 0 and self.consecutive_failures >= self.threshold:
+                if self.consecutive_failures == self.threshold:
+                    self.times_opened += 1
+                self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state(),
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "successes": self.successes,
+            "failures": self.failures,
+        }
+
+
+# -----------------------
+# Providers
+# -----------------------
+
+class ElevationProvider(abc.ABC):
+    """Interface for one elevation source.
+
+    sample()/sample_many() return the elev_* dict for each point, or None when
+    the source has no value there; transport/API failures raise.
+    """
+
+    name = "base"
+    # Remote results are worth caching; local samples are cheaper than a cache hit
+    remote = True
+    # Max points per sample_many() call
+    batch_size = 100
+
+    def __init__(self):
+        self.breaker = CircuitBreaker(settings.ELEV_BREAKER_FAILURES, settings.ELEV_BREAKER_COOLDOWN_S)
+        self.latency = LatencyHistogram()
+
+    def sample(self, lat: float, lon: float) -> Optional[Dict[str, Any]]:
+        return self.sample_many([(lat, lon)])[0]
+
+    @abc.abstractmethod
+    def sample_many(self, points: Sequence[Tuple[float, float]]) -> List[Optional[Dict[str, Any]]]:
+        """One result (or None) per point, in order."""
+
+    async def sample_async(self, lat: float, lon: float, client: httpx.AsyncClient) -> Optional[Dict[str, Any]]:
+        return self.sample(lat, lon)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"name": self.name, "breaker": self.breaker.stats(), "latency_ms": self.latency.snapshot()}
+
+
+class OpenTopoDataProvider(ElevationProvider):
+    name = "opentopodata"
+
+    def __init__(self, base_url: Optional[str] = None):
+        super().__init__()
+        self.base_url = base_url or settings.ELEV_OPENTOPODATA_URL
+
+    def _meta(self, elev: float) -> Dict[str, Any]:
+        return {
+            "elev_point": float(elev),
+            "elev_source": "opentopodata",
+            "elev_dataset": "mapzen",
+            "elev_resolution_m": 30,
+        }
+
+    def _url(self, points: Sequence[Tuple[float, float]]) -> str:
+        # OpenTopoData uses locations=lat,lon|lat,lon
+        qs = urlencode({"locations": "|".join(f"{lat},{lon}" for lat, lon in points)})
+        return f"{self.base_url}?{qs}"
+
+    def _parse(self, payload: Dict[str, Any], n: int) -> List[Optional[Dict[str, Any]]]:
+        if payload.get("status") != "OK":
+            raise RuntimeError(payload.get("error") or f"OpenTopoData status={payload.get('status')}")
+
+        results = payload.get("results") or []
+        if len(results) != n:
+            raise RuntimeError(f"OpenTopoData returned {len(results)} results for {n} points")
+
+        return [self._meta(r["elevation"]) if r.get("elevation") is not None else None for r in results]
+
+    def sample(self, lat: float, lon: float) -> Optional[Dict[str, Any]]:
+        return self._parse(_http_get_json(self._url([(lat, lon)])), 1)[0]
+
+    def sample_many(self, points: Sequence[Tuple[float, float]]) -> List[Optional[Dict[str, Any]]]:
+        return self._parse(_http_get_json(self._url(points), timeout_s=10.0), len(points))
+
+    async def sample_async(self, lat: float, lon: float, client: httpx.AsyncClient) -> Optional[Dict[str, Any]]:
+        return self._parse(await _http_get_json_async(client, self._url([(lat, lon)])), 1)[0]
+
+
+class OpenMeteoProvider(ElevationProvider):
+    name = "open-meteo"
+
+    def __init__(self, base_url: Optional[str] = None):
+        super().__init__()
+        self.base_url = base_url or settings.ELEV_OPEN_METEO_URL
+
+    def _meta(self, elev: float) -> Dict[str, Any]:
+        return {
+            "elev_point": float(elev),
+            "elev_source": "open-meteo",
+            "elev_dataset": "copernicus-dem-glo-90-2021",
+            "elev_resolution_m": 90,
+        }
+
+    def _url(self, points: Sequence[Tuple[float, float]]) -> str:
+        # Open-Meteo Elevation API uses latitude=..&longitude=.. (comma-separated lists)
+        qs = urlencode({
+            "latitude": ",".join(str(lat) for lat, _ in points),
+            "longitude": ",".join(str(lon) for _, lon in points),
+        })
+        return f"{self.base_url}?{qs}"
+
+    def _parse(self, payload: Dict[str, Any], n: int) -> List[Optional[Dict[str, Any]]]:
+        # API commonly returns: {"elevation": [..], "latitude": [..], "longitude": [..]}
+        elevs = payload.get("elevation")
+        if elevs is not None and not isinstance(elevs, list):
+            elevs = [elevs]
+        if not elevs or len(elevs) != n:
+            raise RuntimeError("Open-Meteo elevation missing or incomplete in response")
+
+        return [self._meta(e) if e is not None else None for e in elevs]
+
+    def sample(self, lat: float, lon: float) -> Optional[Dict[str, Any]]:
+        return self._parse(_http_get_json(self._url([(lat, lon)])), 1)[0]
+
+    def sample_many(self, points: Sequence[Tuple[float, float]]) -> List[Optional[Dict[str, Any]]]:
+        return self._parse(_http_get_json(self._url(points), timeout_s=10.0), len(points))
+
+    async def sample_async(self, lat: float, lon: float, client: httpx.AsyncClient) -> Optional[Dict[str, Any]]:
+        return self._parse(await _http_get_json_async(client, self._url([(lat, lon)])), 1)[0]
+
+
+def _tile_name(lat0: int, lon0: int) -> str:
+    return f"{'N' if lat0 >= 0 else 'S'}{abs(lat0):02d}{'E' if lon0 >= 0 else 'W'}{abs(lon0):03d}.npy"
+
+
+class LocalDEM(ElevationProvider):
+    """Bilinear sampling from memory-mapped 1°x1° .npy tiles (see module docstring)."""
+
+    name = "local"
+    remote = False
+    batch_size = 100_000
+
+    def __init__(self, root: Path):
+        super().__init__()
+        self.root = Path(root)
+        with open(self.root / "dem.json", encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.dataset = manifest.get("dataset", "local-dem")
+        self.resolution_m = manifest.get("resolution_m")
+        self.nodata = manifest.get("nodata")
+        # (lat0, lon0) -> memmap, or None for tiles that don't exist on disk
+        self._tiles: Dict[Tuple[int, int], Optional[np.ndarray]] = {}
+        self.samples = 0
+        self.misses = 0
+
+    def _tile(self, lat0: int, lon0: int) -> Optional[np.ndarray]:
+        key = (lat0, lon0)
+        if key not in self._tiles:
+            path = self.root / _tile_name(lat0, lon0)
+            # Racing threads may both open the same tile; harmless
+            self._tiles[key] = np.load(path, mmap_mode="r") if path.exists() else None
+        return self._tiles[key]
+
+    def _meta(self, elev: float) -> Dict[str, Any]:
+        return {
+            "elev_point": elev,
+            "elev_source": "local-dem",
+            "elev_dataset": self.dataset,
+            "elev_resolution_m": self.resolution_m,
+        }
+
+    def _interpolate(self, tile: np.ndarray, lats: np.ndarray, lons: np.ndarray,
+                     lat0: int, lon0: int) -> np.ndarray:
+        """Bilinear elevation for points inside one tile; NaN where any corner is nodata."""
+        h, w = tile.shape
+        y = (lat0 + 1 - lats) * (h - 1)
+        x = (lons - lon0) * (w - 1)
+        r = np.clip(np.floor(y).astype(np.int64), 0, h - 2)
+        c = np.clip(np.floor(x).astype(np.int64), 0, w - 2)
+        fy = np.clip(y - r, 0.0, 1.0)
+        fx = np.clip(x - c, 0.0, 1.0)
+
+        corners = np.stack([tile[r, c], tile[r, c + 1], tile[r + 1, c], tile[r + 1, c + 1]]).astype(np.float64)
+        if self.nodata is not None:
+            corners[corners == self.nodata] = np.nan
+        top = corners[0] * (1 - fx) + corners[1] * fx
+        bottom = corners[2] * (1 - fx) + corners[3] * fx
+        return top * (1 - fy) + bottom * fy
+
+    def sample(self, lat: float, lon: float) -> Optional[Dict[str, Any]]:
+        lat0, lon0 = math.floor(lat), math.floor(lon)
+        tile = self._tile(lat0, lon0)
+        self.samples += 1
+        if tile is None:
+            self.misses += 1
+            return None
+        # Scalar twin of _interpolate(); avoids numpy call overhead on the hot single-point path
+        h, w = tile.shape
+        y = (lat0 + 1 - lat) * (h - 1)
+        x = (lon - lon0) * (w - 1)
+        r = min(max(int(y), 0), h - 2)
+        c = min(max(int(x), 0), w - 2)
+        fy = min(max(y - r, 0.0), 1.0)
+        fx = min(max(x - c, 0.0), 1.0)
+        z00, z01 = float(tile[r, c]), float(tile[r, c + 1])
+        z10, z11 = float(tile[r + 1, c]), float(tile[r + 1, c + 1])
+        if self.nodata is not None and self.nodata in (z00, z01, z10, z11):
+            self.misses += 1
+            return None
+        top = z00 * (1 - fx) + z01 * fx
+        bottom = z10 * (1 - fx) + z11 * fx
+        return self._meta(top * (1 - fy) + bottom * fy)
+
+    def sample_many(self, points: Sequence[Tuple[float, float]]) -> List[Optional[Dict[str, Any]]]:
+        """Vectorized sample(): one interpolation per tile touched, results in input order."""
+        out: List[Optional[Dict[str, Any]]] = [None] * len(points)
+        if not points:
+            return out
+        pts = np.asarray(points, dtype=np.float64)
+        lat0s = np.floor(pts[:, 0]).astype(np.int64)
+        lon0s = np.floor(pts[:, 1]).astype(np.int64)
+        keys, inverse = np.unique(np.stack([lat0s, lon0s], axis=1), axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+
+        elevs = np.full(len(pts), np.nan)
+        for k, (lat0, lon0) in enumerate(keys.tolist()):
+            tile = self._tile(lat0, lon0)
+            if tile is None:
+                continue
+            idx = np.nonzero(inverse == k)[0]
+            elevs[idx] = self._interpolate(tile, pts[idx, 0], pts[idx, 1], lat0, lon0)
+
+        for i, e in enumerate(elevs.tolist()):
+            if not math.isnan(e):
+                out[i] = self._meta(e)
+        self.samples += len(pts)
+        self.misses += int(np.isnan(elevs).sum())
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "root": str(self.root),
+            "dataset": self.dataset,
+            "tiles_open": sum(1 for t in self._tiles.values() if t is not None),
+            "samples": self.samples,
+            "misses": self.misses,
+        }
+
+
+# -----------------------
+# Provider chain
+# -----------------------
+
+_CHAIN: Optional[List[ElevationProvider]] = None
+_CHAIN_NOTES: Dict[str, str] = {}
+
+
+def _build_provider(name: str) -> Optional[ElevationProvider]:
+    if name == "opentopodata":
+        return OpenTopoDataProvider()
+    if name == "open-meteo":
+        return OpenMeteoProvider()
+    if name == "local":
+        root = Path(settings.ELEV_DEM_DIR)
+        if not (root / "dem.json").exists():
+            _CHAIN_NOTES[name] = f"no dem.json in {root}"
+            return None
+        return LocalDEM(root)
+    _CHAIN_NOTES[name] = "unknown provider"
+    return None
+
+
+def get_providers() -> List[ElevationProvider]:
+    """The configured provider chain (built once per process)."""
+    global _CHAIN
+    if _CHAIN is None:
+        names = [n.strip() for n in settings.ELEV_PROVIDERS.split(",") if n.strip()]
+        _CHAIN = [p for p in (_build_provider(n) for n in names) if p is not None]
+    return _CHAIN
+
+
+def _failed(errors: List[str]) -> Dict[str, Any]:
+    return {
+        "elev_point": None,
+        "elev_error": "; ".join(errors) or "elevation lookup failed",
+    }
+
+
+def _split_chain() -> Tuple[List[ElevationProvider], List[ElevationProvider]]:
+    providers = get_providers()
+    return [p for p in providers if not p.remote], [p for p in providers if p.remote]
+
+
+def _live(providers: List[ElevationProvider], errors: List[str]) -> List[ElevationProvider]:
+    """Providers whose circuit breaker currently lets calls through."""
+    live = []
+    for p in providers:
+        if p.breaker.allow():
+            live.append(p)
+        else:
+            errors.append(f"{p.name}: circuit open")
+    return live
+
+
+def _timed(provider: ElevationProvider, fn, *args):
+    """Call a provider method, recording its latency and breaker outcome."""
+    t0 = time.perf_counter()
+    try:
+        val = fn(*args)
+    except _SYNC_ERRORS:
+        provider.latency.observe((time.perf_counter() - t0) * 1000.0)
+        provider.breaker.record(False)
+        raise
+    provider.latency.observe((time.perf_counter() - t0) * 1000.0)
+    provider.breaker.record(True)
+    return val
+
+
+async def _timed_async(provider: ElevationProvider, lat: float, lon: float,
+                       client: httpx.AsyncClient) -> Optional[Dict[str, Any]]:
+    # A hedged loser that gets cancelled records nothing
+    t0 = time.perf_counter()
+    try:
+        val = await provider.sample_async(lat, lon, client)
+    except _ASYNC_ERRORS:
+        provider.latency.observe((time.perf_counter() - t0) * 1000.0)
+        provider.breaker.record(False)
+        raise
+    provider.latency.observe((time.perf_counter() - t0) * 1000.0)
+    provider.breaker.record(True)
+    return val
+
+
+def _sample_local(lat: float, lon: float, errors: List[str]) -> Optional[Dict[str, Any]]:
+    for provider in _split_chain()[0]:
+        val = provider.sample(lat, lon)
+        if val is not None:
+            return val
+        errors.append(f"{provider.name}: no value")
+    return None
+
+
+_HEDGE_POOL: Optional[ThreadPoolExecutor] = None
+_HEDGE_POOL_LOCK = threading.Lock()
+
+
+def _hedge_pool() -> ThreadPoolExecutor:
+    global _HEDGE_POOL
+    with _HEDGE_POOL_LOCK:
+        if _HEDGE_POOL is None:
+            _HEDGE_POOL = ThreadPoolExecutor(max_workers=settings.ELEV_HEDGE_WORKERS,
+                                             thread_name_prefix="elev-hedge")
+        return _HEDGE_POOL
+
+
+def _sample_remote(providers: List[ElevationProvider], lat: float, lon: float,
+                   errors: List[str]) -> Optional[Dict[str, Any]]:
+    """First good answer from the remote providers.
+
+    Sequential fallback when EDOP_ELEV_HEDGE_MS is 0. Otherwise the next provider
+    is also fired whenever the ones in flight haven't answered within the budget
+    (or one of them failed); slower calls finish in the background so their
+    latency and breaker outcome are still recorded.
+    """
+    budget_s = settings.ELEV_HEDGE_MS / 1000.0
+    if budget_s <= 0 or len(providers) < 2:
+        for p in providers:
+            try:
+                val = _timed(p, p.sample, lat, lon)
+            except _SYNC_ERRORS as e:
+                errors.append(f"{p.name}: {e}")
+                continue
+            if val is not None:
+                return val
+            errors.append(f"{p.name}: no value")
+        return None
+
+    queue = list(providers)
+    pending: Dict[Future, ElevationProvider] = {}
+
+    def launch() -> None:
+        p = queue.pop(0)
+        # Run in the request's context so the call is timed against it (app/metrics.py)
+        pending[_hedge_pool().submit(contextvars.copy_context().run, _timed, p, p.sample, lat, lon)] = p
+
+    launch()
+    while pending:
+        done, _ = wait(pending, timeout=budget_s if queue else None, return_when=FIRST_COMPLETED)
+        if not done:
+            launch()
+            continue
+        for f in done:
+            p = pending.pop(f)
+            try:
+                val = f.result()
+            except _SYNC_ERRORS as e:
+                errors.append(f"{p.name}: {e}")
+                continue
+            if val is not None:
+                return val
+            errors.append(f"{p.name}: no value")
+        if queue:
+            launch()
+    return None
+
+
+async def _sample_remote_async(providers: List[ElevationProvider], lat: float, lon: float,
+                               client: httpx.AsyncClient, errors: List[str]) -> Optional[Dict[str, Any]]:
+    """Async twin of _sample_remote(); losing hedged requests are cancelled."""
+    budget_s = settings.ELEV_HEDGE_MS / 1000.0
+    if budget_s <= 0 or len(providers) < 2:
+        for p in providers:
+            try:
+                val = await _timed_async(p, lat, lon, client)
+            except _ASYNC_ERRORS as e:
+                errors.append(f"{p.name}: {e}")
+                continue
+            if val is not None:
+                return val
+            errors.append(f"{p.name}: no value")
+        return None
+
+    queue = list(providers)
+    pending: Dict[asyncio.Task, ElevationProvider] = {}
+
+    def launch() -> None:
+        p = queue.pop(0)
+        pending[asyncio.create_task(_timed_async(p, lat, lon, client))] = p
+
+    try:
+        launch()
+        while pending:
+            done, _ = await asyncio.wait(pending, timeout=budget_s if queue else None,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                launch()
+                continue
+            for t in done:
+                p = pending.pop(t)
+                try:
+                    val = t.result()
+                except _ASYNC_ERRORS as e:
+                    errors.append(f"{p.name}: {e}")
+                    continue
+                if val is not None:
+                    return val
+                errors.append(f"{p.name}: no value")
+            if queue:
+                launch()
+        return None
+    finally:
+        for t in pending:
+            t.cancel()
+
+
+def get_elevation_point(lat: float, lon: float) -> Dict[str, Any]:
+    """Return elevation metadata dict.
+
+    Always returns a dict with keys:
+      - elev_point (float) when available else None
+      - elev_source, elev_dataset, elev_resolution_m when available
+      - elev_error when every provider fails
+
+    Local providers are tried first, then the cache, then the remote providers
+    in EDOP_ELEV_PROVIDERS order (hedged when EDOP_ELEV_HEDGE_MS > 0).
+    """
+    errors: List[str] = []
+    val = _sample_local(lat, lon, errors)
+    if val is not None:
+        return val
+
+    cached = _cache_get(lat, lon)
+    if cached is not None:
+        return cached
+
+    val = _sample_remote(_live(_split_chain()[1], errors), lat, lon, errors) or _failed(errors)
+    _cache_set(lat, lon, val)
+    return val
+
+
+async def get_elevation_point_async(lat: float, lon: float, client: httpx.AsyncClient) -> Dict[str, Any]:
+    """Async variant of get_elevation_point() for the async API router; same chain and cache."""
+    errors: List[str] = []
+    val = _sample_local(lat, lon, errors)
+    if val is not None:
+        return val
+
+    cached = _cache_get(lat, lon)
+    if cached is not None:
+        return cached
+
+    val = await _sample_remote_async(_live(_split_chain()[1], errors), lat, lon, client, errors)
+    val = val or _failed(errors)
+    _cache_set(lat, lon, val)
+    return val
+
+
+def get_elevation_points(points: Sequence[Tuple[float, float]]) -> List[Dict[str, Any]]:
+    """Bulk get_elevation_point(): same dict shape per (lat, lon), in input order.
+
+    Each provider gets the points still missing, in batches of its batch_size
+    (one vectorized call for the local DEM, 100 per HTTP request otherwise).
+    Cached points are served after the local providers. Remote batches respect
+    the circuit breakers but are not hedged.
+    """
+    out: List[Optional[Dict[str, Any]]] = [None] * len(points)
+    errors: List[str] = []
+    local, remote = _split_chain()
+
+    def run(provider: ElevationProvider) -> None:
+        todo = [i for i, v in enumerate(out) if v is None]
+        for start in range(0, len(todo), provider.batch_size):
+            chunk = todo[start:start + provider.batch_size]
+            try:
+                if provider.remote:
+                    vals = _timed(provider, provider.sample_many, [points[i] for i in chunk])
+                else:
+                    vals = provider.sample_many([points[i] for i in chunk])
+            except _SYNC_ERRORS as e:
+                errors.append(f"{provider.name}: {e}")
+                continue
+            for i, val in zip(chunk, vals):
+                if val is not None:
+                    out[i] = val
+                    if provider.remote:
+                        _cache_set(points[i][0], points[i][1], val)
+        if any(out[i] is None for i in todo):
+            errors.append(f"{provider.name}: no value for some points")
+
+    for provider in local:
+        if all(v is not None for v in out):
+            break
+        run(provider)
+
+    for i, (lat, lon) in enumerate(points):
+        if out[i] is None:
+            out[i] = _cache_get(lat, lon)
+
+    for provider in remote:
+        if all(v is not None for v in out):
+            break
+        if not provider.breaker.allow():
+            errors.append(f"{provider.name}: circuit open")
+            continue
+        run(provider)
+
+    for i, v in enumerate(out):
+        if v is None:
+            out[i] = _failed(errors)
+
+    return out  # type: ignore[return-value]
+
+
+def stats() -> Dict[str, Any]:
+    """Provider chain and local DEM counters, for /api/health."""
+    out: Dict[str, Any] = {"providers": [p.stats() for p in get_providers()]}
+    if _CHAIN_NOTES:
+        out["skipped"] = dict(_CHAIN_NOTES)
+    return out
+
+
+# -----------------------
+# Tile builder / benchmark CLI
+# -----------------------
+
+def build_tiles(src: str, out_dir: Path, size: int, dataset: str, resolution_m: Optional[int]) -> int:
+    """Cut a GeoTIFF (EPSG:4326) into 1°x1° (size+1)x(size+1) grid-registered .npy tiles."""
+    import rasterio  # type: ignore
+    from rasterio.enums import Resampling  # type: ignore
+    from rasterio.windows import from_bounds  # type: ignore
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    n = 0
+    with rasterio.open(src) as ds:
+        nodata = ds.nodata if ds.nodata is not None else -32768
+        left, bottom, right, top = ds.bounds
+        # Pad by half a target cell so pixel centres land on the tile grid lines
+        half = 0.5 / size
+        for lat0 in range(math.floor(bottom), math.ceil(top)):
+            for lon0 in range(math.floor(left), math.ceil(right)):
+                window = from_bounds(lon0 - half, lat0 - half, lon0 + 1 + half, lat0 + 1 + half, ds.transform)
+                arr = ds.read(
+                    1, window=window, out_shape=(size + 1, size + 1),
+                    boundless=True, fill_value=nodata, resampling=Resampling.bilinear,
+                )
+                if (arr == nodata).all():
+                    continue
+                np.save(out_dir / _tile_name(lat0, lon0), arr.astype(np.int16))
+                n += 1
+
+    with open(out_dir / "dem.json", "w", encoding="utf-8") as f:
+        json.dump({"dataset": dataset, "resolution_m": resolution_m, "nodata": int(nodata)}, f, indent=2)
+    return n
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Local DEM tiles for app/db/elevation.py")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    b = sub.add_parser("build", help="Cut a GeoTIFF into .npy tiles (requires rasterio)")
+    b.add_argument("--src", required=True, help="Input GeoTIFF in EPSG:4326")
+    b.add_argument("--out", default=settings.ELEV_DEM_DIR)
+    b.add_argument("--size", type=int, default=1200, help="Cells per degree (1200 ~ 90m)")
+    b.add_argument("--dataset", default="copernicus-dem-glo-90-2021")
+    b.add_argument("--resolution-m", type=int, default=90)
+
+    t = sub.add_parser("bench", help="Time local point and batch sampling")
+    t.add_argument("--dir", default=settings.ELEV_DEM_DIR)
+    t.add_argument("--n", type=int, default=10_000)
+
+    args = ap.parse_args()
+
+    if args.cmd == "build":
+        t0 = time.perf_counter()
+        n = build_tiles(args.src, Path(args.out), args.size, args.dataset, args.resolution_m)
+        print(f"Wrote {n} tiles to {args.out} in {time.perf_counter() - t0:.1f}s")
+        return
+
+    dem = LocalDEM(Path(args.dir))
+    # Timbuktu, as in app/db/signature.py main()
+    t0 = time.perf_counter()
+    val = dem.sample(16.76618535, -3.00777252)
+    print(f"sample(Timbuktu) -> {val} (first call, includes tile open: {(time.perf_counter() - t0) * 1e6:.0f} µs)")
+    t0 = time.perf_counter()
+    for _ in range(1000):
+        dem.sample(16.76618535, -3.00777252)
+    print(f"sample(): {(time.perf_counter() - t0) * 1e3:.1f} µs/point (warm)")
+
+    rng = np.random.default_rng(0)
+    pts = list(zip(rng.uniform(16, 17, args.n).tolist(), rng.uniform(-4, -3, args.n).tolist()))
+    t0 = time.perf_counter()
+    dem.sample_many(pts)
+    print(f"sample_many({args.n}): {(time.perf_counter() - t0) * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""In-memory autocomplete over gaz.edop_gaz titles for /api/gaz-suggest.
+
+Titles, plus alternate names where a source has them (DK Atlas `names`), are
+normalized (casefolded, diacritics stripped, punctuation collapsed) into one
+sorted key array. A prefix query is two bisects for the matching key range
+and a numpy partial sort of that range by a precomputed rank:
+
+    exact key match, then title before alternate name, then source priority
+    (wh_cities, dkatlas, pleiades, WHG imports), then popularity (how many
+    gazetteer records share the normalized title), then shorter titles.
+
+Enabled with EDOP_GAZ_SUGGEST=1; built in a background thread at startup, with
+/api/gaz-suggest falling back to SQL until it is ready. A refresh thread
+re-checks gaz.edop_gaz every EDOP_GAZ_SUGGEST_REFRESH_S: appended rows (the
+import scripts only INSERT) are fetched on their own and merged in; any other
+change triggers a full reload. Benchmark: scripts/bench_gaz_suggest.py.
+"""
+import bisect
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import psycopg
+
+from app.settings import settings
+
+_PLACES_SQL = """
+    SELECT id, source, source_id, title, ccodes, lon, lat
+    FROM gaz.edop_gaz
+    WHERE id > %s
+    ORDER BY id
+"""
+
+# Alternate names are optional: only some sources carry them
+_ALT_NAMES_SQL = """
+    SELECT g.id, d.names::text
+    FROM gaz.edop_gaz g
+    JOIN gaz.dkatlas_geom d ON d.id::text = g.source_id
+    WHERE g.source = 'dkatlas'
+      AND g.id > %s
+      AND d.names IS NOT NULL
+"""
+
+_FINGERPRINT_SQL = "SELECT count(*), coalesce(max(id), 0), coalesce(max(xmin::text::bigint), 0) FROM gaz.edop_gaz"
+_OLD_ROWS_XMIN_SQL = "SELECT coalesce(max(xmin::text::bigint), 0) FROM gaz.edop_gaz WHERE id <= %s"
+
+SOURCE_PRIORITY = {"wh_cities": 0, "dkatlas": 1, "pleiades": 2}
+_OTHER_SOURCE = 3
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_NAME_SPLIT = re.compile(r"[;|,\n]")
+
+
+# Dropped rather than turned into spaces: combining accents, modifier letters
+# (ʿ ʾ in transliterations) and apostrophes, so "Ṣanʿāʾ" matches "sanaa"
+_DROP_CATEGORIES = {"Mn", "Lm", "Sk"}
+_APOSTROPHES = set("'’‘`")
+
+
+def normalize(text: str) -> str:
+    """Casefold, strip diacritics, and collapse anything non-alphanumeric to single spaces."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    stripped = "".join(ch for ch in decomposed
+                       if ch not in _APOSTROPHES and unicodedata.category(ch) not in _DROP_CATEGORIES)
+    return _NON_ALNUM.sub(" ", stripped).strip()
+
+
+def _split_names(raw: str) -> List[str]:
+    # names::text may be a delimited string or an array literal ({"a","b"})
+    raw = raw.strip().strip("{}")
+    return [n.strip().strip('"').strip() for n in _NAME_SPLIT.split(raw) if n.strip().strip('"').strip()]
+
+
+class SuggestIndex:
+    """Sorted normalized keys -> place rows, with a rank per key (lower is better)."""
+
+    def __init__(self, places: List[Tuple], alt_names: Dict[int, List[str]]):
+        self.places = places
+        self.alt_names = alt_names
+        self.max_id = max((p[0] for p in places), default=0)
+
+        norm_titles = [normalize(p[3] or "") for p in places]
+        popularity = Counter(norm_titles)
+
+        entries = []
+        for i, (place, key) in enumerate(zip(places, norm_titles)):
+            base = (SOURCE_PRIORITY.get(place[1], _OTHER_SOURCE) * 10**7
+                    + (999 - min(popularity[key], 999)) * 10**4
+                    + min(len(key), 9999))
+            if key:
+                entries.append((key, base, i))
+            for alt in alt_names.get(place[0], ()):
+                alt_key = normalize(alt)
+                if alt_key and alt_key != key:
+                    entries.append((alt_key, 10**8 + base, i))
+        entries.sort()
+
+        self.keys = [e[0] for e in entries]
+        self.ranks = np.array([e[1] for e in entries], dtype=np.int64)
+        self.rows = np.array([e[2] for e in entries], dtype=np.int32)
+
+    @classmethod
+    def from_db(cls, conn: psycopg.Connection) -> "SuggestIndex":
+        places, alt_names = _fetch(conn, after_id=0)
+        return cls(places, alt_names)
+
+    def extended(self, conn: psycopg.Connection) -> "SuggestIndex":
+        """A new index with the rows appended since this one was built."""
+        places, alt_names = _fetch(conn, after_id=self.max_id)
+        merged_alt = dict(self.alt_names)
+        merged_alt.update(alt_names)
+        return SuggestIndex(self.places + places, merged_alt)
+
+    def suggest(self, q: str, limit: int) -> List[Tuple]:
+        """Place rows whose title (or alternate name) starts with q, best first."""
+        prefix = normalize(q)
+        if not prefix:
+            return []
+        lo = bisect.bisect_left(self.keys, prefix)
+        # Keys are [0-9a-z ] only, so prefix + DEL bounds everything starting with prefix
+        hi = bisect.bisect_left(self.keys, prefix + "\x7f", lo)
+        if lo == hi:
+            return []
+        exact_hi = bisect.bisect_right(self.keys, prefix, lo, hi)
+
+        ranks = self.ranks[lo:hi].copy()
+        ranks[:exact_hi - lo] -= 10**9
+        # Over-fetch: a place can match under its title and an alternate name
+        n = min(len(ranks), limit * 2)
+        top = np.argpartition(ranks, n - 1)[:n] if n < len(ranks) else np.arange(len(ranks))
+        top = top[np.argsort(ranks[top], kind="stable")]
+
+        out, seen = [], set()
+        for row in self.rows[lo + top].tolist():
+            if row in seen:
+                continue
+            seen.add(row)
+            out.append(self.places[row])
+            if len(out) == limit:
+                break
+        return out
+
+    def __len__(self) -> int:
+        return len(self.places)
+
+
+def _fetch(conn: psycopg.Connection, after_id: int) -> Tuple[List[Tuple], Dict[int, List[str]]]:
+    with conn.cursor() as cur:
+        cur.execute(_PLACES_SQL, (after_id,))
+        places = cur.fetchall()
+    alt_names: Dict[int, List[str]] = {}
+    try:
+        with conn.cursor() as cur:
+            cur.execute(_ALT_NAMES_SQL, (after_id,))
+            for gaz_id, raw in cur.fetchall():
+                alt_names[gaz_id] = _split_names(raw)
+    except psycopg.Error:
+        # Alternate names are optional; clear the failed transaction
+        conn.rollback()
+    return places, alt_names
+
+
+# -----------------------
+# Process-wide instance
+# -----------------------
+
+_INDEX: Optional[SuggestIndex] = None
+# (count, max id, max xmin) of gaz.edop_gaz when _INDEX was built
+_FINGERPRINT: Optional[Tuple[int, int, int]] = None
+_STATS: Dict[str, Any] = {"status": "disabled"}
+# Query counters are updated without a lock; they are indicative, not exact
+_QUERIES = {"count": 0, "total_us": 0.0}
+_LOCK = threading.Lock()
+
+
+def _fingerprint(conn: psycopg.Connection) -> Tuple[int, int, int]:
+    with conn.cursor() as cur:
+        cur.execute(_FINGERPRINT_SQL)
+        count, max_id, max_xmin = cur.fetchone()
+    return int(count), int(max_id), int(max_xmin)
+
+
+def refresh(conn: psycopg.Connection) -> str:
+    """Bring the index up to date with gaz.edop_gaz; returns what was done."""
+    global _INDEX, _FINGERPRINT
+    t0 = time.perf_counter()
+    fp = _fingerprint(conn)
+    index, old_fp = _INDEX, _FINGERPRINT
+    if index is not None and fp == old_fp:
+        return "unchanged"
+
+    action = "full"
+    if index is not None and old_fp is not None and fp[1] > old_fp[1]:
+        # Pure append: same old rows (count grew by exactly the new ids, old xmins untouched)
+        with conn.cursor() as cur:
+            cur.execute("SELECT count(*) FROM gaz.edop_gaz WHERE id > %s", (old_fp[1],))
+            appended = cur.fetchone()[0]
+            cur.execute(_OLD_ROWS_XMIN_SQL, (old_fp[1],))
+            old_xmin = cur.fetchone()[0]
+        if fp[0] == old_fp[0] + appended and old_xmin <= old_fp[2]:
+            index, action = index.extended(conn), "append"
+        else:
+            index = None
+    if action == "full":
+        index = SuggestIndex.from_db(conn)
+
+    _INDEX, _FINGERPRINT = index, fp
+    _STATS.update({
+        "status": "ready",
+        "places": len(index),
+        "keys": len(index.keys),
+        "last_refresh": action,
+        "refresh_s": round(time.perf_counter() - t0, 3),
+    })
+    return action
+
+
+def _run(conn_factory) -> None:
+    while True:
+        try:
+            with conn_factory() as conn:
+                refresh(conn)
+        except Exception as e:
+            _STATS.update({"status": "ready" if _INDEX is not None else "error", "error": str(e)})
+        time.sleep(settings.GAZ_SUGGEST_REFRESH_S)
+
+
+def start(conn_factory) -> None:
+    """Build the index and keep it fresh in a background thread if EDOP_GAZ_SUGGEST is on."""
+    if not settings.GAZ_SUGGEST:
+        return
+    with _LOCK:
+        if _STATS.get("status") in ("loading", "ready"):
+            return
+        _STATS.clear()
+        _STATS["status"] = "loading"
+    threading.Thread(target=_run, args=(conn_factory,), name="gaz-suggest", daemon=True).start()
+
+
+def suggest(q: str, limit: int) -> Tuple[bool, Sequence[Tuple]]:
+    """Return (ready, rows). ready=False means the index isn't built yet; use SQL."""
+    index = _INDEX
+    if index is None:
+        return False, []
+    t0 = time.perf_counter()
+    rows = index.suggest(q, limit)
+    _QUERIES["count"] += 1
+    _QUERIES["total_us"] += (time.perf_counter() - t0) * 1e6
+    return True, rows
+
+
+def stats() -> Dict[str, Any]:
+    out = dict(_STATS)
+    if _QUERIES["count"]:
+        out["queries"] = _QUERIES["count"]
+        out["avg_query_us"] = round(_QUERIES["total_us"] / _QUERIES["count"], 1)
+    return out
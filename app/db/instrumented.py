@@ -0,0 +1,101 @@
+"""Cursors that report query time and rows to app/metrics.py.
+
+Installed on every pooled connection by the pools' configure callbacks
+(app/db/pool.py), so handlers, dependencies and the background index builders
+are all covered without changes: conn.cursor() and conn.execute() return an
+InstrumentedCursor, conn.cursor(name=...) an InstrumentedServerCursor.
+
+Client-side cursors fetch the whole result during execute(), so its time and
+the result's row count are one record_query(). Server-side cursors report the
+DECLARE as the query and each fetch round trip (including iteration, which
+goes through fetchmany) as record_fetch().
+"""
+import time
+from typing import Any, Iterable, Iterator, List, Optional
+
+import psycopg
+
+from app import metrics
+
+
+def _ntuples(cur: Any) -> int:
+    res = cur.pgresult
+    return res.ntuples if res is not None else 0
+
+
+class InstrumentedCursor(psycopg.Cursor):
+    def execute(self, query, params=None, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return super().execute(query, params, **kwargs)
+        finally:
+            metrics.record_query((time.perf_counter() - t0) * 1000.0, _ntuples(self), query)
+
+    def executemany(self, query, params_seq: Iterable[Any], **kwargs) -> None:
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(query, params_seq, **kwargs)
+        finally:
+            metrics.record_query((time.perf_counter() - t0) * 1000.0, max(self.rowcount, 0), query)
+
+
+class InstrumentedServerCursor(psycopg.ServerCursor):
+    def execute(self, query, params=None, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return super().execute(query, params, **kwargs)
+        finally:
+            metrics.record_query((time.perf_counter() - t0) * 1000.0, 0, query)
+
+    def fetchone(self) -> Optional[Any]:
+        t0 = time.perf_counter()
+        row = super().fetchone()
+        metrics.record_fetch((time.perf_counter() - t0) * 1000.0, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size: int = 0) -> List[Any]:
+        t0 = time.perf_counter()
+        rows = super().fetchmany(size)
+        metrics.record_fetch((time.perf_counter() - t0) * 1000.0, len(rows))
+        return rows
+
+    def fetchall(self) -> List[Any]:
+        t0 = time.perf_counter()
+        rows = super().fetchall()
+        metrics.record_fetch((time.perf_counter() - t0) * 1000.0, len(rows))
+        return rows
+
+    def __iter__(self) -> Iterator[Any]:
+        # Same batching as ServerCursor.__iter__, through the timed fetchmany()
+        while True:
+            rows = self.fetchmany(self.itersize)
+            yield from rows
+            if len(rows) < self.itersize:
+                return
+
+
+class AsyncInstrumentedCursor(psycopg.AsyncCursor):
+    async def execute(self, query, params=None, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return await super().execute(query, params, **kwargs)
+        finally:
+            metrics.record_query((time.perf_counter() - t0) * 1000.0, _ntuples(self), query)
+
+    async def executemany(self, query, params_seq: Iterable[Any], **kwargs) -> None:
+        t0 = time.perf_counter()
+        try:
+            return await super().executemany(query, params_seq, **kwargs)
+        finally:
+            metrics.record_query((time.perf_counter() - t0) * 1000.0, max(self.rowcount, 0), query)
+
+
+def configure(conn: psycopg.Connection) -> None:
+    """ConnectionPool configure callback."""
+    conn.cursor_factory = InstrumentedCursor
+    conn.server_cursor_factory = InstrumentedServerCursor
+
+
+async def configure_async(conn: psycopg.AsyncConnection) -> None:
+    """AsyncConnectionPool configure callback (server-side cursors are not used in async mode)."""
+    conn.cursor_factory = AsyncInstrumentedCursor
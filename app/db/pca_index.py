@@ -0,0 +1,258 @@
+"""Optional in-process nearest-neighbour index over the basin08 PCA vectors.
+
+basin08_pca (pgvector, 190k x 50) is queried with `p1.pca <-> p2.pca` self
+joins, which the ivfflat index can't serve. This module keeps the same vectors
+in memory behind a numpy IVF-Flat index (k-means coarse quantizer, exact L2
+within the probed lists), so top-k environmental neighbours of a basin come
+back in well under a millisecond with the same distances pgvector returns.
+
+Enabled with EDOP_PCA_INDEX=1. Vectors are loaded from output/basin08_pca_coords.npy
+(first 50 components, as in scripts/load_basin_pca_vectors.py) and mapped to
+basin08.id through basin08_pca; the trained index is saved to a snapshot
+(EDOP_PCA_INDEX_SNAPSHOT) so later restarts skip the DB and k-means. Until the
+index is ready, callers fall back to SQL. Rebuild the snapshot with:
+
+    python -m app.db.pca_index
+
+Recall against exact search: scripts/bench_pca_ann.py.
+"""
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import psycopg
+
+from app.settings import settings
+
+# Same truncation as scripts/load_basin_pca_vectors.py
+N_COMPONENTS = 50
+
+_ID_MAP_SQL = "SELECT hybas_id, basin_id FROM basin08_pca"
+
+
+def _sq_dists(x: np.ndarray, c: np.ndarray, c_norms: np.ndarray) -> np.ndarray:
+    """Squared L2 distances between rows of x and rows of c."""
+    return (x * x).sum(1)[:, None] - 2.0 * (x @ c.T) + c_norms[None, :]
+
+
+def _nearest(x: np.ndarray, c: np.ndarray, chunk: int = 20_000) -> np.ndarray:
+    c_norms = (c * c).sum(1)
+    out = np.empty(len(x), dtype=np.int32)
+    for start in range(0, len(x), chunk):
+        out[start:start + chunk] = _sq_dists(x[start:start + chunk], c, c_norms).argmin(1)
+    return out
+
+
+def kmeans(x: np.ndarray, k: int, n_iter: int = 12, sample: int = 60_000, seed: int = 0) -> np.ndarray:
+    """Plain Lloyd k-means on a random sample; returns (k, d) float32 centroids."""
+    rng = np.random.default_rng(seed)
+    if len(x) > sample:
+        x = x[rng.choice(len(x), sample, replace=False)]
+    centroids = x[rng.choice(len(x), k, replace=False)].copy()
+    for _ in range(n_iter):
+        assign = _nearest(x, centroids)
+        sums = np.zeros_like(centroids, dtype=np.float64)
+        np.add.at(sums, assign, x)
+        counts = np.bincount(assign, minlength=k)
+        nonempty = counts > 0
+        centroids[nonempty] = (sums[nonempty] / counts[nonempty, None]).astype(np.float32)
+    return centroids
+
+
+class PcaIndex:
+    """IVF-Flat index: vectors stored grouped by coarse list, exact distances inside probed lists."""
+
+    def __init__(self, ids: np.ndarray, vectors: np.ndarray, centroids: np.ndarray, assign: np.ndarray):
+        order = np.argsort(assign, kind="stable")
+        self.ids = np.ascontiguousarray(ids[order], dtype=np.int64)
+        self.vectors = np.ascontiguousarray(vectors[order], dtype=np.float32)
+        self.norms = (self.vectors * self.vectors).sum(1)
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.centroid_norms = (self.centroids * self.centroids).sum(1)
+        counts = np.bincount(assign, minlength=len(centroids))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        # basin08.id -> row (ids are dense small ints)
+        self._row = np.full(int(self.ids.max()) + 1 if len(self.ids) else 0, -1, dtype=np.int64)
+        self._row[self.ids] = np.arange(len(self.ids))
+
+    @classmethod
+    def build(cls, ids: np.ndarray, vectors: np.ndarray, n_lists: int) -> "PcaIndex":
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        centroids = kmeans(vectors, min(n_lists, len(vectors)))
+        return cls(ids, vectors, centroids, _nearest(vectors, centroids))
+
+    @classmethod
+    def from_npy(cls, conn: psycopg.Connection, coords_path: Path, ids_path: Path, n_lists: int) -> "PcaIndex":
+        """Build from the PCA pipeline outputs, keyed by basin08.id via basin08_pca."""
+        coords = np.load(coords_path, mmap_mode="r")[:, :N_COMPONENTS]
+        hybas_ids = np.load(ids_path)
+        with conn.cursor() as cur:
+            cur.execute(_ID_MAP_SQL)
+            hybas_to_id = {int(h): int(b) for h, b in cur}
+        keep = [i for i, h in enumerate(hybas_ids.tolist()) if int(h) in hybas_to_id]
+        ids = np.asarray([hybas_to_id[int(hybas_ids[i])] for i in keep], dtype=np.int64)
+        return cls.build(ids, np.asarray(coords[keep], dtype=np.float32), n_lists)
+
+    @classmethod
+    def from_snapshot(cls, path: Path) -> "PcaIndex":
+        with np.load(path) as z:
+            return cls(z["ids"], z["vectors"], z["centroids"], z["assign"])
+
+    def save_snapshot(self, path: Path) -> None:
+        assign = np.repeat(np.arange(len(self.centroids), dtype=np.int32), np.diff(self.offsets))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp.npz")
+        np.savez(tmp, ids=self.ids, vectors=self.vectors, centroids=self.centroids, assign=assign)
+        tmp.replace(path)
+
+    def vector(self, basin_id: int) -> Optional[np.ndarray]:
+        if basin_id < 0 or basin_id >= len(self._row) or self._row[basin_id] < 0:
+            return None
+        return self.vectors[self._row[basin_id]]
+
+    def search(self, q: np.ndarray, k: int, nprobe: int, exclude: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate top-k (ids, L2 distances), nearest first."""
+        q = np.asarray(q, dtype=np.float32)
+        n_lists = len(self.centroids)
+        cd = self.centroid_norms - 2.0 * (self.centroids @ q)
+        lists = np.argpartition(cd, nprobe)[:nprobe] if nprobe < n_lists else np.arange(n_lists)
+        # Lists are contiguous row ranges: score them as views, gather only the row numbers
+        spans = [(self.offsets[i], self.offsets[i + 1]) for i in lists]
+        ip = np.concatenate([self.vectors[a:b] @ q for a, b in spans])
+        norms = np.concatenate([self.norms[a:b] for a, b in spans])
+        rows = np.concatenate([np.arange(a, b) for a, b in spans])
+        return self._top_k(norms - 2.0 * ip + float(q @ q), rows, k, exclude)
+
+    def exact(self, q: np.ndarray, k: int, exclude: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Brute-force top-k over every vector (reference for recall)."""
+        q = np.asarray(q, dtype=np.float32)
+        d2 = self.norms - 2.0 * (self.vectors @ q) + float(q @ q)
+        return self._top_k(d2, np.arange(len(self.ids)), k, exclude)
+
+    def _top_k(self, d2: np.ndarray, rows: np.ndarray, k: int, exclude: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+        if exclude is not None:
+            d2[self.ids[rows] == exclude] = np.inf
+        k = min(k, len(rows))
+        top = np.argpartition(d2, k - 1)[:k] if k < len(rows) else np.arange(len(rows))
+        top = top[np.argsort(d2[top])]
+        top = top[np.isfinite(d2[top])]
+        return self.ids[rows[top]], np.sqrt(np.maximum(d2[top], 0.0))
+
+    def neighbours(self, basin_id: int, k: int, nprobe: Optional[int] = None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Top-k basins most similar to basin_id (itself excluded), or None if it has no vector."""
+        q = self.vector(basin_id)
+        if q is None:
+            return None
+        return self.search(q, k, nprobe or settings.PCA_IVF_NPROBE, exclude=basin_id)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+# -----------------------
+# Process-wide instance
+# -----------------------
+
+_INDEX: Optional[PcaIndex] = None
+_STATS: Dict[str, Any] = {"status": "disabled"}
+# Query counters are updated without a lock; they are indicative, not exact
+_QUERIES = {"count": 0, "total_us": 0.0}
+_LOCK = threading.Lock()
+
+
+def _load(conn_factory) -> None:
+    global _INDEX
+    path = Path(settings.PCA_INDEX_SNAPSHOT)
+    t0 = time.perf_counter()
+    try:
+        if path.exists():
+            index, source = PcaIndex.from_snapshot(path), "snapshot"
+        else:
+            with conn_factory() as conn:
+                index = PcaIndex.from_npy(conn, Path(settings.PCA_COORDS), Path(settings.PCA_BASIN_IDS),
+                                          settings.PCA_IVF_LISTS)
+            source = "npy"
+            try:
+                index.save_snapshot(path)
+            except OSError:
+                pass
+    except Exception as e:
+        _STATS.update({"status": "error", "error": str(e)})
+        return
+
+    _INDEX = index
+    _STATS.update({
+        "status": "ready",
+        "source": source,
+        "snapshot": str(path),
+        "vectors": len(index),
+        "lists": len(index.centroids),
+        "nprobe": settings.PCA_IVF_NPROBE,
+        "warmup_s": round(time.perf_counter() - t0, 3),
+        "mb": round((index.vectors.nbytes + index.ids.nbytes + index._row.nbytes) / 2**20, 1),
+    })
+
+
+def start(conn_factory) -> None:
+    """Warm the index in a background thread if EDOP_PCA_INDEX is on (see basin_index.start)."""
+    if not settings.PCA_INDEX:
+        return
+    with _LOCK:
+        if _STATS.get("status") in ("loading", "ready"):
+            return
+        _STATS.clear()
+        _STATS["status"] = "loading"
+    threading.Thread(target=_load, args=(conn_factory,), name="pca-index", daemon=True).start()
+
+
+def neighbours(basin_id: int, k: int) -> Tuple[bool, Optional[Tuple[np.ndarray, np.ndarray]]]:
+    """Return (ready, result). ready=False means the index isn't loaded; use SQL.
+
+    result is None when the basin has no PCA vector, else (basin_ids, distances).
+    """
+    index = _INDEX
+    if index is None:
+        return False, None
+    t0 = time.perf_counter()
+    result = index.neighbours(basin_id, k)
+    _QUERIES["count"] += 1
+    _QUERIES["total_us"] += (time.perf_counter() - t0) * 1e6
+    return True, result
+
+
+def get_index() -> Optional[PcaIndex]:
+    return _INDEX
+
+
+def stats() -> Dict[str, Any]:
+    out = dict(_STATS)
+    if _QUERIES["count"]:
+        out["queries"] = _QUERIES["count"]
+        out["avg_query_us"] = round(_QUERIES["total_us"] / _QUERIES["count"], 1)
+    return out
+
+
+def main() -> None:
+    """Rebuild the snapshot from the .npy outputs and report build cost."""
+    from app.db.pool import conninfo
+
+    path = Path(settings.PCA_INDEX_SNAPSHOT)
+    t0 = time.perf_counter()
+    with psycopg.connect(conninfo()) as conn:
+        index = PcaIndex.from_npy(conn, Path(settings.PCA_COORDS), Path(settings.PCA_BASIN_IDS),
+                                  settings.PCA_IVF_LISTS)
+    print(f"Built IVF index ({len(index)} vectors, {len(index.centroids)} lists) "
+          f"in {time.perf_counter() - t0:.1f}s")
+
+    index.save_snapshot(path)
+    print(f"Wrote {path} ({path.stat().st_size / 2**20:.0f} MB)")
+
+    t0 = time.perf_counter()
+    PcaIndex.from_snapshot(path)
+    print(f"Reload from snapshot: {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import os
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+import psycopg
+from fastapi import HTTPException
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import AsyncConnectionPool, ConnectionPool, PoolTimeout, TooManyRequests
+
+from app.db import instrumented
+from app.settings import settings
+
+# -----------------------
+# Shared Postgres connection pool (one per worker process)
+# -----------------------
+
+_POOL: Optional[ConnectionPool] = None
+_POOL_LOCK = threading.Lock()
+
+# Async twin used by app/api/routes_async.py when EDOP_API_MODE=async
+_ASYNC_POOL: Optional[AsyncConnectionPool] = None
+
+# Acquisition latency, measured around pool.connection() in get_db()
+_ACQ_LOCK = threading.Lock()
+_ACQ_STATS: Dict[str, float] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0}
+
+
+def _env(pg_name: str, db_name: str, default: str) -> str:
+    return os.environ.get(pg_name) or os.environ.get(db_name) or default
+
+
+def conninfo() -> str:
+    """Build a libpq conninfo string from the PG* variables the routes always used.
+
+    Each falls back to the DB_* variable the signature path used to read
+    (app/db/signature.py _conn_kwargs), so deployments that set only DB_* keep
+    connecting to the same database.
+    """
+    return make_conninfo(
+        host=_env("PGHOST", "DB_HOST", "localhost"),
+        port=_env("PGPORT", "DB_PORT", "5435"),
+        dbname=_env("PGDATABASE", "DB_NAME", "edop"),
+        user=_env("PGUSER", "DB_USER", "postgres"),
+        password=_env("PGPASSWORD", "DB_PASSWORD", ""),
+    )
+
+
+def open_pool() -> ConnectionPool:
+    """Create and open the shared pool (idempotent). Called from the app lifespan."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ConnectionPool(
+                conninfo(),
+                min_size=settings.DB_POOL_MIN_SIZE,
+                max_size=settings.DB_POOL_MAX_SIZE,
+                max_waiting=settings.DB_POOL_MAX_WAITING,
+                timeout=settings.DB_POOL_TIMEOUT,
+                max_idle=settings.DB_POOL_MAX_IDLE,
+                check=ConnectionPool.check_connection if settings.DB_POOL_CHECK else None,
+                # Query timing for /api/metrics and the slow-query log (app/db/instrumented.py)
+                configure=instrumented.configure if settings.METRICS else None,
+                name="edop",
+                open=False,
+            )
+            # Don't block startup on the database; connections fill in the background
+            _POOL.open(wait=False)
+        return _POOL
+
+
+def close_pool() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.close()
+            _POOL = None
+
+
+def get_pool() -> ConnectionPool:
+    """Return the shared pool, opening it lazily if the lifespan hook didn't run (e.g. scripts)."""
+    return _POOL if _POOL is not None else open_pool()
+
+
+async def open_async_pool() -> AsyncConnectionPool:
+    """Create and open the shared async pool (idempotent). Must run inside the event loop."""
+    global _ASYNC_POOL
+    if _ASYNC_POOL is None:
+        _ASYNC_POOL = AsyncConnectionPool(
+            conninfo(),
+            min_size=settings.DB_POOL_MIN_SIZE,
+            max_size=settings.DB_POOL_MAX_SIZE,
+            max_waiting=settings.DB_POOL_MAX_WAITING,
+            timeout=settings.DB_POOL_TIMEOUT,
+            max_idle=settings.DB_POOL_MAX_IDLE,
+            check=AsyncConnectionPool.check_connection if settings.DB_POOL_CHECK else None,
+            configure=instrumented.configure_async if settings.METRICS else None,
+            name="edop-async",
+            open=False,
+        )
+        await _ASYNC_POOL.open(wait=False)
+    return _ASYNC_POOL
+
+
+async def close_async_pool() -> None:
+    global _ASYNC_POOL
+    if _ASYNC_POOL is not None:
+        await _ASYNC_POOL.close()
+        _ASYNC_POOL = None
+
+
+def _record_acquisition(ms: float) -> None:
+    with _ACQ_LOCK:
+        _ACQ_STATS["count"] += 1
+        _ACQ_STATS["total_ms"] += ms
+        _ACQ_STATS["last_ms"] = ms
+        if ms > _ACQ_STATS["max_ms"]:
+            _ACQ_STATS["max_ms"] = ms
+
+
+def get_db() -> Iterator[psycopg.Connection]:
+    """FastAPI dependency yielding a pooled connection for the duration of the request.
+
+    The connection goes back to the pool when the response is done; the pool
+    commits on clean exit and rolls back if the handler raised.
+    """
+    pool = get_pool()
+    t0 = time.perf_counter()
+    try:
+        with pool.connection() as conn:
+            _record_acquisition((time.perf_counter() - t0) * 1000.0)
+            yield conn
+    except TooManyRequests:
+        raise HTTPException(status_code=503, detail="Database busy: too many queued requests")
+    except PoolTimeout:
+        raise HTTPException(status_code=503, detail="Database busy: timed out waiting for a connection")
+
+
+async def get_async_db() -> AsyncIterator[psycopg.AsyncConnection]:
+    """Async counterpart of get_db(); concurrency is bounded by the pool, not the threadpool."""
+    pool = await open_async_pool()
+    t0 = time.perf_counter()
+    try:
+        async with pool.connection() as conn:
+            _record_acquisition((time.perf_counter() - t0) * 1000.0)
+            yield conn
+    except TooManyRequests:
+        raise HTTPException(status_code=503, detail="Database busy: too many queued requests")
+    except PoolTimeout:
+        raise HTTPException(status_code=503, detail="Database busy: timed out waiting for a connection")
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Pool occupancy and acquisition latency, for /api/health."""
+    if _POOL is None and _ASYNC_POOL is None:
+        return {"status": "closed"}
+
+    with _ACQ_LOCK:
+        acq = dict(_ACQ_STATS)
+    out = _occupancy(_POOL) if _POOL is not None else {"status": "closed"}
+    if _ASYNC_POOL is not None:
+        out["async"] = _occupancy(_ASYNC_POOL)
+    out["acquire_ms"] = {
+        "count": int(acq["count"]),
+        "avg": round(acq["total_ms"] / acq["count"], 3) if acq["count"] else None,
+        "max": round(acq["max_ms"], 3),
+        "last": round(acq["last_ms"], 3),
+    }
+    return out
+
+
+def _occupancy(pool: ConnectionPool | AsyncConnectionPool) -> Dict[str, Any]:
+    s = pool.get_stats()
+    size = s.get("pool_size", 0)
+    available = s.get("pool_available", 0)
+    return {
+        "status": "open",
+        "min_size": s.get("pool_min"),
+        "max_size": s.get("pool_max"),
+        "max_waiting": settings.DB_POOL_MAX_WAITING,
+        "size": size,
+        "in_use": size - available,
+        "available": available,
+        "waiting": s.get("requests_waiting", 0),
+        "requests": s.get("requests_num", 0),
+        "requests_queued": s.get("requests_queued", 0),
+        "requests_errors": s.get("requests_errors", 0),
+        "connections_lost": s.get("connections_lost", 0),
+    }
@@ -1,23 +1,20 @@
 import os
 import json
-import ssl
-from typing import Any, Dict, Optional, Tuple
+import functools
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+import httpx
 import psycopg
 from psycopg.rows import dict_row
 from dotenv import load_dotenv
-from urllib.parse import urlencode
-from urllib.request import Request, urlopen
-from urllib.error import URLError, HTTPError
 
-try:
-    import certifi  # type: ignore
-except Exception:  # pragma: no cover
-    certifi = None
+from app.db import basin_index, elevation
+from app.db.cache import LRUCache, approx_size
+from app.db.elevation import _coord_key, get_elevation_point, get_elevation_point_async, get_elevation_points
+from app.settings import settings
 
 load_dotenv()  # reads .env from project root
 
-SIGNATURE_SQL = """
-SELECT
+_SIGNATURE_COLUMNS = """
   id,
   zone_id,
   zone_name,
@@ -75,18 +72,184 @@ SELECT
   pop_density,
   human_footprint_09,
   gdp_avg,
-  human_dev_idx,
+  human_dev_idx
+"""
 
-  -- geometry handling: return a GeoJSON string (good for Leaflet)
+# geometry handling: return a GeoJSON string (good for Leaflet)
+_GEOM_COLUMN = """,
   ST_AsGeoJSON(geom, 6) AS geom_geojson
-FROM public.v_basin08_persist
-WHERE ST_Covers(
+"""
+
+# Signatures are read from the materialized copy of v_basin08_persist
+# (sql/mv_basin08_persist.sql), which carries a precomputed area_km2 for the
+# smallest-basin ORDER BY. EDOP_SIGNATURE_SOURCE=v_basin08_persist switches
+# back to the live view (area computed per candidate row).
+_SOURCE = "public." + settings.SIGNATURE_SOURCE
+_MATERIALIZED = settings.SIGNATURE_SOURCE.startswith("mv_")
+_AREA_ORDER = "area_km2" if _MATERIALIZED else "ST_Area(geom::geography)"
+
+# Geometry payload modes for /api/signature:
+#  - full:       full-resolution polygon as GeoJSON (geom_geojson), the default
+#  - simplified: geom_geojson simplified at one of SIMPLIFY_TOLERANCES
+#  - bbox:       [xmin, ymin, xmax, ymax] only (bbox)
+#  - none:       attributes only
+GEOMETRY_MODES = ("full", "simplified", "bbox", "none")
+
+# Simplification tolerances (degrees) precomputed as GeoJSON text in
+# mv_basin08_persist, coarsest last; requests snap to one of these
+SIMPLIFY_TOLERANCES = {
+    0.0005: "geojson_s0005",  # ~50 m: street-level zooms (z13+)
+    0.002: "geojson_s002",    # ~200 m: city zooms (z10-12)
+    0.01: "geojson_s01",      # ~1 km: regional zooms (z7-9)
+}
+DEFAULT_TOLERANCE = 0.002
+
+
+def snap_tolerance(tolerance: Optional[float]) -> float:
+    """Largest precomputed tolerance <= the requested one (the finest if it is below all)."""
+    if tolerance is None:
+        return DEFAULT_TOLERANCE
+    fitting = [t for t in SIMPLIFY_TOLERANCES if t <= tolerance]
+    return max(fitting) if fitting else min(SIMPLIFY_TOLERANCES)
+
+
+def _geom_column(geometry: str, tolerance: float) -> str:
+    if geometry == "none":
+        return "\n"
+    if geometry == "bbox":
+        if _MATERIALIZED:
+            return ",\n  bbox\n"
+        return ",\n  ARRAY[ST_XMin(geom), ST_YMin(geom), ST_XMax(geom), ST_YMax(geom)] AS bbox\n"
+    if geometry == "simplified":
+        if _MATERIALIZED:
+            return f",\n  {SIMPLIFY_TOLERANCES[tolerance]} AS geom_geojson\n"
+        return f",\n  ST_AsGeoJSON(ST_SimplifyPreserveTopology(geom, {tolerance}), 6) AS geom_geojson\n"
+    return _GEOM_COLUMN
+
+
+@functools.lru_cache(maxsize=None)
+def _signature_sqls(geometry: str = "full", tolerance: float = DEFAULT_TOLERANCE) -> Tuple[str, str]:
+    """(spatial, by-id) signature queries for one geometry mode."""
+    select = "\nSELECT" + _SIGNATURE_COLUMNS + _geom_column(geometry, tolerance) + "FROM " + _SOURCE + "\n"
+    spatial = select + """WHERE ST_Covers(
   geom,
   ST_SetSRID(ST_MakePoint(%(lon)s, %(lat)s), 4326)
 )
-ORDER BY ST_Area(geom::geography) ASC
+ORDER BY """ + _AREA_ORDER + """ ASC
 LIMIT 1;
 """
+    # Used when the in-process basin index (app/db/basin_index.py) already resolved the basin
+    by_id = select + "WHERE id = %(basin_id)s;\n"
+    return spatial, by_id
+
+
+SIGNATURE_SQL, SIGNATURE_BY_ID_SQL = _signature_sqls()
+
+# Batch path (POST /api/signatures): one set-based spatial join resolves every
+# point to its smallest covering basin, then attributes are fetched once per
+# distinct basin. ord is 1-based input position.
+RESOLVE_BATCH_SQL = """
+SELECT DISTINCT ON (p.ord) p.ord, b.id
+FROM unnest(%(lats)s::float8[], %(lons)s::float8[]) WITH ORDINALITY AS p(lat, lon, ord)
+JOIN """ + _SOURCE + """ b
+  ON ST_Covers(b.geom, ST_SetSRID(ST_MakePoint(p.lon, p.lat), 4326))
+ORDER BY p.ord, """ + _AREA_ORDER + """ ASC;
+"""
+
+SIGNATURES_BY_IDS_SQL = """
+SELECT""" + _SIGNATURE_COLUMNS + """
+FROM """ + _SOURCE + """
+WHERE id = ANY(%(ids)s);
+"""
+
+SIGNATURES_BY_IDS_GEOM_SQL = """
+SELECT""" + _SIGNATURE_COLUMNS + _GEOM_COLUMN + """
+FROM """ + _SOURCE + """
+WHERE id = ANY(%(ids)s);
+"""
+
+# Upper bound on points per POST /api/signatures call, and the chunk size the
+# batch is resolved/streamed in (keeps memory flat and first bytes early)
+BATCH_MAX_POINTS = 10_000
+BATCH_CHUNK = 500
+
+
+def _row_size(row: Dict[str, Any]) -> int:
+    """Byte-budget weight of a row/payload without serializing it: string lengths
+    (the GeoJSON dominates) plus a flat allowance per field."""
+    size = 0
+    for value in row.values():
+        if isinstance(value, (str, bytes)):
+            size += len(value)
+        elif isinstance(value, (dict, list)):
+            size += approx_size(value)
+        size += 32
+    return size
+
+
+# Signature caches (per worker):
+#  - _SIG_CACHE: rounded (lat, lon) + geometry mode -> full payload, for repeat clicks
+#  - _BASIN_ROW_CACHE: (basin id, geometry mode) -> view row; with the basin
+#    index warm, a new point in an already-seen basin needs no DB round trip
+# Both are LRU with TTL and a byte budget (basin geometries can be hundreds of KB).
+# Cached dicts are shared: treat them as read-only.
+_SIG_CACHE = LRUCache(
+    "signature",
+    max_items=settings.SIG_CACHE_MAX_ITEMS,
+    max_bytes=settings.SIG_CACHE_MAX_MB * 2**20,
+    ttl_s=settings.SIG_CACHE_TTL_S,
+    sizeof=_row_size,
+)
+_BASIN_ROW_CACHE = LRUCache(
+    "basin_row",
+    max_items=settings.SIG_CACHE_MAX_ITEMS,
+    max_bytes=settings.SIG_CACHE_MAX_MB * 2**20,
+    ttl_s=settings.SIG_CACHE_TTL_S,
+    sizeof=_row_size,
+)
+
+
+def _signature_query(
+    lat: float,
+    lon: float,
+    geometry: str = "full",
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> Tuple[Optional[Dict[str, Any]], Optional[str], Dict[str, Any]]:
+    """Plan the basin row lookup for a point: (cached_row, sql, params).
+
+    - cached_row is set when the basin index resolved the point and the row is cached.
+    - Otherwise sql/params select by primary key (index resolved) or spatially (index cold).
+    - (None, None, {}) means the index is ready and no basin covers the point.
+    """
+    spatial_sql, by_id_sql = _signature_sqls(geometry, tolerance)
+    resolved, basin_id = basin_index.lookup(lat, lon)
+    if not resolved:
+        return None, spatial_sql, {"lat": lat, "lon": lon}
+    if basin_id is None:
+        return None, None, {}
+    row = _BASIN_ROW_CACHE.get((basin_id, geometry, tolerance))
+    if row is not None:
+        return row, None, {}
+    return None, by_id_sql, {"basin_id": basin_id}
+
+
+def _sig_key(lat: float, lon: float, geometry: str, tolerance: float) -> Tuple[Any, ...]:
+    return _coord_key(lat, lon) + (geometry, tolerance)
+
+
+def _cache_signature(lat: float, lon: float, geometry: str, tolerance: float,
+                     row: Dict[str, Any], sig: Dict[str, Any], row_cached: bool = False) -> None:
+    # A row that came from _BASIN_ROW_CACHE is already there; re-setting it only re-sizes it
+    if not row_cached:
+        _BASIN_ROW_CACHE.set((row["id"], geometry, tolerance), row)
+    # Don't pin a payload whose elevation lookup failed; let the next call retry
+    if sig.get("elev_point") is not None or "elev_error" not in sig:
+        _SIG_CACHE.set(_sig_key(lat, lon, geometry, tolerance), sig)
+
+
+def cache_stats() -> Dict[str, Any]:
+    return {c.name: c.stats() for c in (_SIG_CACHE, _BASIN_ROW_CACHE, elevation._ELEV_CACHE)}
+
 
 # -----------------------
 # Profile presentation metadata (pilot)
@@ -169,257 +332,238 @@ PROFILE_SUMMARY: list[Dict[str, str]] = [
     {"key": "pop_density", "label": "Population density"},
 ]
 
-# -----------------------
-# Elevation provider (external, swappable)
-# Pattern B: try OpenTopoData (mapzen) first, then Open-Meteo elevation API.
-# -----------------------
-
-# Very small in-process cache (per worker) to avoid repeated lookups.
-# Key is rounded (lat, lon) to 5 decimals (~1m-2m at equator in lat; good enough for caching).
-_ELEV_CACHE: Dict[Tuple[float, float], Dict[str, Any]] = {}
-_ELEV_CACHE_MAX = 512
-
-
-def _cache_get(lat: float, lon: float) -> Optional[Dict[str, Any]]:
-    key = (round(float(lat), 5), round(float(lon), 5))
-    return _ELEV_CACHE.get(key)
-
-
-def _cache_set(lat: float, lon: float, val: Dict[str, Any]) -> None:
-    key = (round(float(lat), 5), round(float(lon), 5))
-    if key in _ELEV_CACHE:
-        _ELEV_CACHE[key] = val
-        return
-    if len(_ELEV_CACHE) >= _ELEV_CACHE_MAX:
-        # Drop an arbitrary item (good enough for a pilot)
-        _ELEV_CACHE.pop(next(iter(_ELEV_CACHE)))
-    _ELEV_CACHE[key] = val
-
-
-def _http_get_json(url: str, timeout_s: float = 4.0) -> Dict[str, Any]:
-    req = Request(
-        url,
-        headers={
-            "Accept": "application/json",
-            "User-Agent": "edop-pilot/0.1",
-        },
-        method="GET",
+def _conn_kwargs() -> Dict[str, Any]:
+    conn_kwargs = dict(
+        dbname=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        host=os.getenv("DB_HOST"),
+        port=os.getenv("DB_PORT"),
+        password=os.getenv("DB_PASSWORD") or os.getenv("PGPASSWORD") or None,
     )
 
-    # Some environments (notably minimal Linux images) lack CA certificates,
-    # causing CERTIFICATE_VERIFY_FAILED. Prefer certifi's bundle when available.
-    # For local/dev emergency only, set EDOP_SSL_NO_VERIFY=1 to bypass verification.
-    no_verify = os.getenv("EDOP_SSL_NO_VERIFY", "0") in ("1", "true", "True", "yes", "YES")
-
-    if no_verify:
-        ctx = ssl._create_unverified_context()
-    else:
-        if certifi is not None:
-            ctx = ssl.create_default_context(cafile=certifi.where())
-        else:
-            ctx = ssl.create_default_context()
-
-    with urlopen(req, timeout=timeout_s, context=ctx) as resp:
-        data = resp.read().decode("utf-8")
-        return json.loads(data)
-
-
-def _elev_opentopodata_mapzen(lat: float, lon: float) -> Dict[str, Any]:
-    # OpenTopoData uses locations=lat,lon
-    qs = urlencode({"locations": f"{lat},{lon}"})
-    url = f"https://api.opentopodata.org/v1/mapzen?{qs}"
-    payload = _http_get_json(url)
-
-    if payload.get("status") != "OK":
-        raise RuntimeError(payload.get("error") or f"OpenTopoData status={payload.get('status')}")
-
-    results = payload.get("results") or []
-    if not results:
-        raise RuntimeError("OpenTopoData returned no results")
-
-    elev = results[0].get("elevation")
-    if elev is None:
-        raise RuntimeError("OpenTopoData result missing elevation")
-
-    return {
-        "elev_point": float(elev),
-        "elev_source": "opentopodata",
-        "elev_dataset": "mapzen",
-        "elev_resolution_m": 30,
-    }
-
-
-def _elev_open_meteo(lat: float, lon: float) -> Dict[str, Any]:
-    # Open-Meteo Elevation API uses latitude=..&longitude=..
-    qs = urlencode({"latitude": str(lat), "longitude": str(lon)})
-    url = f"https://api.open-meteo.com/v1/elevation?{qs}"
-    payload = _http_get_json(url)
-
-    elev = None
-    # API commonly returns: {"elevation": [..], "latitude": [..], "longitude": [..]}
-    if isinstance(payload.get("elevation"), list) and payload["elevation"]:
-        elev = payload["elevation"][0]
-    elif payload.get("elevation") is not None:
-        elev = payload.get("elevation")
-
-    if elev is None:
-        raise RuntimeError("Open-Meteo elevation missing in response")
-
-    return {
-        "elev_point": float(elev),
-        "elev_source": "open-meteo",
-        "elev_dataset": "copernicus-dem-glo-90-2021",
-        "elev_resolution_m": 90,
-    }
+    # Drop None values so psycopg/libpq can fall back to defaults / .pgpass when appropriate
+    return {k: v for k, v in conn_kwargs.items() if v not in (None, "")}
 
 
-def get_elevation_point(lat: float, lon: float) -> Dict[str, Any]:
-    """Return elevation metadata dict.
+def get_signature(
+    lat: float,
+    lon: float,
+    conn: Optional[psycopg.Connection] = None,
+    geometry: str = "full",
+    tolerance: Optional[float] = None,
+) -> Dict[str, Any] | None:
+    """Return a single basin signature dict for (lat, lon), or None if no basin covers point.
 
-    Always returns a dict with keys:
-      - elev_point (float) when available else None
-      - elev_source, elev_dataset, elev_resolution_m when available
-      - elev_error when both providers fail
+    The API passes a pooled connection (app/db/pool.py). When `conn` is omitted
+    (scripts, main() below) a one-off connection is opened from environment
+    variables (typically via a .env file):
+      DB_NAME, DB_USER, DB_HOST, DB_PORT, and optionally DB_PASSWORD.
 
-    Pattern B fallback: OpenTopoData(mapzen) -> Open-Meteo elevation.
+    Notes:
+    - Uses ST_Covers exactly as your SQL does, unless the optional in-process
+      basin index is warm, in which case the row is fetched by primary key.
+    - Orders by smallest area_km2 to pick the smallest containing basin when multiple match.
+    - Returns geom as a GeoJSON string in 'geom_geojson' (Leaflet-friendly), shaped by
+      `geometry` (see GEOMETRY_MODES); `tolerance` (degrees) applies to "simplified"
+      and snaps to the nearest precomputed SIMPLIFY_TOLERANCES entry.
     """
-    cached = _cache_get(lat, lon)
+    if conn is None:
+        with psycopg.connect(**_conn_kwargs()) as own_conn:
+            return get_signature(lat=lat, lon=lon, conn=own_conn, geometry=geometry, tolerance=tolerance)
+
+    tolerance = snap_tolerance(tolerance) if geometry == "simplified" else DEFAULT_TOLERANCE
+    cached = _SIG_CACHE.get(_sig_key(lat, lon, geometry, tolerance))
     if cached is not None:
         return cached
 
-    last_err: Optional[str] = None
-
-    # Provider 1: OpenTopoData /mapzen (~30m)
-    try:
-        val = _elev_opentopodata_mapzen(lat, lon)
-        _cache_set(lat, lon, val)
-        return val
-    except (HTTPError, URLError, TimeoutError, ValueError, RuntimeError) as e:
-        last_err = f"opentopodata: {e}"
+    row, sql, params = _signature_query(lat, lon, geometry, tolerance)
+    row_cached = row is not None
+    if row is None:
+        if sql is None:
+            return None
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(sql, params)
+            row = cur.fetchone()
+        if not row:
+            return None
 
-    # Provider 2: Open-Meteo elevation (Copernicus GLO-90)
+    # Add point elevation via external providers (fallback chain)
     try:
-        val = _elev_open_meteo(lat, lon)
-        _cache_set(lat, lon, val)
-        return val
-    except (HTTPError, URLError, TimeoutError, ValueError, RuntimeError) as e:
-        last_err = (last_err + "; " if last_err else "") + f"open-meteo: {e}"
-
-    val = {
-        "elev_point": None,
-        "elev_error": last_err or "elevation lookup failed",
-    }
-    _cache_set(lat, lon, val)
-    return val
+        elev = get_elevation_point(lat=lat, lon=lon)
+    except Exception as e:
+        elev = {"elev_point": None, "elev_error": str(e)}
+    sig = _finish_signature(dict(row), elev)
+    if geometry == "simplified":
+        sig["geom_simplify_tolerance"] = tolerance
+    _cache_signature(lat, lon, geometry, tolerance, row, sig, row_cached)
+    return sig
 
 
-def get_signature(
+async def get_signature_async(
     lat: float,
     lon: float,
+    conn: psycopg.AsyncConnection,
+    client: httpx.AsyncClient,
+    geometry: str = "full",
+    tolerance: Optional[float] = None,
 ) -> Dict[str, Any] | None:
-    """Return a single basin signature dict for (lat, lon), or None if no basin covers point.
+    """Async variant of get_signature() using a pooled AsyncConnection and httpx for elevation."""
+    tolerance = snap_tolerance(tolerance) if geometry == "simplified" else DEFAULT_TOLERANCE
+    cached = _SIG_CACHE.get(_sig_key(lat, lon, geometry, tolerance))
+    if cached is not None:
+        return cached
 
-    Connection parameters are read from environment variables (typically via a .env file):
-      DB_NAME, DB_USER, DB_HOST, DB_PORT, and optionally DB_PASSWORD.
+    row, sql, params = _signature_query(lat, lon, geometry, tolerance)
+    row_cached = row is not None
+    if row is None:
+        if sql is None:
+            return None
+        async with conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(sql, params)
+            row = await cur.fetchone()
+        if not row:
+            return None
 
-    Notes:
-    - Uses ST_Covers exactly as your SQL does.
-    - Orders by smallest area_km2 to pick the smallest containing basin when multiple match.
-    - Returns geom as a GeoJSON string in 'geom_geojson' (Leaflet-friendly).
+    try:
+        elev = await get_elevation_point_async(lat=lat, lon=lon, client=client)
+    except Exception as e:
+        elev = {"elev_point": None, "elev_error": str(e)}
+    sig = _finish_signature(dict(row), elev)
+    if geometry == "simplified":
+        sig["geom_simplify_tolerance"] = tolerance
+    _cache_signature(lat, lon, geometry, tolerance, row, sig, row_cached)
+    return sig
+
+
+def _resolve_basins(conn: psycopg.Connection, points: Sequence[Tuple[float, float]]) -> list[Optional[int]]:
+    index = basin_index.get_index()
+    if index is not None:
+        return index.lookup_many(points)
+
+    out: list[Optional[int]] = [None] * len(points)
+    with conn.cursor() as cur:
+        cur.execute(RESOLVE_BATCH_SQL, {
+            "lats": [lat for lat, _ in points],
+            "lons": [lon for _, lon in points],
+        })
+        for ord_, basin_id in cur:
+            out[ord_ - 1] = basin_id
+    return out
+
+
+def iter_signatures(
+    points: Sequence[Tuple[float, float]],
+    conn: psycopg.Connection,
+    include_geom: bool = False,
+    profile: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """Yield one signature dict per (lat, lon), in input order.
+
+    Points are handled BATCH_CHUNK at a time: one spatial join resolves basins,
+    one query fetches attributes for the distinct basins, and elevations come
+    from get_elevation_points(). Points outside every basin yield
+    {"lat", "lon", "error": "no_basin"}. profile=True adds the
+    profile_summary/profile_groups helpers the single-point endpoint returns.
     """
+    by_ids_sql = SIGNATURES_BY_IDS_GEOM_SQL if include_geom else SIGNATURES_BY_IDS_SQL
+
+    for start in range(0, len(points), BATCH_CHUNK):
+        chunk = points[start:start + BATCH_CHUNK]
+        basin_ids = _resolve_basins(conn, chunk)
+
+        rows: Dict[int, Dict[str, Any]] = {}
+        distinct = sorted({b for b in basin_ids if b is not None})
+        if distinct:
+            with conn.cursor(row_factory=dict_row) as cur:
+                cur.execute(by_ids_sql, {"ids": distinct})
+                rows = {r["id"]: r for r in cur}
+
+        covered = [i for i, b in enumerate(basin_ids) if b in rows]
+        elevs = dict(zip(covered, get_elevation_points([chunk[i] for i in covered])))
+
+        for i, (lat, lon) in enumerate(chunk):
+            row = rows.get(basin_ids[i])
+            if row is None:
+                yield {"lat": lat, "lon": lon, "error": "no_basin"}
+                continue
+            sig = _finish_signature(dict(row), elevs[i], profile=profile)
+            sig["lat"] = lat
+            sig["lon"] = lon
+            yield sig
+
+
+def _finish_signature(sig: Dict[str, Any], elev: Dict[str, Any], profile: bool = True) -> Dict[str, Any]:
+    """Merge point elevation into a basin row and add relief metrics and profile helpers."""
+    sig.update(elev)
+
+    # Derived relief metrics (requires elev_point + basin elev_min/elev_max)
+    try:
+        elev_point = sig.get("elev_point")
+        elev_min = sig.get("elev_min")
+        elev_max = sig.get("elev_max")
 
-    conn_kwargs = dict(
-        dbname=os.getenv("DB_NAME"),
-        user=os.getenv("DB_USER"),
-        host=os.getenv("DB_HOST"),
-        port=os.getenv("DB_PORT"),
-        password=os.getenv("DB_PASSWORD") or os.getenv("PGPASSWORD") or None,
-    )
-
-    # Drop None values so psycopg/libpq can fall back to defaults / .pgpass when appropriate
-    conn_kwargs = {k: v for k, v in conn_kwargs.items() if v not in (None, "")}
-
-    with psycopg.connect(**conn_kwargs, row_factory=dict_row) as conn:
-        with conn.cursor() as cur:
-            cur.execute(SIGNATURE_SQL, {"lat": lat, "lon": lon})
-            row = cur.fetchone()
-            if not row:
-                return None
-            sig = dict(row)
-
-            # Add point elevation via external providers (fallback chain)
-            try:
-                elev = get_elevation_point(lat=lat, lon=lon)
-            except Exception as e:
-                elev = {"elev_point": None, "elev_error": str(e)}
-            sig.update(elev)
-
-            # Derived relief metrics (requires elev_point + basin elev_min/elev_max)
-            try:
-                elev_point = sig.get("elev_point")
-                elev_min = sig.get("elev_min")
-                elev_max = sig.get("elev_max")
-
-                if elev_point is None or elev_min is None or elev_max is None:
-                    sig["relief_range_m"] = None
-                    sig["relief_position"] = None
-                else:
-                    elev_point_f = float(elev_point)
-                    elev_min_f = float(elev_min)
-                    elev_max_f = float(elev_max)
-                    relief_range = elev_max_f - elev_min_f
-
-                    sig["relief_range_m"] = relief_range if relief_range > 0 else None
-
-                    if relief_range > 0:
-                        pos = (elev_point_f - elev_min_f) / relief_range
-                        # Clamp to [0, 1] to absorb minor inconsistencies across datasets/resolution
-                        if pos < 0:
-                            pos = 0.0
-                        elif pos > 1:
-                            pos = 1.0
-                        sig["relief_position"] = pos
-                    else:
-                        sig["relief_position"] = None
-            except Exception:
-                sig["relief_range_m"] = None
+        if elev_point is None or elev_min is None or elev_max is None:
+            sig["relief_range_m"] = None
+            sig["relief_position"] = None
+        else:
+            elev_point_f = float(elev_point)
+            elev_min_f = float(elev_min)
+            elev_max_f = float(elev_max)
+            relief_range = elev_max_f - elev_min_f
+
+            sig["relief_range_m"] = relief_range if relief_range > 0 else None
+
+            if relief_range > 0:
+                pos = (elev_point_f - elev_min_f) / relief_range
+                # Clamp to [0, 1] to absorb minor inconsistencies across datasets/resolution
+                if pos < 0:
+                    pos = 0.0
+                elif pos > 1:
+                    pos = 1.0
+                sig["relief_position"] = pos
+            else:
                 sig["relief_position"] = None
-
-            # -----------------------
-            # Pilot payload helpers for UI rendering (no UI changes required yet)
-            # -----------------------
-
-            # profile_summary: ordered list of {key,label,value} using PROFILE_SUMMARY
-            summary_items: list[Dict[str, Any]] = []
-            for spec in PROFILE_SUMMARY:
-                k = spec["key"]
-                if k in sig:
-                    summary_items.append({
-                        "key": k,
-                        "label": spec["label"],
-                        "value": sig.get(k),
-                    })
-
-            # profile_groups: {A:{label,items:[{key,label,value}...]}, ...}
-            grouped: Dict[str, Any] = {}
-            for gcode, gspec in PROFILE_GROUPS.items():
-                items: list[Dict[str, Any]] = []
-                for k in gspec["fields"]:
-                    if k in sig:
-                        items.append({
-                            "key": k,
-                            "label": k,  # UI can prettify later; keep stable now
-                            "value": sig.get(k),
-                        })
-                grouped[gcode] = {
-                    "label": gspec["label"],
-                    "items": items,
-                }
-
-            sig["profile_summary"] = summary_items
-            sig["profile_groups"] = grouped
-
-            return sig
+    except Exception:
+        sig["relief_range_m"] = None
+        sig["relief_position"] = None
+
+    if not profile:
+        return sig
+
+    # -----------------------
+    # Pilot payload helpers for UI rendering (no UI changes required yet)
+    # -----------------------
+
+    # profile_summary: ordered list of {key,label,value} using PROFILE_SUMMARY
+    summary_items: list[Dict[str, Any]] = []
+    for spec in PROFILE_SUMMARY:
+        k = spec["key"]
+        if k in sig:
+            summary_items.append({
+                "key": k,
+                "label": spec["label"],
+                "value": sig.get(k),
+            })
+
+    # profile_groups: {A:{label,items:[{key,label,value}...]}, ...}
+    grouped: Dict[str, Any] = {}
+    for gcode, gspec in PROFILE_GROUPS.items():
+        items: list[Dict[str, Any]] = []
+        for k in gspec["fields"]:
+            if k in sig:
+                items.append({
+                    "key": k,
+                    "label": k,  # UI can prettify later; keep stable now
+                    "value": sig.get(k),
+                })
+        grouped[gcode] = {
+            "label": gspec["label"],
+            "items": items,
+        }
+
+    sig["profile_summary"] = summary_items
+    sig["profile_groups"] = grouped
+    return sig
 
 
 def main() -> None:
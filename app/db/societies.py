@@ -0,0 +1,137 @@
+"""Cached /api/societies payload, read from the materialized society summary.
+
+gaz.mv_dplace_societies holds one row per society (with bioregion, ecoregion,
+realm, basin cluster, EA042 subsistence and EA034 religion already joined) and
+gaz.mv_dplace_society_facets the legend entries with their counts; see
+sql/mv_dplace_societies.sql and scripts/refresh_dplace_societies.py.
+
+The response is rendered to bytes once, with an ETag, and kept in memory. A
+cheap fingerprint of the two views is re-checked at most every
+EDOP_SOCIETIES_CACHE_TTL_S; a refresh of the views changes it and the next
+request after the check re-renders.
+"""
+import hashlib
+import threading
+import time
+from typing import Any, Callable, ContextManager, Dict, Optional
+
+import psycopg
+from fastapi import Request, Response
+
+from app.api.compression import etag_matches
+from app.api.responses import dumps
+from app.settings import settings
+
+_SOCIETIES_SQL = """
+    SELECT id, name, region, bioregion_id, bioregion_name, lon, lat,
+           subsistence, eco_id, eco_name, realm, cluster_id, religion
+    FROM gaz.mv_dplace_societies
+    ORDER BY ord
+"""
+
+_FACETS_SQL = """
+    SELECT facet, key, name, n
+    FROM gaz.mv_dplace_society_facets
+    ORDER BY facet, ord
+"""
+
+_VARIABLES_SQL = """
+    SELECT id, name, description
+    FROM gaz.dplace_variables
+    WHERE id IN ('EA042', 'EA034')
+"""
+
+# REFRESH ... CONCURRENTLY rewrites changed rows (new xmin, count); a plain
+# REFRESH or a rebuild swaps the relation file
+_FINGERPRINT_SQL = """
+    SELECT
+        (SELECT count(*)::text || '-' || coalesce(max(xmin::text::bigint), 0) FROM gaz.mv_dplace_societies),
+        (SELECT count(*)::text || '-' || coalesce(max(xmin::text::bigint), 0) FROM gaz.mv_dplace_society_facets),
+        pg_relation_filenode('gaz.mv_dplace_societies')::text,
+        pg_relation_filenode('gaz.mv_dplace_society_facets')::text
+"""
+
+_COLUMNS = ("id", "name", "region", "bioregion_id", "bioregion_name", "lon", "lat",
+            "subsistence", "eco_id", "eco_name", "realm", "cluster_id", "religion")
+
+
+class Payload:
+    """The rendered /api/societies response for one version of the views."""
+
+    __slots__ = ("version", "count", "body", "etag")
+
+    def __init__(self, version: str, payload: Dict[str, Any]):
+        self.version = version
+        self.count = payload["count"]
+        self.body = dumps(payload)
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+
+    def response(self, request: Optional[Request] = None) -> Response:
+        headers = {"ETag": self.etag}
+        if request is not None and etag_matches(request.headers.get("if-none-match"), self.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=self.body, media_type="application/json", headers=headers)
+
+
+def build(conn: psycopg.Connection, version: str = "") -> Payload:
+    with conn.cursor() as cur:
+        cur.execute(_SOCIETIES_SQL)
+        societies = [dict(zip(_COLUMNS, row)) for row in cur.fetchall()]
+
+        cur.execute(_FACETS_SQL)
+        facets: Dict[str, list] = {"bioregion": [], "subsistence": [], "religion": []}
+        for facet, key, name, n in cur.fetchall():
+            facets.setdefault(facet, []).append((key, name, n))
+
+        cur.execute(_VARIABLES_SQL)
+        variable_info = {row[0]: {"name": row[1], "description": row[2]} for row in cur.fetchall()}
+
+    return Payload(version, {
+        "count": len(societies),
+        "bioregions": [{"id": key, "name": name} for key, name, _ in facets["bioregion"]],
+        "subsistence_categories": [{"name": name, "count": n} for _, name, n in facets["subsistence"]],
+        "religion_categories": [{"name": name, "count": n} for _, name, n in facets["religion"]],
+        "variable_info": variable_info,
+        "societies": societies,
+    })
+
+
+# -----------------------
+# Process-wide cache
+# -----------------------
+
+_PAYLOAD: Optional[Payload] = None
+_CHECKED_AT = 0.0
+_LOCK = threading.Lock()
+_STATS = {"builds": 0, "checks": 0}
+
+
+def get(conn_factory: Callable[[], ContextManager[psycopg.Connection]]) -> Payload:
+    """The cached payload; re-checks the views' fingerprint (one connection) once per TTL."""
+    global _PAYLOAD, _CHECKED_AT
+    now = time.monotonic()
+    payload = _PAYLOAD
+    if payload is not None and now - _CHECKED_AT < settings.SOCIETIES_CACHE_TTL_S:
+        return payload
+
+    with _LOCK:
+        if _PAYLOAD is not None and now - _CHECKED_AT < settings.SOCIETIES_CACHE_TTL_S:
+            return _PAYLOAD
+        with conn_factory() as conn:
+            with conn.cursor() as cur:
+                cur.execute(_FINGERPRINT_SQL)
+                version = "/".join(cur.fetchone())
+            _STATS["checks"] += 1
+            if _PAYLOAD is None or _PAYLOAD.version != version:
+                _PAYLOAD = build(conn, version)
+                _STATS["builds"] += 1
+        _CHECKED_AT = now
+        return _PAYLOAD
+
+
+def stats() -> Dict[str, Any]:
+    payload = _PAYLOAD
+    if payload is None:
+        return {"status": "empty", **_STATS}
+    return {"status": "ready", "societies": payload.count, "bytes": len(payload.body),
+            "version": payload.version, "age_s": round(time.monotonic() - _CHECKED_AT, 1), **_STATS}
@@ -0,0 +1,180 @@
+"""Cached block of World Heritage city PCA vectors for /api/whc-similar-env-by-coord.
+
+Ranking a point against every WH city used to run the basin08_pca x wh_cities
+distance CTE twice in Postgres (percentile stats, then PERCENT_RANK). There
+are only a few hundred WH cities, so their basin vectors are held here as one
+float32 matrix plus the row metadata the endpoint returns. A single vectorized
+pass gives the distances, the dist_stats percentiles and the ranked top-k.
+
+The block is reloaded when gaz.wh_cities or whc_clusters change (row count +
+max xmin fingerprint, re-checked every EDOP_WHC_BLOCK_TTL_S). Results match
+the SQL: PERCENTILE_CONT is linear interpolation, PERCENT_RANK is
+(rank - 1) / (n - 1) with ties sharing the lowest rank, and cities in the
+source basin itself are excluded.
+"""
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import psycopg
+
+from app.db import pca_index
+from app.settings import settings
+
+_CITIES_SQL = """
+    SELECT c.id, c.city, c.country, c.region, ST_X(c.geom), ST_Y(c.geom), c.basin_id, p.pca::text
+    FROM gaz.wh_cities c
+    JOIN basin08_pca p ON p.basin_id = c.basin_id
+    WHERE c.basin_id IS NOT NULL
+    ORDER BY c.id
+"""
+
+_CLUSTERS_SQL = "SELECT city_id, cluster_id, cluster_label FROM whc_clusters"
+
+_FINGERPRINT_SQL = """
+    SELECT
+        (SELECT count(*)::text || '-' || coalesce(max(xmin::text::bigint), 0) FROM gaz.wh_cities),
+        (SELECT count(*)::text || '-' || coalesce(max(xmin::text::bigint), 0) FROM whc_clusters)
+"""
+
+_SOURCE_VECTOR_SQL = "SELECT pca::text FROM basin08_pca WHERE basin_id = %s"
+
+
+def parse_vector(text: str) -> np.ndarray:
+    """pgvector text output ('[1,2,3]') -> float32 array."""
+    return np.array(text.strip("[]").split(","), dtype=np.float32)
+
+
+class WhcBlock:
+    """WH city rows and their basin PCA vectors, in matching order."""
+
+    def __init__(self, rows: List[Dict[str, Any]], basin_ids: np.ndarray, vectors: np.ndarray, version: str):
+        self.rows = rows
+        self.basin_ids = basin_ids
+        self.vectors = vectors
+        self.version = version
+
+    @classmethod
+    def from_db(cls, conn: psycopg.Connection, version: str) -> "WhcBlock":
+        with conn.cursor() as cur:
+            cur.execute(_CLUSTERS_SQL)
+            clusters = {}
+            for city_id, cluster_id, label in cur.fetchall():
+                clusters.setdefault(city_id, (cluster_id, label))
+            cur.execute(_CITIES_SQL)
+            fetched = cur.fetchall()
+
+        rows, basin_ids, vectors = [], [], []
+        for city_id, city, country, region, lon, lat, basin_id, pca in fetched:
+            cluster_id, label = clusters.get(city_id, (None, None))
+            rows.append({
+                "id": city_id,
+                "city": city,
+                "country": country,
+                "region": region,
+                "location": {
+                    "type": "Point",
+                    "coordinates": [float(lon), float(lat)]
+                } if lon and lat else None,
+                "env_cluster": cluster_id,
+                "env_cluster_label": label,
+            })
+            basin_ids.append(basin_id)
+            vectors.append(parse_vector(pca))
+
+        dim = len(vectors[0]) if vectors else pca_index.N_COMPONENTS
+        return cls(
+            rows,
+            np.asarray(basin_ids, dtype=np.int64),
+            np.vstack(vectors) if vectors else np.empty((0, dim), dtype=np.float32),
+            version,
+        )
+
+    def rank(self, source_basin_id: int, source_vec: np.ndarray, limit: int) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """(dist_stats, top `limit` cities with distance + percentile) for one source vector."""
+        keep = np.flatnonzero(self.basin_ids != source_basin_id)
+        diff = self.vectors[keep].astype(np.float64) - np.asarray(source_vec, dtype=np.float64)
+        dist = np.sqrt((diff * diff).sum(1))
+        n = len(dist)
+
+        if n:
+            p25, median, p75 = np.percentile(dist, [25, 50, 75])
+            values = (dist.min(), p25, median, p75, dist.max())
+        else:
+            values = (None,) * 5
+        dist_stats = {
+            name: round(float(v), 4) if v else None
+            for name, v in zip(("min", "p25", "median", "p75", "max"), values)
+        }
+        dist_stats["count"] = n
+
+        order = np.argsort(dist, kind="stable")
+        sorted_dist = dist[order]
+        results = []
+        for i in order[:max(limit, 0)]:
+            pct_rank = np.searchsorted(sorted_dist, dist[i], side="left") / (n - 1) if n > 1 else 0.0
+            row = self.rows[keep[i]]
+            results.append({
+                "id": row["id"],
+                "city": row["city"],
+                "country": row["country"],
+                "region": row["region"],
+                "location": row["location"],
+                "distance": round(float(dist[i]), 4),
+                "percentile": round(float(pct_rank) * 100, 1),
+                "env_cluster": row["env_cluster"],
+                "env_cluster_label": row["env_cluster_label"],
+            })
+        return dist_stats, results
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+
+# -----------------------
+# Process-wide block
+# -----------------------
+
+_BLOCK: Optional[WhcBlock] = None
+_CHECKED_AT = 0.0
+_LOCK = threading.Lock()
+
+
+def get_block(conn: psycopg.Connection) -> WhcBlock:
+    """The current block, reloaded if the WHC tables changed since the last check."""
+    global _BLOCK, _CHECKED_AT
+    now = time.monotonic()
+    block = _BLOCK
+    if block is not None and now - _CHECKED_AT < settings.WHC_BLOCK_TTL_S:
+        return block
+
+    with _LOCK:
+        if _BLOCK is not None and now - _CHECKED_AT < settings.WHC_BLOCK_TTL_S:
+            return _BLOCK
+        with conn.cursor() as cur:
+            cur.execute(_FINGERPRINT_SQL)
+            version = "/".join(cur.fetchone())
+        if _BLOCK is None or _BLOCK.version != version:
+            _BLOCK = WhcBlock.from_db(conn, version)
+        _CHECKED_AT = now
+        return _BLOCK
+
+
+def source_vector(conn: psycopg.Connection, basin_id: int) -> Optional[np.ndarray]:
+    """PCA vector of a basin: from the in-process index when loaded, else basin08_pca."""
+    index = pca_index.get_index()
+    if index is not None:
+        return index.vector(basin_id)
+    with conn.cursor() as cur:
+        cur.execute(_SOURCE_VECTOR_SQL, (basin_id,))
+        row = cur.fetchone()
+    return parse_vector(row[0]) if row else None
+
+
+def stats() -> Dict[str, Any]:
+    block = _BLOCK
+    if block is None:
+        return {"status": "empty"}
+    return {"status": "ready", "cities": len(block), "version": block.version,
+            "age_s": round(time.monotonic() - _CHECKED_AT, 1)}
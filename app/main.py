@@ -1,20 +1,71 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 
+from app import metrics
 from app.api.routes import router as api_router
+from app.api import routes_async, tiles, wh_catalogue, whg
+from app.api.compression import CompressionMiddleware
+from app.api.http_cache import CacheHeadersMiddleware
+from app.api.timing import TimingMiddleware
+from app.db import basin_index, data_versions, gaz_suggest, pca_index
+from app.db.pool import close_async_pool, close_pool, get_pool, open_async_pool, open_pool
+from app.settings import settings
 from app.web.pages import router as page_router
 
+ASYNC_MODE = settings.API_MODE == "async"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    open_pool()
+    basin_index.start(lambda: get_pool().connection())
+    pca_index.start(lambda: get_pool().connection())
+    gaz_suggest.start(lambda: get_pool().connection())
+    wh_catalogue.start(lambda: get_pool().connection())
+    data_versions.start(lambda: get_pool().connection())
+    metrics.start()
+    if ASYNC_MODE:
+        await open_async_pool()
+        await routes_async.open_http_client()
+    try:
+        yield
+    finally:
+        if ASYNC_MODE:
+            await routes_async.close_http_client()
+            await close_async_pool()
+        whg.close()
+        close_pool()
+
+
 app = FastAPI(
     title="EDOP Pilot",
     description="Environmental Dimensions of Place",
-    version="0.1"
+    version="0.1",
+    lifespan=lifespan,
 )
 
+if settings.COMPRESSION:
+    app.add_middleware(CompressionMiddleware)
+# Added last so it wraps compression: the data-version ETags it adds are not
+# per-URL, so they must not key the compressed-body cache
+if settings.HTTP_CACHE:
+    app.add_middleware(CacheHeadersMiddleware)
+# Outermost, so latency and response size include everything above
+if settings.METRICS:
+    app.add_middleware(TimingMiddleware)
+
+# In async mode the async handlers shadow their sync twins (first match wins);
+# paths without an async variant fall through to the sync router.
+if ASYNC_MODE:
+    app.include_router(routes_async.router)
 app.include_router(api_router)
+app.include_router(tiles.router)
 app.include_router(page_router)
 
 app.mount(
     "/static",
     StaticFiles(directory="app/static"),
     name="static"
-)
\ No newline at end of file
+)
@@ -0,0 +1,362 @@
+"""Per-request instrumentation and the Prometheus metrics behind /api/metrics.
+
+A RequestMetrics is opened per HTTP request by TimingMiddleware
+(app/api/timing.py) and stored in a context variable. Sync handlers and
+dependencies run in the threadpool with a copy of the request context, so they
+all see the same object:
+
+- DB time, query count and rows come from the instrumented cursors the pool
+  hands out (app/db/instrumented.py), via record_query().
+- External HTTP time (WHG, elevation providers) comes from the external()
+  timer around each call.
+
+When the response is done the middleware calls finish(), which folds the
+request into the process-wide counters and histograms below. Those live in
+each worker process, and a scrape of /api/metrics behind gunicorn reaches
+whichever worker accepts it. To report the whole server, set EDOP_METRICS_DIR
+to a directory shared by the workers: each worker then writes a snapshot
+there every EDOP_METRICS_FLUSH_S (and at exit), and /api/metrics sums all
+snapshots, including those of workers that have since exited, so counters
+only go up. Empty the directory when the server (re)starts, as with
+prometheus_client's multiprocess mode. Without it, /api/metrics shows only
+the worker that answered, so run a single worker or scrape each one.
+
+Queries slower than EDOP_SLOW_QUERY_MS are logged to the "edop.slow_query"
+logger with their route and kept in a small ring buffer shown on /api/health.
+Query parameters are never logged.
+"""
+import atexit
+import bisect
+import contextvars
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.settings import settings
+
+log = logging.getLogger("edop.slow_query")
+
+LATENCY_BUCKETS_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+class RequestMetrics:
+    """Counters for one request; mutated by whichever thread is serving it."""
+
+    __slots__ = ("scope", "t0", "db_ms", "queries", "rows", "http_ms", "http_calls", "slow")
+
+    def __init__(self, scope: Optional[Dict[str, Any]] = None):
+        self.scope = scope if scope is not None else {}
+        self.t0 = time.perf_counter()
+        self.db_ms = 0.0
+        self.queries = 0
+        self.rows = 0
+        self.http_ms = 0.0
+        self.http_calls = 0
+        self.slow = 0
+
+    @property
+    def route(self) -> str:
+        """Path template of the matched route (set on the scope by routing), bounding label cardinality."""
+        return getattr(self.scope.get("route"), "path", None) or "unmatched"
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.t0) * 1000.0
+
+
+_CURRENT: contextvars.ContextVar[Optional[RequestMetrics]] = contextvars.ContextVar("edop_request_metrics",
+                                                                                    default=None)
+
+
+def begin(scope: Dict[str, Any]) -> Tuple[RequestMetrics, contextvars.Token]:
+    m = RequestMetrics(scope)
+    return m, _CURRENT.set(m)
+
+
+def end(token: contextvars.Token) -> None:
+    _CURRENT.reset(token)
+
+
+def current() -> Optional[RequestMetrics]:
+    return _CURRENT.get()
+
+
+# -----------------------
+# Process-wide registry
+# -----------------------
+
+class Histogram:
+    """Prometheus-style histogram per label set (non-cumulative counts; cumulated on render)."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.series: Dict[Tuple[str, ...], List[float]] = {}  # labels -> [counts..., +Inf, sum, count]
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        s = self.series.get(labels)
+        if s is None:
+            s = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        s[bisect.bisect_left(self.buckets, value)] += 1
+        s[-2] += value
+        s[-1] += 1
+
+
+_LOCK = threading.Lock()
+_REQUESTS: Dict[Tuple[str, str, str], int] = {}  # (method, route, status) -> n
+_DB_QUERIES: Dict[str, int] = {}
+_DB_ROWS: Dict[str, int] = {}
+_SLOW_QUERIES: Dict[str, int] = {}
+_EXTERNAL: Dict[Tuple[str, str], int] = {}  # (service, outcome) -> n
+_LATENCY = Histogram(LATENCY_BUCKETS_S)  # (method, route)
+_DB_TIME = Histogram(LATENCY_BUCKETS_S)  # (route,)
+_HTTP_TIME = Histogram(LATENCY_BUCKETS_S)  # (route,)
+_SIZE = Histogram(SIZE_BUCKETS_BYTES)  # (route,)
+_EXTERNAL_TIME = Histogram(LATENCY_BUCKETS_S)  # (service,)
+_SLOW_LOG: Deque[Dict[str, Any]] = deque(maxlen=50)
+
+# Exposition name -> registry; also the keys of the EDOP_METRICS_DIR snapshots
+_COUNTERS: Dict[str, Dict[Any, int]] = {
+    "requests": _REQUESTS, "db_queries": _DB_QUERIES, "db_rows": _DB_ROWS,
+    "slow_queries": _SLOW_QUERIES, "external": _EXTERNAL,
+}
+_HISTOGRAMS: Dict[str, Histogram] = {
+    "latency": _LATENCY, "db_time": _DB_TIME, "http_time": _HTTP_TIME, "size": _SIZE,
+    "external_time": _EXTERNAL_TIME,
+}
+
+
+def finish(m: RequestMetrics, method: str, status: int, size: int) -> None:
+    """Fold a completed request into the registry."""
+    route = m.route
+    total_s = m.elapsed_ms() / 1000.0
+    with _LOCK:
+        key = (method, route, str(status))
+        _REQUESTS[key] = _REQUESTS.get(key, 0) + 1
+        _LATENCY.observe((method, route), total_s)
+        _SIZE.observe((route,), size)
+        if m.queries:
+            _DB_QUERIES[route] = _DB_QUERIES.get(route, 0) + m.queries
+            _DB_ROWS[route] = _DB_ROWS.get(route, 0) + m.rows
+            _DB_TIME.observe((route,), m.db_ms / 1000.0)
+        if m.http_calls:
+            _HTTP_TIME.observe((route,), m.http_ms / 1000.0)
+        if m.slow:
+            _SLOW_QUERIES[route] = _SLOW_QUERIES.get(route, 0) + m.slow
+
+
+_WS = re.compile(r"\s+")
+
+
+def record_fetch(ms: float, rows: int) -> None:
+    """Called by the instrumented server-side cursors per fetch round trip."""
+    m = _CURRENT.get()
+    if m is not None:
+        m.db_ms += ms
+        m.rows += rows
+
+
+def record_query(ms: float, rows: int, sql: Any) -> None:
+    """Called by the instrumented cursors after each execute."""
+    m = _CURRENT.get()
+    if m is not None:
+        m.db_ms += ms
+        m.queries += 1
+        m.rows += rows
+    if ms >= settings.SLOW_QUERY_MS:
+        text = _WS.sub(" ", sql if isinstance(sql, str) else str(sql)).strip()[:500]
+        route = m.route if m is not None else "background"
+        if m is not None:
+            m.slow += 1
+        entry = {"at": time.strftime("%Y-%m-%dT%H:%M:%S"), "route": route, "ms": round(ms, 1), "rows": rows,
+                 "sql": text}
+        with _LOCK:
+            _SLOW_LOG.append(entry)
+            if m is None:
+                _SLOW_QUERIES[route] = _SLOW_QUERIES.get(route, 0) + 1
+        log.warning("slow query: %.1f ms, %d rows, route=%s: %s", ms, rows, route, text)
+
+
+@contextmanager
+def external(service: str) -> Iterator[None]:
+    """Time an outbound HTTP call (service: "whg", "elevation") for the current request."""
+    t0 = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        ms = (time.perf_counter() - t0) * 1000.0
+        m = _CURRENT.get()
+        if m is not None:
+            m.http_ms += ms
+            m.http_calls += 1
+        with _LOCK:
+            key = (service, outcome)
+            _EXTERNAL[key] = _EXTERNAL.get(key, 0) + 1
+            _EXTERNAL_TIME.observe((service,), ms / 1000.0)
+
+
+# -----------------------
+# Prometheus text exposition (format 0.0.4)
+# -----------------------
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _counter(out: List[str], name: str, help_: str, names: Sequence[str], values: Dict[Any, int]) -> None:
+    out.append(f"# HELP {name} {help_}")
+    out.append(f"# TYPE {name} counter")
+    for key, n in sorted(values.items()):
+        key = key if isinstance(key, tuple) else (key,)
+        out.append(f"{name}{_labels(names, key)} {n}")
+
+
+def _histogram(out: List[str], name: str, help_: str, names: Sequence[str], hist: Histogram) -> None:
+    out.append(f"# HELP {name} {help_}")
+    out.append(f"# TYPE {name} histogram")
+    for key, s in sorted(hist.series.items()):
+        running = 0
+        for le, n in zip([f"{b:g}" for b in hist.buckets] + ["+Inf"], s[:-2]):
+            running += n
+            bucket = _labels(names, key, f'le="{le}"')
+            out.append(f"{name}_bucket{bucket} {running}")
+        out.append(f"{name}_sum{_labels(names, key)} {s[-2]:.6f}")
+        out.append(f"{name}_count{_labels(names, key)} {s[-1]}")
+
+
+def render() -> bytes:
+    counters, histograms = _collect()
+    out: List[str] = []
+    _counter(out, "edop_http_requests_total", "HTTP requests by route and status.",
+             ("method", "route", "status"), counters["requests"])
+    _histogram(out, "edop_http_request_duration_seconds", "Time from request to last body byte.",
+               ("method", "route"), histograms["latency"])
+    _histogram(out, "edop_http_response_size_bytes", "Response body bytes as sent (after compression).",
+               ("route",), histograms["size"])
+    _histogram(out, "edop_db_time_seconds", "Database time per request (requests with queries).",
+               ("route",), histograms["db_time"])
+    _counter(out, "edop_db_queries_total", "Queries executed.", ("route",), counters["db_queries"])
+    _counter(out, "edop_db_rows_total", "Rows returned by queries.", ("route",), counters["db_rows"])
+    _counter(out, "edop_db_slow_queries_total", f"Queries over {settings.SLOW_QUERY_MS:g} ms.",
+             ("route",), counters["slow_queries"])
+    _histogram(out, "edop_external_http_time_seconds", "External HTTP time per request (requests with calls).",
+               ("route",), histograms["http_time"])
+    _histogram(out, "edop_external_http_call_duration_seconds", "Outbound HTTP call duration.",
+               ("service",), histograms["external_time"])
+    _counter(out, "edop_external_http_calls_total", "Outbound HTTP calls by outcome.",
+             ("service", "outcome"), counters["external"])
+    return ("\n".join(out) + "\n").encode("utf-8")
+
+
+# -----------------------
+# Multi-worker aggregation (EDOP_METRICS_DIR)
+# -----------------------
+
+# Unique per process lifetime, so a recycled pid never overwrites a dead worker's snapshot
+_SNAPSHOT_NAME = f"{os.getpid()}-{int(time.time() * 1000)}.json"
+_FLUSHER_STARTED = False
+
+
+def _key(key: Any) -> Tuple[str, ...]:
+    return key if isinstance(key, tuple) else (key,)
+
+
+def _snapshot() -> Dict[str, Any]:
+    with _LOCK:
+        return {
+            "counters": {name: [[list(_key(k)), n] for k, n in reg.items()] for name, reg in _COUNTERS.items()},
+            "histograms": {name: [[list(k), list(s)] for k, s in hist.series.items()]
+                           for name, hist in _HISTOGRAMS.items()},
+        }
+
+
+def flush() -> None:
+    """Write this worker's snapshot to EDOP_METRICS_DIR (write-then-rename)."""
+    if not settings.METRICS_DIR:
+        return
+    path = Path(settings.METRICS_DIR) / _SNAPSHOT_NAME
+    tmp = path.with_name(path.name + ".tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(json.dumps(_snapshot()), encoding="utf-8")
+        tmp.replace(path)
+    except OSError as e:
+        log.warning("could not write metrics snapshot %s: %s", path, e)
+
+
+def _collect() -> Tuple[Dict[str, Dict[Tuple[str, ...], int]], Dict[str, Histogram]]:
+    """Counters and histograms to expose: this worker's, or the sum of all snapshots in EDOP_METRICS_DIR."""
+    counters: Dict[str, Dict[Tuple[str, ...], int]] = {name: {} for name in _COUNTERS}
+    histograms = {name: Histogram(hist.buckets) for name, hist in _HISTOGRAMS.items()}
+    if settings.METRICS_DIR:
+        flush()
+        snapshots = []
+        for path in Path(settings.METRICS_DIR).glob("*.json"):
+            try:
+                snapshots.append(json.loads(path.read_text(encoding="utf-8")))
+            except (OSError, ValueError):
+                continue  # removed or being replaced; counted on the next scrape
+    else:
+        snapshots = [_snapshot()]
+
+    for snap in snapshots:
+        for name, entries in snap["counters"].items():
+            if name not in counters:
+                continue
+            reg = counters[name]
+            for key, n in entries:
+                key = tuple(key)
+                reg[key] = reg.get(key, 0) + n
+        for name, entries in snap["histograms"].items():
+            hist = histograms.get(name)
+            if hist is None:
+                continue
+            for key, s in entries:
+                key = tuple(key)
+                if len(s) != len(hist.buckets) + 3:
+                    continue  # bucket layout changed between deploys
+                total = hist.series.get(key)
+                hist.series[key] = s if total is None else [a + b for a, b in zip(total, s)]
+    return counters, histograms
+
+
+def _flush_loop() -> None:
+    while True:
+        time.sleep(settings.METRICS_FLUSH_S)
+        flush()
+
+
+def start() -> None:
+    """Start writing snapshots to EDOP_METRICS_DIR (no-op without it). Called from the app lifespan."""
+    global _FLUSHER_STARTED
+    if not (settings.METRICS and settings.METRICS_DIR) or _FLUSHER_STARTED:
+        return
+    _FLUSHER_STARTED = True
+    flush()
+    atexit.register(flush)
+    threading.Thread(target=_flush_loop, name="edop-metrics-flush", daemon=True).start()
+
+
+def stats() -> Dict[str, Any]:
+    with _LOCK:
+        return {"enabled": settings.METRICS, "slow_query_ms": settings.SLOW_QUERY_MS,
+                "dir": settings.METRICS_DIR or None, "requests": sum(_REQUESTS.values()),
+                "slow_queries": list(_SLOW_LOG)[-10:]}
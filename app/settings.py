@@ -10,12 +10,151 @@ except ImportError:
     pass
 
 
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, "1" if default else "0") in ("1", "true", "True", "yes", "YES")
+
+
 class Settings:
     """
     Minimal application settings.
     """
     def __init__(self):
         self.WHG_API_TOKEN = os.getenv("WHG_API_TOKEN")
+        # WHG client (app/api/whg.py): base URL (point at scripts/stub_whg_server.py
+        # for local testing), timeout, keep-alive pool size and response cache
+        self.WHG_BASE_URL = os.getenv("EDOP_WHG_BASE_URL", "https://whgazetteer.org")
+        self.WHG_TIMEOUT_S = _env_float("EDOP_WHG_TIMEOUT_S", 20.0)
+        self.WHG_MAX_CONNECTIONS = _env_int("EDOP_WHG_MAX_CONNECTIONS", 20)
+        self.WHG_CACHE_MAX_ITEMS = _env_int("EDOP_WHG_CACHE_MAX_ITEMS", 5000)
+        self.WHG_CACHE_TTL_S = _env_float("EDOP_WHG_CACHE_TTL_S", 3600.0)
+        # Reconcile extend rows (geometry etc.) cached per place ID; places change rarely
+        self.WHG_EXTEND_CACHE_MAX_ITEMS = _env_int("EDOP_WHG_EXTEND_CACHE_MAX_ITEMS", 50000)
+        self.WHG_EXTEND_CACHE_TTL_S = _env_float("EDOP_WHG_EXTEND_CACHE_TTL_S", 86400.0)
+
+        # Shared Postgres pool (app/db/pool.py)
+        self.DB_POOL_MIN_SIZE = _env_int("DB_POOL_MIN_SIZE", 2)
+        self.DB_POOL_MAX_SIZE = _env_int("DB_POOL_MAX_SIZE", 10)
+        # Requests allowed to queue for a connection before we answer 503 (0 = unbounded)
+        self.DB_POOL_MAX_WAITING = _env_int("DB_POOL_MAX_WAITING", 50)
+        # Seconds to wait for a connection before giving up
+        self.DB_POOL_TIMEOUT = _env_float("DB_POOL_TIMEOUT", 10.0)
+        # Seconds an idle connection above min_size is kept before closing
+        self.DB_POOL_MAX_IDLE = _env_float("DB_POOL_MAX_IDLE", 300.0)
+        # Health-check connections (empty-query ping) when handing them out
+        self.DB_POOL_CHECK = _env_bool("DB_POOL_CHECK", True)
+
+        # "sync" (default) or "async": async mode serves the hot endpoints from
+        # app/api/routes_async.py with AsyncConnectionPool + httpx
+        self.API_MODE = os.getenv("EDOP_API_MODE", "sync").lower()
+        # Upper bound on concurrent outbound WHG/elevation connections in async mode
+        self.ASYNC_HTTP_MAX_CONNECTIONS = _env_int("EDOP_ASYNC_HTTP_MAX_CONNECTIONS", 100)
+
+        # Optional in-process point-in-basin index (app/db/basin_index.py; needs shapely)
+        self.BASIN_INDEX = _env_bool("EDOP_BASIN_INDEX", False)
+        self.BASIN_INDEX_SNAPSHOT = os.getenv("EDOP_BASIN_INDEX_SNAPSHOT", "output/basin08_index.npz")
+
+        # Optional in-process ANN index over basin08 PCA vectors (app/db/pca_index.py):
+        # source .npy outputs, trained snapshot, IVF list count and lists probed per query
+        self.PCA_INDEX = _env_bool("EDOP_PCA_INDEX", False)
+        self.PCA_COORDS = os.getenv("EDOP_PCA_COORDS", "output/basin08_pca_coords.npy")
+        self.PCA_BASIN_IDS = os.getenv("EDOP_PCA_BASIN_IDS", "output/basin08_basin_ids.npy")
+        self.PCA_INDEX_SNAPSHOT = os.getenv("EDOP_PCA_INDEX_SNAPSHOT", "output/basin08_pca_index.npz")
+        self.PCA_IVF_LISTS = _env_int("EDOP_PCA_IVF_LISTS", 512)
+        self.PCA_IVF_NPROBE = _env_int("EDOP_PCA_IVF_NPROBE", 24)
+        # Precomputed top-K basin neighbours (scripts/build_basin_neighbours.py)
+        self.BASIN_NEIGHBOURS_DIR = os.getenv("EDOP_BASIN_NEIGHBOURS_DIR", "output/basin_neighbours")
+
+        # Optional in-memory autocomplete for /api/gaz-suggest (app/db/gaz_suggest.py)
+        # and how often it re-checks gaz.edop_gaz for re-imports
+        self.GAZ_SUGGEST = _env_bool("EDOP_GAZ_SUGGEST", False)
+        self.GAZ_SUGGEST_REFRESH_S = _env_float("EDOP_GAZ_SUGGEST_REFRESH_S", 300.0)
+        # How often /api/wh-sites re-reads edop_clusters labels (app/api/wh_catalogue.py)
+        self.WH_CATALOGUE_REFRESH_S = _env_float("EDOP_WH_CATALOGUE_REFRESH_S", 60.0)
+        # How often the cached /api/societies payload re-checks the society views (app/db/societies.py)
+        self.SOCIETIES_CACHE_TTL_S = _env_float("EDOP_SOCIETIES_CACHE_TTL_S", 60.0)
+        # How often the cached WH city vector block (app/db/whc_vectors.py) re-checks
+        # gaz.wh_cities / whc_clusters for changes
+        self.WHC_BLOCK_TTL_S = _env_float("EDOP_WHC_BLOCK_TTL_S", 60.0)
+
+        # Relation signatures are read from: the materialized mv_basin08_persist
+        # (sql/mv_basin08_persist.sql) or the live v_basin08_persist view
+        self.SIGNATURE_SOURCE = os.getenv("EDOP_SIGNATURE_SOURCE", "mv_basin08_persist")
+
+        # Vector tiles (app/api/tiles.py): on-disk cache root, how often layer
+        # versions are re-checked against the DB, and browser cache lifetime
+        self.TILE_CACHE_DIR = os.getenv("EDOP_TILE_CACHE_DIR", "output/tiles")
+        self.TILE_VERSION_TTL_S = _env_float("EDOP_TILE_VERSION_TTL_S", 300.0)
+        self.TILE_MAX_AGE_S = _env_int("EDOP_TILE_MAX_AGE_S", 3600)
+
+        # Response compression (app/api/compression.py): opted-in path prefixes,
+        # encodings by preference (br/zstd need the brotli/zstandard packages),
+        # smallest body worth compressing, body size compressed off the event loop,
+        # and the cache of compressed ETag'd payloads
+        self.COMPRESSION = _env_bool("EDOP_COMPRESSION", True)
+        self.COMPRESSION_PATHS = os.getenv(
+            "EDOP_COMPRESSION_PATHS",
+            "/api/signature,/api/eco/,/api/societies,/api/whc-cities,/api/wh-sites,/api/basin-clusters",
+        )
+        self.COMPRESSION_ENCODINGS = os.getenv("EDOP_COMPRESSION_ENCODINGS", "br,zstd,gzip")
+        self.COMPRESSION_MIN_BYTES = _env_int("EDOP_COMPRESSION_MIN_BYTES", 1024)
+        self.COMPRESSION_THREAD_MIN_BYTES = _env_int("EDOP_COMPRESSION_THREAD_MIN_BYTES", 256 * 1024)
+        self.COMPRESSION_GZIP_LEVEL = _env_int("EDOP_COMPRESSION_GZIP_LEVEL", 6)
+        self.COMPRESSION_BR_QUALITY = _env_int("EDOP_COMPRESSION_BR_QUALITY", 5)
+        self.COMPRESSION_ZSTD_LEVEL = _env_int("EDOP_COMPRESSION_ZSTD_LEVEL", 3)
+        self.COMPRESSION_CACHE_MAX_MB = _env_int("EDOP_COMPRESSION_CACHE_MAX_MB", 64)
+        # HTTP caching of batch-loaded data keyed on public.edop_data_versions
+        # (app/api/http_cache.py): on/off, registry poll interval, Cache-Control
+        # max-age (0 = no-cache, i.e. always revalidate) and an ETag salt to bump
+        # when a deploy changes response shapes
+        self.HTTP_CACHE = _env_bool("EDOP_HTTP_CACHE", True)
+        self.DATA_VERSIONS_POLL_S = _env_float("EDOP_DATA_VERSIONS_POLL_S", 15.0)
+        self.HTTP_CACHE_MAX_AGE_S = _env_int("EDOP_HTTP_CACHE_MAX_AGE_S", 0)
+        self.HTTP_CACHE_ETAG_SALT = os.getenv("EDOP_HTTP_CACHE_ETAG_SALT", "1")
+        # Request/DB/external-HTTP instrumentation (app/metrics.py): /api/metrics and
+        # the instrumented pool cursors, the Server-Timing header per response, and
+        # the threshold above which a query is logged to "edop.slow_query"
+        self.METRICS = _env_bool("EDOP_METRICS", True)
+        self.SERVER_TIMING = _env_bool("EDOP_SERVER_TIMING", True)
+        self.SLOW_QUERY_MS = _env_float("EDOP_SLOW_QUERY_MS", 250.0)
+        # Directory shared by all workers (emptied at server start) for per-worker
+        # snapshots that /api/metrics sums; unset = report only the answering worker
+        self.METRICS_DIR = os.getenv("EDOP_METRICS_DIR", "")
+        self.METRICS_FLUSH_S = _env_float("EDOP_METRICS_FLUSH_S", 5.0)
+
+        # Prebuilt eco hierarchy GeoJSON (scripts/build_eco_geojson.py, app/api/eco_static.py)
+        self.ECO_GEOJSON_DIR = os.getenv("EDOP_ECO_GEOJSON_DIR", "output/eco_geojson")
+        self.ECO_GEOJSON_MAX_AGE_S = _env_int("EDOP_ECO_GEOJSON_MAX_AGE_S", 86400)
+
+        # Signature payload + basin row caches (app/db/signature.py)
+        self.SIG_CACHE_MAX_ITEMS = _env_int("EDOP_SIG_CACHE_MAX_ITEMS", 2048)
+        self.SIG_CACHE_MAX_MB = _env_int("EDOP_SIG_CACHE_MAX_MB", 256)
+        self.SIG_CACHE_TTL_S = _env_float("EDOP_SIG_CACHE_TTL_S", 24 * 3600.0)
+        # Point elevation cache; failed lookups expire after ELEV_CACHE_ERROR_TTL_S
+        self.ELEV_CACHE_MAX_ITEMS = _env_int("EDOP_ELEV_CACHE_MAX_ITEMS", 8192)
+        self.ELEV_CACHE_TTL_S = _env_float("EDOP_ELEV_CACHE_TTL_S", 7 * 24 * 3600.0)
+        self.ELEV_CACHE_ERROR_TTL_S = _env_float("EDOP_ELEV_CACHE_ERROR_TTL_S", 60.0)
+
+        # Elevation provider chain, tried in order (app/db/elevation.py);
+        # "local" is skipped unless ELEV_DEM_DIR holds a tile set with dem.json
+        self.ELEV_PROVIDERS = os.getenv("EDOP_ELEV_PROVIDERS", "local,opentopodata,open-meteo")
+        self.ELEV_DEM_DIR = os.getenv("EDOP_ELEV_DEM_DIR", "output/dem")
+        self.ELEV_OPENTOPODATA_URL = os.getenv("EDOP_OPENTOPODATA_URL", "https://api.opentopodata.org/v1/mapzen")
+        self.ELEV_OPEN_METEO_URL = os.getenv("EDOP_OPEN_METEO_URL", "https://api.open-meteo.com/v1/elevation")
+        # Hedged remote lookups: fire the next provider if the current one hasn't
+        # answered within this many ms (0 = strictly sequential fallback)
+        self.ELEV_HEDGE_MS = _env_float("EDOP_ELEV_HEDGE_MS", 0.0)
+        self.ELEV_HEDGE_WORKERS = _env_int("EDOP_ELEV_HEDGE_WORKERS", 32)
+        # Skip a remote provider for COOLDOWN_S after this many consecutive failures (0 = never)
+        self.ELEV_BREAKER_FAILURES = _env_int("EDOP_ELEV_BREAKER_FAILURES", 5)
+        self.ELEV_BREAKER_COOLDOWN_S = _env_float("EDOP_ELEV_BREAKER_COOLDOWN_S", 30.0)
 
 
 settings = Settings()
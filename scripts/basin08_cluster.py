@@ -16,6 +16,8 @@ from sklearn.cluster import MiniBatchKMeans
 from sklearn.preprocessing import StandardScaler
 from dotenv import load_dotenv
 
+from edop_app import bump_data_version
+
 load_dotenv()
 
 # Configuration
@@ -225,6 +227,7 @@ def save_cluster_ids(conn, basin_ids, cluster_labels):
                 pct = min(100, 100 * (i + batch_size) / total)
                 print(f"  Updated {min(i + batch_size, total):,} / {total:,} ({pct:.0f}%)")
 
+        bump_data_version(conn, "basin_clusters", "basin08_cluster.py")
         conn.commit()
 
     print("Done!")
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Load benchmark: sync vs async API modes at increasing client concurrency.
+
+Start two servers against the same database, one per mode, e.g.:
+
+    uvicorn app.main:app --port 8001
+    EDOP_API_MODE=async uvicorn app.main:app --port 8002
+
+then run:
+
+    python scripts/bench_api_concurrency.py \
+        --sync http://localhost:8001 --async http://localhost:8002
+
+Each (mode, concurrency) cell fires --requests requests from `concurrency`
+concurrent clients over the endpoint mix below and reports throughput,
+latency percentiles and error counts (non-2xx, including 503 pool rejections).
+Results are printed as a markdown table and optionally written as JSON.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+# Endpoint mix: signature (DB + elevation HTTP) and gaz-suggest (DB only).
+# Coordinates are the WH cities used throughout the pilot logs.
+DEFAULT_PATHS = [
+    "/api/signature?lat=16.76618535&lon=-3.00777252",   # Timbuktu
+    "/api/signature?lat=41.3783&lon=60.3639",           # Khiva
+    "/api/signature?lat=51.2093&lon=3.2247",            # Bruges
+    "/api/gaz-suggest?q=Tim",
+    "/api/gaz-suggest?q=Bru",
+]
+
+CONCURRENCY_LEVELS = [50, 200, 1000]
+
+
+def _percentile(sorted_vals: List[float], q: float) -> float:
+    if not sorted_vals:
+        return float("nan")
+    idx = min(len(sorted_vals) - 1, int(round(q * (len(sorted_vals) - 1))))
+    return sorted_vals[idx]
+
+
+async def run_cell(base_url: str, paths: List[str], concurrency: int, n_requests: int,
+                   timeout_s: float) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    status_counts: Dict[int, int] = {}
+    path_cycle = itertools.cycle(paths)
+    queue: asyncio.Queue = asyncio.Queue()
+    for _ in range(n_requests):
+        queue.put_nowait(next(path_cycle))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout_s) as client:
+
+        async def worker():
+            nonlocal errors
+            while True:
+                try:
+                    path = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                t0 = time.perf_counter()
+                try:
+                    resp = await client.get(path)
+                    status_counts[resp.status_code] = status_counts.get(resp.status_code, 0) + 1
+                    if resp.status_code >= 300:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - t0) * 1000.0)
+
+        t_start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - t_start
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": n_requests,
+        "errors": errors,
+        "status": status_counts,
+        "wall_s": round(wall, 3),
+        "rps": round(n_requests / wall, 1) if wall > 0 else None,
+        "p50_ms": round(_percentile(latencies, 0.50), 1),
+        "p95_ms": round(_percentile(latencies, 0.95), 1),
+        "p99_ms": round(_percentile(latencies, 0.99), 1),
+        "max_ms": round(latencies[-1], 1) if latencies else None,
+    }
+
+
+async def main_async(args) -> List[Dict[str, Any]]:
+    targets = [("sync", args.sync_url), ("async", args.async_url)]
+    targets = [(m, u) for m, u in targets if u]
+    results = []
+    for concurrency in args.levels:
+        for mode, url in targets:
+            # Warm caches / pools so the first cell isn't penalized
+            await run_cell(url, args.paths, min(concurrency, 10), min(concurrency, 20), args.timeout)
+            n = max(args.requests, concurrency)
+            cell = await run_cell(url, args.paths, concurrency, n, args.timeout)
+            cell["mode"] = mode
+            results.append(cell)
+            print(f"  {mode:5s} c={concurrency:<5d} rps={cell['rps']} p50={cell['p50_ms']}ms "
+                  f"p99={cell['p99_ms']}ms errors={cell['errors']}")
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sync", dest="sync_url", help="Base URL of a server running EDOP_API_MODE=sync")
+    ap.add_argument("--async", dest="async_url", help="Base URL of a server running EDOP_API_MODE=async")
+    ap.add_argument("--levels", type=int, nargs="+", default=CONCURRENCY_LEVELS)
+    ap.add_argument("--requests", type=int, default=2000, help="Requests per cell (at least one per client)")
+    ap.add_argument("--timeout", type=float, default=60.0)
+    ap.add_argument("--path", dest="paths", action="append", help="Override endpoint mix (repeatable)")
+    ap.add_argument("--out", help="Write raw results as JSON")
+    args = ap.parse_args()
+    args.paths = args.paths or DEFAULT_PATHS
+
+    if not (args.sync_url or args.async_url):
+        ap.error("give at least one of --sync / --async")
+
+    results = asyncio.run(main_async(args))
+
+    print()
+    print("| mode | clients | requests | rps | p50 ms | p95 ms | p99 ms | errors |")
+    print("|------|--------:|---------:|----:|-------:|-------:|-------:|-------:|")
+    for r in results:
+        print(f"| {r['mode']} | {r['concurrency']} | {r['requests']} | {r['rps']} | "
+              f"{r['p50_ms']} | {r['p95_ms']} | {r['p99_ms']} | {r['errors']} |")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
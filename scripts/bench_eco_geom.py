@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Compare parse-and-dump vs raw passthrough for the eco geometry endpoints.
+
+Runs the Ecoregions2017 FeatureCollection (all 847 ecoregions by default, or
+one bioregion with --bioregion) through both response paths and reports wall
+time, CPU time, peak Python memory (tracemalloc) and response size:
+
+    parse     ST_AsGeoJSON(geom)::json loaded into dicts by psycopg, Features
+              built in Python, then jsonable_encoder + JSONResponse (the old path)
+    orjson    same dicts, serialized with app.api.responses.dumps()
+    raw       json_build_object Feature per row from Postgres, loaded as bytes
+              (RawJSONLoader) and spliced, as the endpoints now do
+
+--synthetic N skips the database: it generates N Feature documents of
+--points vertices each and times only the Python side (json.loads stands in
+for psycopg's json loader).
+
+Usage:
+    python scripts/bench_eco_geom.py [--bioregion AT7] [--repeat 3]
+    python scripts/bench_eco_geom.py --synthetic 847 --points 3000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import psycopg
+from dotenv import load_dotenv
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from app.api.responses import RawJSONLoader, dumps  # noqa: E402
+
+load_dotenv()
+
+PARSE_SQL = """
+    SELECT eco_id, eco_name, ST_AsGeoJSON(geom)::json
+    FROM gaz."Ecoregions2017"
+    {where}
+    ORDER BY eco_name
+"""
+
+RAW_SQL = """
+    SELECT json_build_object(
+        'type', 'Feature',
+        'properties', json_build_object('id', eco_id, 'name', eco_name),
+        'geometry', ST_AsGeoJSON(geom)::json
+    )
+    FROM gaz."Ecoregions2017"
+    {where}
+    ORDER BY eco_name
+"""
+
+
+def get_db_connection():
+    """Create database connection from environment variables."""
+    return psycopg.connect(
+        host=os.environ.get("PGHOST", "localhost"),
+        port=os.environ.get("PGPORT", "5435"),
+        dbname=os.environ.get("PGDATABASE", "edop"),
+        user=os.environ.get("PGUSER", "postgres"),
+        password=os.environ.get("PGPASSWORD", ""),
+    )
+
+
+def _features(rows):
+    return [{"type": "Feature", "properties": {"id": r[0], "name": r[1]}, "geometry": r[2]} for r in rows]
+
+
+def _splice(docs):
+    return b'{"type":"FeatureCollection","features":[' + b",".join(docs) + b"]}"
+
+
+def measure(fn, repeat):
+    """(best wall ms, best CPU ms, peak traced MB, output bytes) over repeat runs."""
+    wall, cpu, out = float("inf"), float("inf"), b""
+    for _ in range(repeat):
+        w0, c0 = time.perf_counter(), time.process_time()
+        out = fn()
+        wall = min(wall, (time.perf_counter() - w0) * 1000.0)
+        cpu = min(cpu, (time.process_time() - c0) * 1000.0)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return wall, cpu, peak, len(out)
+
+
+def db_paths(conn, bioregion):
+    where = "WHERE bioregion = %s" if bioregion else ""
+    params = (bioregion,) if bioregion else None
+
+    def fetch_parsed():
+        with conn.cursor() as cur:
+            cur.execute(PARSE_SQL.format(where=where), params)
+            return cur.fetchall()
+
+    def raw():
+        with conn.cursor() as cur:
+            cur.adapters.register_loader("json", RawJSONLoader)
+            cur.execute(RAW_SQL.format(where=where), params)
+            return _splice([r[0] for r in cur.fetchall()])
+
+    return {
+        "parse": lambda: JSONResponse(jsonable_encoder(
+            {"type": "FeatureCollection", "features": _features(fetch_parsed())})).body,
+        "orjson": lambda: dumps({"type": "FeatureCollection", "features": _features(fetch_parsed())}),
+        "raw": raw,
+    }
+
+
+def synthetic_paths(n, points):
+    rng = random.Random(0)
+    docs = []
+    for i in range(n):
+        ring = [[round(rng.uniform(-180, 180), 9), round(rng.uniform(-90, 90), 9)] for _ in range(points)]
+        ring.append(ring[0])
+        geometry = json.dumps({"type": "MultiPolygon", "coordinates": [[ring]]})
+        docs.append((i, f"Ecoregion {i}", geometry,
+                     f'{{"type" : "Feature", "properties" : {{"id" : {i}, "name" : "Ecoregion {i}"}}, '
+                     f'"geometry" : {geometry}}}'.encode()))
+
+    def parsed_rows():
+        return [(i, name, json.loads(geometry)) for i, name, geometry, _ in docs]
+
+    return {
+        "parse": lambda: JSONResponse(jsonable_encoder(
+            {"type": "FeatureCollection", "features": _features(parsed_rows())})).body,
+        "orjson": lambda: dumps({"type": "FeatureCollection", "features": _features(parsed_rows())}),
+        "raw": lambda: _splice([bytes(memoryview(d[3])) for d in docs]),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--bioregion", help="Only this bioregion's ecoregions (default: all)")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--synthetic", type=int, metavar="N", help="Generate N features instead of querying")
+    ap.add_argument("--points", type=int, default=3000, help="Vertices per synthetic feature")
+    args = ap.parse_args()
+
+    if args.synthetic:
+        paths = synthetic_paths(args.synthetic, args.points)
+        label = f"synthetic: {args.synthetic} features x {args.points} vertices"
+        conn = None
+    else:
+        conn = get_db_connection()
+        paths = db_paths(conn, args.bioregion)
+        label = f"Ecoregions2017{' bioregion ' + args.bioregion if args.bioregion else ''}"
+
+    print(label)
+    print(f"{'path':8s} {'wall ms':>9s} {'cpu ms':>9s} {'peak MB':>9s} {'bytes':>13s}")
+    try:
+        for name, fn in paths.items():
+            wall, cpu, peak, size = measure(fn, args.repeat)
+            print(f"{name:8s} {wall:9.1f} {cpu:9.1f} {peak:9.1f} {size:13,d}")
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark the in-memory gazetteer suggest index (app/db/gaz_suggest.py).
+
+Builds the index from gaz.edop_gaz, then times suggest() for prefixes taken
+from real titles (every distinct 3-character prefix by default) and reports
+p50/p99 latency. With --sql, also times the previous title ILIKE query for
+the same prefixes.
+
+Usage:
+    python scripts/bench_gaz_suggest.py [--length 3] [--limit 15] [--max-prefixes 2000] [--sql]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+import psycopg
+from dotenv import load_dotenv
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from app.db.gaz_suggest import SuggestIndex  # noqa: E402
+
+load_dotenv()
+
+SQL = """
+    SELECT id, source, source_id, title, ccodes, lon, lat
+    FROM gaz.edop_gaz
+    WHERE title ILIKE %s
+    ORDER BY title
+    LIMIT %s
+"""
+
+
+def get_db_connection():
+    """Create database connection from environment variables."""
+    return psycopg.connect(
+        host=os.environ.get("PGHOST", "localhost"),
+        port=os.environ.get("PGPORT", "5435"),
+        dbname=os.environ.get("PGDATABASE", "edop"),
+        user=os.environ.get("PGUSER", "postgres"),
+        password=os.environ.get("PGPASSWORD", ""),
+    )
+
+
+def _percentile(sorted_vals, q):
+    idx = min(len(sorted_vals) - 1, int(round(q * (len(sorted_vals) - 1))))
+    return sorted_vals[idx]
+
+
+def _report(name, timings_ms):
+    timings_ms.sort()
+    print(f"{name:8s} n={len(timings_ms):5d}  p50={_percentile(timings_ms, 0.5):.3f}ms  "
+          f"p99={_percentile(timings_ms, 0.99):.3f}ms  max={timings_ms[-1]:.3f}ms")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--length", type=int, default=3, help="Prefix length in characters")
+    ap.add_argument("--limit", type=int, default=15, help="Suggestions per query (the UI asks for 15)")
+    ap.add_argument("--max-prefixes", type=int, default=2000)
+    ap.add_argument("--sql", action="store_true", help="Also time the ILIKE query")
+    args = ap.parse_args()
+
+    with get_db_connection() as conn:
+        t0 = time.perf_counter()
+        index = SuggestIndex.from_db(conn)
+        print(f"Built index: {len(index)} places, {len(index.keys)} keys in {time.perf_counter() - t0:.2f}s\n")
+
+        prefixes = sorted({p[3][:args.length] for p in index.places if p[3] and len(p[3]) >= args.length})
+        random.seed(0)
+        if len(prefixes) > args.max_prefixes:
+            prefixes = random.sample(prefixes, args.max_prefixes)
+
+        # Warm-up pass, then timed pass
+        for p in prefixes:
+            index.suggest(p, args.limit)
+        timings = []
+        for p in prefixes:
+            t0 = time.perf_counter()
+            index.suggest(p, args.limit)
+            timings.append((time.perf_counter() - t0) * 1000.0)
+        _report("index", timings)
+
+        if args.sql:
+            timings = []
+            with conn.cursor() as cur:
+                for p in prefixes:
+                    t0 = time.perf_counter()
+                    cur.execute(SQL, (p + "%", args.limit))
+                    cur.fetchall()
+                    timings.append((time.perf_counter() - t0) * 1000.0)
+            _report("sql", timings)
+
+        sample = random.choice(prefixes)
+        print(f"\nExample '{sample}':")
+        for row in index.suggest(sample, 5):
+            print(f"  {row[3]} ({row[1]})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark JSON serialization CPU per endpoint (app/api/responses.py).
+
+For each payload, times the CPU spent turning it into response bytes:
+
+    fastapi   jsonable_encoder() + JSONResponse.render(), the default path
+              for a handler returning a dict
+    stdlib    responses.dumps() without orjson (json.dumps + json_default)
+    orjson    responses.dumps() with orjson (skipped if not installed)
+    ndjson    one dumps() per list item, as the streaming mode does
+
+Payloads are synthetic by default, shaped and sized like the real endpoints
+(societies: 1,291 rows; whc-cities: 254; wh-sites: 20; ecoregions/geom:
+one bioregion's polygons). With --url, they are fetched from a running API
+instead.
+
+Usage:
+    python scripts/bench_json_render.py [--repeat 20]
+    python scripts/bench_json_render.py --url http://localhost:8000 --bioregion AT7
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from app.api import responses  # noqa: E402
+
+# Which list in each payload the NDJSON mode streams
+LIST_KEYS = {"societies": "societies", "whc-cities": "cities", "wh-sites": "sites",
+             "eco/ecoregions/geom": "features"}
+
+
+def _word(rng, n=8):
+    return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, n))).title()
+
+
+def synthetic_payloads():
+    rng = random.Random(0)
+    societies = [{
+        "id": f"Aa{i}", "name": _word(rng, 12), "region": _word(rng), "bioregion_id": f"AT{rng.randint(1, 99)}",
+        "bioregion_name": f"{_word(rng)} {_word(rng)}", "lon": rng.uniform(-180, 180), "lat": rng.uniform(-60, 75),
+        "subsistence": rng.choice(["Hunting", "Gathering", "Fishing", "Pastoralism", "Agriculture"]),
+        "eco_id": rng.randint(1, 847), "eco_name": f"{_word(rng)} {_word(rng)} forests",
+        "realm": _word(rng), "cluster_id": rng.randint(0, 19),
+        "religion": rng.choice(["Absent", "Otiose", "Active, supporting morality", None]),
+    } for i in range(1291)]
+    cities = [{
+        "id": i, "city": _word(rng), "country": _word(rng), "region": _word(rng),
+        # Decimal, as numeric columns come back from psycopg
+        "location": {"type": "Point", "coordinates": [Decimal(f"{rng.uniform(-180, 180):.6f}"),
+                                                      Decimal(f"{rng.uniform(-60, 75):.6f}")]},
+        "env_cluster": rng.randint(0, 9), "env_cluster_label": f"{_word(rng)} {_word(rng)}",
+    } for i in range(254)]
+    sites = [{
+        "id_no": i, "name_en": _word(rng, 20), "states_name_en": _word(rng),
+        "short_description_en": " ".join(_word(rng) for _ in range(90)),
+        "location": {"type": "Point", "coordinates": [rng.uniform(-180, 180), rng.uniform(-60, 75)]},
+        "cluster_label": _word(rng),
+    } for i in range(20)]
+    features = []
+    for i in range(12):
+        ring = [[rng.uniform(-10, 10), rng.uniform(-10, 10)] for _ in range(4000)]
+        ring.append(ring[0])
+        features.append({"type": "Feature", "properties": {"id": i, "name": _word(rng)},
+                         "geometry": {"type": "MultiPolygon", "coordinates": [[ring]]}})
+    return {
+        "societies": {"count": len(societies), "bioregions": [], "subsistence_categories": [],
+                      "religion_categories": [], "variable_info": {}, "societies": societies},
+        "whc-cities": {"count": len(cities), "cities": cities},
+        "wh-sites": {"count": len(sites), "sites": sites},
+        "eco/ecoregions/geom": {"type": "FeatureCollection", "features": features},
+    }
+
+
+def fetched_payloads(url, bioregion):
+    import httpx
+
+    out = {}
+    with httpx.Client(base_url=url.rstrip("/"), timeout=120) as client:
+        for name in LIST_KEYS:
+            params = {"bioregion": bioregion} if name == "eco/ecoregions/geom" else None
+            resp = client.get(f"/api/{name}", params=params)
+            resp.raise_for_status()
+            out[name] = resp.json()
+    return out
+
+
+def _cpu_ms(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.process_time()
+        fn()
+        best = min(best, (time.process_time() - t0) * 1000.0)
+    return best
+
+
+def _stdlib_dumps(obj):
+    return json.dumps(obj, default=responses.json_default, ensure_ascii=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", help="Fetch payloads from this running API instead of generating them")
+    ap.add_argument("--bioregion", default="AT7", help="Bioregion for eco/ecoregions/geom with --url")
+    ap.add_argument("--repeat", type=int, default=20, help="Runs per measurement (best is reported)")
+    args = ap.parse_args()
+
+    payloads = fetched_payloads(args.url, args.bioregion) if args.url else synthetic_payloads()
+    orjson_dumps = responses.dumps if responses.orjson is not None else None
+
+    print(f"{'endpoint':22s} {'bytes':>10s} {'fastapi ms':>11s} {'stdlib ms':>10s} "
+          f"{'orjson ms':>10s} {'ndjson ms':>10s} {'speed-up':>9s}")
+    for name, payload in payloads.items():
+        size = len(responses.dumps(payload))
+        fastapi_ms = _cpu_ms(lambda: JSONResponse(jsonable_encoder(payload)).body, args.repeat)
+        stdlib_ms = _cpu_ms(lambda: _stdlib_dumps(payload), args.repeat)
+        fast_ms = _cpu_ms(lambda: orjson_dumps(payload), args.repeat) if orjson_dumps else None
+        items = payload.get(LIST_KEYS[name], [])
+        ndjson_ms = _cpu_ms(lambda: [responses.dumps(item) for item in items], args.repeat)
+        best = fast_ms if fast_ms is not None else stdlib_ms
+        print(f"{name:22s} {size:10,d} {fastapi_ms:11.2f} {stdlib_ms:10.2f} "
+              f"{(f'{fast_ms:.2f}' if fast_ms is not None else 'n/a'):>10s} {ndjson_ms:10.2f} "
+              f"{fastapi_ms / best if best else float('inf'):8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
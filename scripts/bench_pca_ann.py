@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark the in-process PCA neighbour index (app/db/pca_index.py).
+
+For a random sample of basins, compares IVF top-k against exact brute-force
+search over all vectors and reports recall@k and per-query latency for a
+range of nprobe values, plus the latency of the exact search itself.
+
+Uses the index snapshot (EDOP_PCA_INDEX_SNAPSHOT) when present; otherwise
+builds one from output/basin08_pca_coords.npy keyed by row number (no DB
+needed, ids don't matter for recall).
+
+Usage:
+    python scripts/bench_pca_ann.py [--k 10] [--queries 500] [--nprobe 4,8,16,24,32,64]
+        [--lists N] [--coords PATH]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from app.db.pca_index import N_COMPONENTS, PcaIndex  # noqa: E402
+from app.settings import settings  # noqa: E402
+
+
+def _pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100.0 * len(values)))]
+
+
+def load_index(args) -> PcaIndex:
+    snapshot = Path(settings.PCA_INDEX_SNAPSHOT)
+    t0 = time.perf_counter()
+    if snapshot.exists() and args.lists is None:
+        index = PcaIndex.from_snapshot(snapshot)
+        print(f"Loaded snapshot {snapshot} in {time.perf_counter() - t0:.2f}s")
+    else:
+        coords = np.load(args.coords, mmap_mode="r")[:, :N_COMPONENTS]
+        vectors = np.asarray(coords, dtype=np.float32)
+        index = PcaIndex.build(np.arange(len(vectors)), vectors, args.lists or settings.PCA_IVF_LISTS)
+        print(f"Built index from {args.coords} in {time.perf_counter() - t0:.1f}s")
+    print(f"{len(index)} vectors x {index.vectors.shape[1]} dims, {len(index.centroids)} lists\n")
+    return index
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("--nprobe", default="4,8,16,24,32,64", help="Comma-separated nprobe values")
+    ap.add_argument("--lists", type=int, help="Build a fresh index with this many lists (ignores the snapshot)")
+    ap.add_argument("--coords", default=settings.PCA_COORDS)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    index = load_index(args)
+    rng = np.random.default_rng(args.seed)
+    query_ids = index.ids[rng.choice(len(index), min(args.queries, len(index)), replace=False)]
+
+    exact, exact_ms = {}, []
+    for bid in query_ids:
+        q = index.vector(int(bid))
+        t0 = time.perf_counter()
+        ids, _ = index.exact(q, args.k, exclude=int(bid))
+        exact_ms.append((time.perf_counter() - t0) * 1000.0)
+        exact[int(bid)] = set(ids.tolist())
+    print(f"{'exact':>10s}  recall@{args.k}=1.0000  p50={_pct(exact_ms, 50):.3f}ms  p99={_pct(exact_ms, 99):.3f}ms")
+
+    for nprobe in (int(v) for v in args.nprobe.split(",")):
+        hits, latencies = 0, []
+        for bid in query_ids:
+            t0 = time.perf_counter()
+            ids, _ = index.neighbours(int(bid), args.k, nprobe=nprobe)
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+            hits += len(exact[int(bid)] & set(ids.tolist()))
+        recall = hits / (len(query_ids) * args.k)
+        print(f"{'nprobe=' + str(nprobe):>10s}  recall@{args.k}={recall:.4f}  "
+              f"p50={_pct(latencies, 50):.3f}ms  p99={_pct(latencies, 99):.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
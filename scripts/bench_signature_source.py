@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark the signature lookup against v_basin08_persist vs mv_basin08_persist.
+
+Runs the same spatial signature query app/db/signature.py uses against the
+live view (ST_Area(geom::geography) ordering, lookup joins and pnv_shares per
+row) and the materialized view (precomputed area_km2, GiST on geom), for a
+set of WH city coordinates, and reports per-source latency percentiles plus
+the server-side execution time from EXPLAIN ANALYZE.
+
+Prerequisites:
+- sql/mv_basin08_persist.sql run (or scripts/refresh_basin08_persist.py --create)
+
+Usage:
+    python scripts/bench_signature_source.py [--rounds 20] [--geom]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+
+import psycopg
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# WH cities used throughout the pilot logs
+POINTS = [
+    ("Timbuktu", 16.76618535, -3.00777252),
+    ("Khiva", 41.3783, 60.3639),
+    ("Bruges", 51.2093, 3.2247),
+    ("Cusco", -13.5167, -71.9781),
+    ("Kyoto", 35.0116, 135.7681),
+    ("Venice", 45.4408, 12.3155),
+]
+
+COLUMNS = "id, zone_name, pnv_majority, pnv_shares, temp_yr, precip_yr, biome, ecoregion"
+
+QUERY = """
+SELECT {columns}{geom}
+FROM public.{source}
+WHERE ST_Covers(geom, ST_SetSRID(ST_MakePoint(%(lon)s, %(lat)s), 4326))
+ORDER BY {order} ASC
+LIMIT 1
+"""
+
+SOURCES = {
+    "v_basin08_persist": "ST_Area(geom::geography)",
+    "mv_basin08_persist": "area_km2",
+}
+
+
+def get_db_connection():
+    """Create database connection from environment variables."""
+    return psycopg.connect(
+        host=os.environ.get("PGHOST", "localhost"),
+        port=os.environ.get("PGPORT", "5435"),
+        dbname=os.environ.get("PGDATABASE", "edop"),
+        user=os.environ.get("PGUSER", "postgres"),
+        password=os.environ.get("PGPASSWORD", ""),
+    )
+
+
+def _percentile(sorted_vals, q):
+    idx = min(len(sorted_vals) - 1, int(round(q * (len(sorted_vals) - 1))))
+    return sorted_vals[idx]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rounds", type=int, default=20, help="Passes over the point list per source")
+    ap.add_argument("--geom", action="store_true", help="Include ST_AsGeoJSON(geom) as the API does")
+    args = ap.parse_args()
+
+    geom = ",\n  ST_AsGeoJSON(geom, 6) AS geom_geojson" if args.geom else ""
+    results = {}
+
+    with get_db_connection() as conn:
+        for source, order in SOURCES.items():
+            sql = QUERY.format(columns=COLUMNS, geom=geom, source=source, order=order)
+
+            # Same answer from both sources?
+            ids = [conn.execute(sql, {"lat": lat, "lon": lon}).fetchone() for _, lat, lon in POINTS]
+            ids = [row[0] if row else None for row in ids]
+
+            timings = []
+            for _ in range(args.rounds):
+                for _, lat, lon in POINTS:
+                    t0 = time.perf_counter()
+                    conn.execute(sql, {"lat": lat, "lon": lon}).fetchall()
+                    timings.append((time.perf_counter() - t0) * 1000.0)
+            timings.sort()
+
+            exec_ms = []
+            for _, lat, lon in POINTS:
+                plan = conn.execute("EXPLAIN (ANALYZE, FORMAT JSON) " + sql, {"lat": lat, "lon": lon}).fetchone()[0]
+                exec_ms.append(plan[0]["Execution Time"])
+
+            results[source] = {
+                "basin_ids": ids,
+                "n": len(timings),
+                "p50_ms": round(_percentile(timings, 0.50), 2),
+                "p95_ms": round(_percentile(timings, 0.95), 2),
+                "mean_ms": round(statistics.mean(timings), 2),
+                "server_exec_ms": round(statistics.mean(exec_ms), 2),
+            }
+            print(f"{source:20s} p50={results[source]['p50_ms']}ms p95={results[source]['p95_ms']}ms "
+                  f"server={results[source]['server_exec_ms']}ms")
+
+    view, mv = results["v_basin08_persist"], results["mv_basin08_persist"]
+    if view["basin_ids"] != mv["basin_ids"]:
+        print("WARNING: sources disagree on basin ids:", json.dumps({k: v["basin_ids"] for k, v in results.items()}))
+    print(f"\nSpeedup (p50): {view['p50_ms'] / mv['p50_ms']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
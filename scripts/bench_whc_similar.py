@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Benchmark /api/whc-similar-env-by-coord: two-query SQL vs the cached WH city block.
+
+For a random sample of basins with PCA vectors, runs the previous SQL path
+(percentile stats CTE + PERCENT_RANK ranking CTE, each a basin08_pca x
+wh_cities join) and the app/db/whc_vectors.py path (source vector lookup +
+one numpy pass over the cached block), checks that dist_stats and the ranked
+cities agree, and reports p50/p95 latency for both.
+
+Usage:
+    python scripts/bench_whc_similar.py [--basins 200] [--limit 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import psycopg
+from dotenv import load_dotenv
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from app.db import whc_vectors  # noqa: E402
+
+load_dotenv()
+
+STATS_SQL = """
+    WITH whc_basin_distances AS (
+        SELECT p1.pca <-> p2.pca AS distance
+        FROM basin08_pca p1, basin08_pca p2
+        JOIN gaz.wh_cities c ON c.basin_id = p2.basin_id
+        WHERE p1.basin_id = %s
+          AND p2.basin_id != %s
+          AND c.basin_id IS NOT NULL
+    )
+    SELECT
+        MIN(distance),
+        PERCENTILE_CONT(0.25) WITHIN GROUP (ORDER BY distance),
+        PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY distance),
+        PERCENTILE_CONT(0.75) WITHIN GROUP (ORDER BY distance),
+        MAX(distance),
+        COUNT(*)
+    FROM whc_basin_distances
+"""
+
+RANK_SQL = """
+    WITH whc_basin_distances AS (
+        SELECT
+            c.id as city_id,
+            p1.pca <-> p2.pca AS distance
+        FROM basin08_pca p1, basin08_pca p2
+        JOIN gaz.wh_cities c ON c.basin_id = p2.basin_id
+        WHERE p1.basin_id = %s
+          AND p2.basin_id != %s
+          AND c.basin_id IS NOT NULL
+    ),
+    ranked AS (
+        SELECT city_id, distance, PERCENT_RANK() OVER (ORDER BY distance) as pct_rank
+        FROM whc_basin_distances
+    )
+    SELECT r.city_id, ROUND(r.distance::numeric, 4), ROUND((r.pct_rank * 100)::numeric, 1)
+    FROM ranked r
+    ORDER BY r.distance ASC
+    LIMIT %s
+"""
+
+
+def get_db_connection():
+    """Create database connection from environment variables."""
+    return psycopg.connect(
+        host=os.environ.get("PGHOST", "localhost"),
+        port=os.environ.get("PGPORT", "5435"),
+        dbname=os.environ.get("PGDATABASE", "edop"),
+        user=os.environ.get("PGUSER", "postgres"),
+        password=os.environ.get("PGPASSWORD", ""),
+    )
+
+
+def _percentile(sorted_vals, q):
+    idx = min(len(sorted_vals) - 1, int(round(q * (len(sorted_vals) - 1))))
+    return sorted_vals[idx]
+
+
+def run_sql(conn, basin_id, limit):
+    with conn.cursor() as cur:
+        cur.execute(STATS_SQL, (basin_id, basin_id))
+        stats_row = cur.fetchone()
+        cur.execute(RANK_SQL, (basin_id, basin_id, limit))
+        ranked = [(r[0], float(r[1]), float(r[2])) for r in cur.fetchall()]
+    return stats_row, ranked
+
+
+def run_block(conn, basin_id, limit):
+    vec = whc_vectors.source_vector(conn, basin_id)
+    dist_stats, results = whc_vectors.get_block(conn).rank(basin_id, vec, limit)
+    return dist_stats, [(r["id"], r["distance"], r["percentile"]) for r in results]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--basins", type=int, default=200, help="Random source basins to query")
+    ap.add_argument("--limit", type=int, default=5)
+    args = ap.parse_args()
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT basin_id FROM basin08_pca ORDER BY random() LIMIT %s", (args.basins,))
+            basin_ids = [r[0] for r in cur.fetchall()]
+
+        t0 = time.perf_counter()
+        block = whc_vectors.get_block(conn)
+        print(f"Loaded WH city block ({len(block)} cities) in {(time.perf_counter() - t0) * 1000:.0f} ms\n")
+
+        timings = {"sql": [], "block": []}
+        mismatches = 0
+        for basin_id in basin_ids:
+            t0 = time.perf_counter()
+            stats_row, sql_ranked = run_sql(conn, basin_id, args.limit)
+            timings["sql"].append((time.perf_counter() - t0) * 1000.0)
+
+            t0 = time.perf_counter()
+            dist_stats, block_ranked = run_block(conn, basin_id, args.limit)
+            timings["block"].append((time.perf_counter() - t0) * 1000.0)
+
+            same_stats = int(stats_row[5] or 0) == dist_stats["count"] and (
+                stats_row[2] is None or abs(float(stats_row[2]) - dist_stats["median"]) < 1e-3)
+            same_rank = [r[0] for r in sql_ranked] == [r[0] for r in block_ranked] and all(
+                abs(a[1] - b[1]) < 1e-3 and abs(a[2] - b[2]) < 0.15 for a, b in zip(sql_ranked, block_ranked))
+            if not (same_stats and same_rank):
+                mismatches += 1
+                if mismatches <= 5:
+                    print(f"  mismatch basin {basin_id}: sql={sql_ranked} block={block_ranked}")
+
+    print(f"{'path':6s} {'n':>5s} {'p50 ms':>9s} {'p95 ms':>9s} {'max ms':>9s}")
+    for name, vals in timings.items():
+        vals.sort()
+        print(f"{name:6s} {len(vals):5d} {_percentile(vals, 0.5):9.2f} {_percentile(vals, 0.95):9.2f} {vals[-1]:9.2f}")
+    p95_sql = _percentile(sorted(timings["sql"]), 0.95)
+    p95_block = _percentile(sorted(timings["block"]), 0.95)
+    print(f"\np95 speedup: {p95_sql / p95_block:.1f}x; result mismatches: {mismatches}/{len(basin_ids)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Precompute the top-K environmental neighbours of every basin in basin08_pca.
+
+Exact L2 top-K over the 50-dim PCA vectors (same distance as pgvector `<->`),
+computed with blocked matrix multiplication: each worker takes a block of
+query rows, streams the corpus in chunks through one matmul per chunk, and
+keeps a running top-K, so memory stays bounded regardless of corpus size.
+Final distances are recomputed exactly for the selected neighbours.
+
+Outputs (see docs/basin_neighbours.md for runtime and memory ceilings):
+- <out>/neighbour_ids.npy   int32   (max basin id + 1, K), row = basin08.id, -1 = none
+- <out>/distances.npy       float32 (max basin id + 1, K), nearest first
+- <out>/meta.json           k, basin count, build time
+  read by app/db/basin_neighbours.py via np.load(mmap_mode="r")
+- optionally (--table) public.basin08_neighbours (basin_id PK, neighbour_ids int[],
+  distances real[]) written with COPY
+
+Vectors are read from the PCA index snapshot (EDOP_PCA_INDEX_SNAPSHOT) when
+present, otherwise from output/basin08_pca_coords.npy keyed via basin08_pca.
+
+Usage:
+    python scripts/build_basin_neighbours.py [--k 50] [--workers N] [--block 512]
+        [--chunk 16384] [--out DIR] [--table] [--limit N]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import psycopg
+from dotenv import load_dotenv
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from app.db.pca_index import PcaIndex  # noqa: E402
+from app.settings import settings  # noqa: E402
+
+load_dotenv()
+
+TABLE = "public.basin08_neighbours"
+
+
+def get_db_connection():
+    """Create database connection from environment variables."""
+    return psycopg.connect(
+        host=os.environ.get("PGHOST", "localhost"),
+        port=os.environ.get("PGPORT", "5435"),
+        dbname=os.environ.get("PGDATABASE", "edop"),
+        user=os.environ.get("PGUSER", "postgres"),
+        password=os.environ.get("PGPASSWORD", ""),
+    )
+
+
+def load_vectors():
+    """(basin ids, float32 vectors) for every basin with a PCA vector."""
+    snapshot = Path(settings.PCA_INDEX_SNAPSHOT)
+    if snapshot.exists():
+        index = PcaIndex.from_snapshot(snapshot)
+        print(f"Vectors from snapshot {snapshot}")
+    else:
+        with get_db_connection() as conn:
+            index = PcaIndex.from_npy(conn, Path(settings.PCA_COORDS), Path(settings.PCA_BASIN_IDS), 1)
+        print(f"Vectors from {settings.PCA_COORDS}")
+    order = np.argsort(index.ids)
+    return index.ids[order], index.vectors[order]
+
+
+def top_k_block(x: np.ndarray, norms: np.ndarray, q0: int, q1: int, k: int, chunk: int):
+    """Exact top-k (row indices, distances) of rows q0:q1 against all rows of x, self excluded."""
+    q = x[q0:q1]
+    b = len(q)
+    best_d = np.full((b, k), np.inf, dtype=np.float32)
+    best_i = np.full((b, k), -1, dtype=np.int64)
+
+    for c0 in range(0, len(x), chunk):
+        c1 = min(c0 + chunk, len(x))
+        # ||c||^2 - 2 q.c ; ||q||^2 is constant per row and doesn't change the ranking
+        d2 = norms[c0:c1][None, :] - 2.0 * (q @ x[c0:c1].T)
+        overlap = np.arange(max(q0, c0), min(q1, c1))
+        d2[overlap - q0, overlap - c0] = np.inf
+
+        kk = min(k, c1 - c0)
+        cand = np.argpartition(d2, kk - 1, axis=1)[:, :kk] if kk < c1 - c0 else np.broadcast_to(np.arange(c1 - c0), (b, kk))
+        all_d = np.concatenate([best_d, np.take_along_axis(d2, cand, 1)], axis=1)
+        all_i = np.concatenate([best_i, cand + c0], axis=1)
+        sel = np.argpartition(all_d, k - 1, axis=1)[:, :k]
+        best_d = np.take_along_axis(all_d, sel, 1)
+        best_i = np.take_along_axis(all_i, sel, 1)
+
+    # Exact distances for the winners (the expansion above loses precision for near pairs)
+    valid = (best_i >= 0) & np.isfinite(best_d)
+    best_i[~valid] = -1
+    diff = x[np.where(valid, best_i, 0)] - q[:, None, :]
+    dist = np.sqrt((diff * diff).sum(2, dtype=np.float64)).astype(np.float32)
+    dist[~valid] = np.inf
+    order = np.argsort(dist, axis=1, kind="stable")
+    return q0, np.take_along_axis(best_i, order, 1), np.take_along_axis(dist, order, 1)
+
+
+def build(ids: np.ndarray, x: np.ndarray, k: int, workers: int, block: int, chunk: int):
+    """(neighbour_ids, distances) arrays indexed by basin id."""
+    x = np.ascontiguousarray(x, dtype=np.float32)
+    norms = (x * x).sum(1)
+    n_rows = int(ids.max()) + 1
+    out_ids = np.full((n_rows, k), -1, dtype=np.int32)
+    out_dist = np.full((n_rows, k), np.inf, dtype=np.float32)
+
+    done = 0
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(top_k_block, x, norms, q0, min(q0 + block, len(x)), k, chunk)
+                   for q0 in range(0, len(x), block)]
+        for fut in futures:
+            q0, idx, dist = fut.result()
+            basin_rows = ids[q0:q0 + len(idx)]
+            out_ids[basin_rows] = np.where(idx >= 0, ids[np.maximum(idx, 0)], -1)
+            out_dist[basin_rows] = dist
+            done += len(idx)
+            if done % (block * 50) < block or done == len(x):
+                rate = done / (time.perf_counter() - t0)
+                print(f"  {done}/{len(x)} basins ({rate:.0f}/s)")
+    return out_ids, out_dist
+
+
+def write_npy(out_dir: Path, out_ids: np.ndarray, out_dist: np.ndarray, meta: dict) -> None:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for name, arr in (("neighbour_ids.npy", out_ids), ("distances.npy", out_dist)):
+        tmp = out_dir / (name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, arr)
+        tmp.replace(out_dir / name)
+    # meta.json last: readers treat it as the marker of a complete build
+    tmp = out_dir / "meta.json.tmp"
+    tmp.write_text(json.dumps(meta, indent=1), encoding="utf-8")
+    tmp.replace(out_dir / "meta.json")
+
+
+def write_table(ids: np.ndarray, out_ids: np.ndarray, out_dist: np.ndarray) -> None:
+    """COPY into a fresh table and swap it in, so readers never see a partial load."""
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {TABLE}_new")
+            cur.execute(f"CREATE TABLE {TABLE}_new (basin_id integer, neighbour_ids integer[], distances real[])")
+            with cur.copy(f"COPY {TABLE}_new (basin_id, neighbour_ids, distances) FROM STDIN") as copy:
+                for bid in ids.tolist():
+                    row_ids, row_dist = out_ids[bid], out_dist[bid]
+                    keep = row_ids >= 0
+                    copy.write_row((bid, row_ids[keep].tolist(), [round(float(d), 6) for d in row_dist[keep]]))
+            cur.execute(f"ALTER TABLE {TABLE}_new ADD PRIMARY KEY (basin_id)")
+            cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+            cur.execute(f"ALTER TABLE {TABLE}_new RENAME TO basin08_neighbours")
+            cur.execute("ALTER INDEX basin08_neighbours_new_pkey RENAME TO basin08_neighbours_pkey")
+            cur.execute(f"ANALYZE {TABLE}")
+        conn.commit()
+        size = conn.execute(f"SELECT pg_size_pretty(pg_total_relation_size('{TABLE}'))").fetchone()[0]
+    print(f"Wrote {TABLE} ({len(ids)} rows, {size})")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--k", type=int, default=50)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--block", type=int, default=512, help="Query rows per task")
+    ap.add_argument("--chunk", type=int, default=16384, help="Corpus rows per matmul")
+    ap.add_argument("--out", default=settings.BASIN_NEIGHBOURS_DIR)
+    ap.add_argument("--table", action="store_true", help=f"Also COPY into {TABLE}")
+    ap.add_argument("--limit", type=int, help="Only the first N basins (timing runs)")
+    args = ap.parse_args()
+
+    ids, x = load_vectors()
+    if args.limit:
+        ids, x = ids[:args.limit], x[:args.limit]
+    print(f"{len(ids)} basins x {x.shape[1]} dims, K={args.k}, {args.workers} workers, "
+          f"block {args.block} x chunk {args.chunk}")
+
+    t0 = time.perf_counter()
+    out_ids, out_dist = build(ids, x, args.k, args.workers, args.block, args.chunk)
+    elapsed = time.perf_counter() - t0
+    print(f"Computed in {elapsed:.1f}s")
+
+    meta = {
+        "k": args.k,
+        "basins": len(ids),
+        "seconds": round(elapsed, 1),
+        "built_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    out_dir = Path(args.out)
+    write_npy(out_dir, out_ids, out_dist, meta)
+    print(f"Wrote {out_dir} ({(out_ids.nbytes + out_dist.nbytes) / 2**20:.0f} MB)")
+
+    if args.table:
+        write_table(ids, out_ids, out_dist)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Export the ecoregion hierarchy layers to static, pre-compressed GeoJSON.
+
+Writes, under EDOP_ECO_GEOJSON_DIR (default output/eco_geojson):
+- realms.geojson                      all realms
+- subrealms/<realm>.geojson           subrealms per realm (biogeorelm)
+- bioregions/<subrealm_id>.geojson    bioregions per subrealm
+- ecoregions/<bioregion>.geojson      ecoregions per bioregion
+- subrealms.geojson, bioregions.geojson, ecoregions.geojson (whole levels)
+each with .gz and (if the brotli package is installed) .br variants, plus
+manifest.json mapping API keys to files, sizes and sha256 content hashes.
+
+Feature properties match the /api/eco/*/geom endpoints, which serve these
+files (app/api/eco_static.py) instead of querying PostGIS when a build exists.
+Geometries are simplified with ST_SimplifyPreserveTopology at a per-level
+tolerance in degrees (override with --tolerance).
+
+Usage:
+    python scripts/build_eco_geojson.py [--out DIR] [--tolerance DEG] [--precision N]
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import psycopg
+from dotenv import load_dotenv
+
+try:
+    import brotli  # type: ignore
+except ImportError:  # optional: gzip-only build
+    brotli = None
+
+load_dotenv()
+
+# level -> query, parent column, default simplification tolerance (degrees).
+# Coarser levels are only drawn at small scales, so they tolerate more simplification.
+LEVELS = {
+    "realms": {
+        "sql": """
+            SELECT realm, biogeorelm, NULL,
+                   ST_AsGeoJSON(ST_SimplifyPreserveTopology(geom, %(tol)s), %(precision)s)
+            FROM gaz."Realm2023"
+            ORDER BY realm
+        """,
+        "properties": lambda r: {"name": r[0], "id": r[1]},
+        "tolerance": 0.05,
+    },
+    "subrealms": {
+        "sql": """
+            SELECT subrealmid, subrealm_n, biogeorelm,
+                   ST_AsGeoJSON(ST_SimplifyPreserveTopology(geom, %(tol)s), %(precision)s)
+            FROM gaz."Subrealm2023"
+            ORDER BY subrealm_n
+        """,
+        "properties": lambda r: {"id": r[0], "name": r[1]},
+        "tolerance": 0.02,
+    },
+    "bioregions": {
+        "sql": """
+            SELECT b.bioregions, m.title, b.subrealm_id,
+                   ST_AsGeoJSON(ST_SimplifyPreserveTopology(b.geom, %(tol)s), %(precision)s)
+            FROM gaz."Bioregions2023" b
+            LEFT JOIN gaz.bioregion_meta m ON m.bioregion_id = b.bioregions
+            ORDER BY b.bioregions
+        """,
+        "properties": lambda r: {"id": r[0], "name": r[1] if r[1] else r[0], "code": r[0]},
+        "tolerance": 0.01,
+    },
+    "ecoregions": {
+        "sql": """
+            SELECT eco_id, eco_name, bioregion,
+                   ST_AsGeoJSON(ST_SimplifyPreserveTopology(geom, %(tol)s), %(precision)s)
+            FROM gaz."Ecoregions2017"
+            ORDER BY eco_name
+        """,
+        "properties": lambda r: {"id": r[0], "name": r[1]},
+        "tolerance": 0.005,
+    },
+}
+
+
+def get_db_connection():
+    """Create database connection from environment variables."""
+    return psycopg.connect(
+        host=os.environ.get("PGHOST", "localhost"),
+        port=os.environ.get("PGPORT", "5435"),
+        dbname=os.environ.get("PGDATABASE", "edop"),
+        user=os.environ.get("PGUSER", "postgres"),
+        password=os.environ.get("PGPASSWORD", ""),
+    )
+
+
+def _safe_name(value) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", str(value)) or "_"
+
+
+def _feature_collection(features) -> bytes:
+    # Geometries arrive as GeoJSON text; splice them in rather than re-parsing
+    parts = []
+    for props, geom in features:
+        parts.append('{"type":"Feature","properties":%s,"geometry":%s}'
+                     % (json.dumps(props, ensure_ascii=False, separators=(",", ":")), geom or "null"))
+    return ('{"type":"FeatureCollection","features":[' + ",".join(parts) + "]}").encode("utf-8")
+
+
+def write_collection(out_dir: Path, rel_path: str, data: bytes) -> dict:
+    """Write raw + compressed variants atomically; return the manifest entry."""
+    path = out_dir / rel_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    variants = {"": data, ".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(data, quality=11)
+
+    for ext, payload in variants.items():
+        tmp = path.with_name(path.name + ext + ".tmp")
+        tmp.write_bytes(payload)
+        tmp.replace(path.with_name(path.name + ext))
+
+    return {
+        "path": rel_path,
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "bytes": len(data),
+        "gzip": len(variants[".gz"]),
+        "br": len(variants[".br"]) if ".br" in variants else None,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--out", default=os.environ.get("EDOP_ECO_GEOJSON_DIR", "output/eco_geojson"))
+    ap.add_argument("--tolerance", type=float, help="Override every level's simplification tolerance (degrees)")
+    ap.add_argument("--precision", type=int, default=5, help="Coordinate decimals (5 ~ 1 m)")
+    args = ap.parse_args()
+
+    out_dir = Path(args.out)
+    files = {}
+    tolerances = {}
+    t0 = time.perf_counter()
+
+    with get_db_connection() as conn:
+        for level, spec in LEVELS.items():
+            tol = args.tolerance if args.tolerance is not None else spec["tolerance"]
+            tolerances[level] = tol
+            with conn.cursor() as cur:
+                cur.execute(spec["sql"], {"tol": tol, "precision": args.precision})
+                rows = cur.fetchall()
+
+            by_parent = {}
+            for r in rows:
+                by_parent.setdefault(r[2], []).append((spec["properties"](r), r[3]))
+
+            all_features = [f for group in by_parent.values() for f in group]
+            files[level] = write_collection(out_dir, f"{level}.geojson", _feature_collection(all_features))
+
+            if level != "realms":
+                for parent, features in by_parent.items():
+                    if parent is None:
+                        continue
+                    key = f"{level}/{parent}"
+                    files[key] = write_collection(out_dir, f"{level}/{_safe_name(parent)}.geojson",
+                                                  _feature_collection(features))
+
+            e = files[level]
+            print(f"{level:11s} {len(rows):5d} features, {len(by_parent):4d} parents, "
+                  f"{e['bytes'] / 2**20:.1f} MB raw / {e['gzip'] / 2**20:.1f} MB gz"
+                  + (f" / {e['br'] / 2**20:.1f} MB br" if e["br"] else ""))
+
+    manifest = {
+        "built_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "tolerance": tolerances,
+        "precision": args.precision,
+        "files": files,
+    }
+    tmp = out_dir / "manifest.json.tmp"
+    tmp.write_text(json.dumps(manifest, indent=1, ensure_ascii=False), encoding="utf-8")
+    tmp.replace(out_dir / "manifest.json")
+    print(f"\nWrote {len(files)} collections + manifest to {out_dir} in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Bump (or list) data versions in public.edop_data_versions.
+
+The API derives ETag / Last-Modified for batch-loaded endpoints from these
+versions (app/api/http_cache.py) and notices a bump within
+EDOP_DATA_VERSIONS_POLL_S. The populate/cluster scripts bump their family
+themselves; run this after changing a family's tables any other way (e.g.
+reloading the eco layers from sql/, or a manual UPDATE).
+
+Families: eco, eco_wikitext, whc, basin_clusters, societies
+(see sql/edop_data_versions.sql for the tables behind each).
+
+Usage:
+    python scripts/bump_data_version.py eco --note "reloaded Ecoregions2017"
+    python scripts/bump_data_version.py whc basin_clusters
+    python scripts/bump_data_version.py --list
+    python scripts/bump_data_version.py --create
+"""
+
+import argparse
+import os
+
+import psycopg
+from dotenv import load_dotenv
+
+from edop_app import REPO_ROOT
+from app.db.data_versions import FAMILIES, bump  # noqa: E402
+
+load_dotenv()
+
+SQL_FILE = REPO_ROOT / "sql" / "edop_data_versions.sql"
+
+
+def get_db_connection():
+    """Create database connection from environment variables."""
+    return psycopg.connect(
+        host=os.environ.get("PGHOST", "localhost"),
+        port=os.environ.get("PGPORT", "5435"),
+        dbname=os.environ.get("PGDATABASE", "edop"),
+        user=os.environ.get("PGUSER", "postgres"),
+        password=os.environ.get("PGPASSWORD", ""),
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("families", nargs="*", metavar="family", help=f"Families to bump: {', '.join(FAMILIES)}")
+    ap.add_argument("--note", help="Stored with the new version (default: bump_data_version.py)")
+    ap.add_argument("--list", action="store_true", help="Print the current versions")
+    ap.add_argument("--create", action="store_true", help=f"Create and seed the table from {SQL_FILE.name}")
+    args = ap.parse_args()
+    if not (args.families or args.list or args.create):
+        ap.error("give at least one family, --list or --create")
+    unknown = [f for f in args.families if f not in FAMILIES]
+    if unknown:
+        ap.error(f"unknown families {unknown}; expected from {', '.join(FAMILIES)}")
+
+    with get_db_connection() as conn:
+        if args.create:
+            print(f"Creating public.edop_data_versions from {SQL_FILE}...")
+            conn.execute(SQL_FILE.read_text(encoding="utf-8"))
+        for family in args.families:
+            version = bump(conn, family, args.note or "bump_data_version.py")
+            print(f"{family}: now version {version}")
+        conn.commit()
+
+        if args.list:
+            for family, version, updated_at, note in conn.execute(
+                "SELECT family, version, updated_at, note FROM public.edop_data_versions ORDER BY family"
+            ).fetchall():
+                print(f"  {family:16s} v{version:<5d} {updated_at:%Y-%m-%d %H:%M:%S %Z}  {note or ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""Shared setup for the scripts that use the app package.
+
+Importing this puts the repository root on sys.path (a script run as
+`python scripts/<name>.py` only sees scripts/), so `from app...` works after it.
+
+bump_data_version() is what the batch scripts call before their final commit
+to publish a new data version (app/db/data_versions.py).
+"""
+import sys
+from pathlib import Path
+from typing import Optional
+
+import psycopg
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from app.db.data_versions import bump  # noqa: E402
+
+
+def bump_data_version(conn: psycopg.Connection, family: str, note: Optional[str] = None) -> Optional[int]:
+    """Bump family's version in a savepoint of the caller's transaction.
+
+    On a database without public.edop_data_versions (sql/edop_data_versions.sql
+    not applied) only the savepoint is rolled back: a warning is printed and the
+    caller's writes still commit. Returns the new version, or None.
+    """
+    try:
+        with conn.transaction():
+            return bump(conn, family, note)
+    except psycopg.errors.UndefinedTable:
+        print(f"WARNING: public.edop_data_versions does not exist (apply sql/edop_data_versions.sql); "
+              f"'{family}' was not bumped, so HTTP caches of its endpoints won't be invalidated",
+              file=sys.stderr)
+        return None
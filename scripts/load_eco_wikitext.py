@@ -12,6 +12,8 @@ from datetime import datetime
 
 import psycopg
 
+from edop_app import bump_data_version
+
 
 def main():
     ap = argparse.ArgumentParser()
@@ -95,6 +97,7 @@ def main():
                 except Exception as e:
                     print(f"Error inserting eco_id={rec['eco_id']}: {e}")
 
+            bump_data_version(conn, "eco_wikitext", "load_eco_wikitext.py")
             conn.commit()
 
     print(f"Inserted {inserted} records into public.eco_wikitext")
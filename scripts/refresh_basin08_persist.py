@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Refresh (or create) the mv_basin08_persist materialized view.
+
+mv_basin08_persist is the precomputed copy of v_basin08_persist that
+app/db/signature.py reads signatures from (see sql/mv_basin08_persist.sql).
+Run this after basin08 or any of the lu_* lookup tables change.
+
+Refresh is CONCURRENTLY by default so the API keeps reading the old rows while
+it runs (needs the unique id index); --blocking takes an exclusive lock but is
+faster. --create (re)builds the view and its indexes from the SQL file.
+
+Usage:
+    python scripts/refresh_basin08_persist.py
+    python scripts/refresh_basin08_persist.py --blocking
+    python scripts/refresh_basin08_persist.py --create
+"""
+
+import argparse
+import os
+import time
+from pathlib import Path
+
+import psycopg
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SQL_FILE = Path(__file__).parent.parent / "sql" / "mv_basin08_persist.sql"
+VIEW = "public.mv_basin08_persist"
+
+
+def get_db_connection():
+    """Create database connection from environment variables."""
+    return psycopg.connect(
+        host=os.environ.get("PGHOST", "localhost"),
+        port=os.environ.get("PGPORT", "5435"),
+        dbname=os.environ.get("PGDATABASE", "edop"),
+        user=os.environ.get("PGUSER", "postgres"),
+        password=os.environ.get("PGPASSWORD", ""),
+        autocommit=True,
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    group = ap.add_mutually_exclusive_group()
+    group.add_argument("--blocking", action="store_true", help="Plain REFRESH (exclusive lock)")
+    group.add_argument("--create", action="store_true", help=f"Drop and rebuild from {SQL_FILE.name}")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    with get_db_connection() as conn:
+        if args.create:
+            print(f"Creating {VIEW} from {SQL_FILE}...")
+            conn.execute(SQL_FILE.read_text(encoding="utf-8"))
+        else:
+            mode = "" if args.blocking else " CONCURRENTLY"
+            print(f"REFRESH MATERIALIZED VIEW{mode} {VIEW}...")
+            conn.execute(f"REFRESH MATERIALIZED VIEW{mode} {VIEW}")
+            conn.execute(f"ANALYZE {VIEW}")
+
+        n = conn.execute(f"SELECT count(*) FROM {VIEW}").fetchone()[0]
+        size = conn.execute(f"SELECT pg_size_pretty(pg_total_relation_size('{VIEW}'))").fetchone()[0]
+
+    print(f"Done in {time.perf_counter() - t0:.1f}s: {n} rows, {size} (incl. indexes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Refresh (or create) the D-PLACE society summary views behind /api/societies.
+
+gaz.mv_dplace_societies is the per-society summary and
+gaz.mv_dplace_society_facets the legend counts built from it (see
+sql/mv_dplace_societies.sql). Run this after any gaz.dplace_* table, the
+eco/bio/realm layers or basin08 cluster assignments change; the API notices
+the new version within EDOP_SOCIETIES_CACHE_TTL_S and re-renders its cached
+response.
+
+Refresh is CONCURRENTLY by default so the API keeps reading the old rows while
+it runs (needs the unique indexes); --blocking takes an exclusive lock but is
+faster. --create (re)builds both views and their indexes from the SQL file.
+
+Usage:
+    python scripts/refresh_dplace_societies.py
+    python scripts/refresh_dplace_societies.py --blocking
+    python scripts/refresh_dplace_societies.py --create
+"""
+
+import argparse
+import os
+import time
+
+import psycopg
+from dotenv import load_dotenv
+
+from edop_app import REPO_ROOT, bump_data_version
+
+load_dotenv()
+
+SQL_FILE = REPO_ROOT / "sql" / "mv_dplace_societies.sql"
+# Facets are computed from the summary, so refresh in this order
+VIEWS = ("gaz.mv_dplace_societies", "gaz.mv_dplace_society_facets")
+
+
+def get_db_connection():
+    """Create database connection from environment variables."""
+    return psycopg.connect(
+        host=os.environ.get("PGHOST", "localhost"),
+        port=os.environ.get("PGPORT", "5435"),
+        dbname=os.environ.get("PGDATABASE", "edop"),
+        user=os.environ.get("PGUSER", "postgres"),
+        password=os.environ.get("PGPASSWORD", ""),
+        autocommit=True,
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    group = ap.add_mutually_exclusive_group()
+    group.add_argument("--blocking", action="store_true", help="Plain REFRESH (exclusive lock)")
+    group.add_argument("--create", action="store_true", help=f"Drop and rebuild from {SQL_FILE.name}")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    with get_db_connection() as conn:
+        if args.create:
+            print(f"Creating {', '.join(VIEWS)} from {SQL_FILE}...")
+            conn.execute(SQL_FILE.read_text(encoding="utf-8"))
+        else:
+            mode = "" if args.blocking else " CONCURRENTLY"
+            for view in VIEWS:
+                print(f"REFRESH MATERIALIZED VIEW{mode} {view}...")
+                conn.execute(f"REFRESH MATERIALIZED VIEW{mode} {view}")
+                conn.execute(f"ANALYZE {view}")
+        bump_data_version(conn, "societies", "refresh_dplace_societies.py")
+
+        n = conn.execute(f"SELECT count(*) FROM {VIEWS[0]}").fetchone()[0]
+        for facet, entries, total in conn.execute(
+            f"SELECT facet, count(*), sum(n) FROM {VIEWS[1]} GROUP BY facet ORDER BY facet"
+        ).fetchall():
+            print(f"  {facet:12s} {entries:4d} entries, {total} societies")
+
+    print(f"Done in {time.perf_counter() - t0:.1f}s: {n} society rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Local stub servers for the elevation providers in app/db/elevation.py.
+
+Serves an OpenTopoData-like and an Open-Meteo-like endpoint on localhost with
+configurable latency and failure rate, so the hedged fallback and circuit
+breakers can be exercised without touching the real APIs.
+
+Serve only (point a running API at them):
+
+    python scripts/stub_elevation_servers.py --serve
+    EDOP_OPENTOPODATA_URL=http://127.0.0.1:8771/v1/mapzen \
+    EDOP_OPEN_METEO_URL=http://127.0.0.1:8772/v1/elevation \
+    EDOP_ELEV_HEDGE_MS=300 uvicorn app.main:app
+
+Or run a self-contained demo: slow primary, fast secondary, N lookups in
+sequential and hedged mode, then the provider stats (breaker + histograms):
+
+    python scripts/stub_elevation_servers.py --primary-delay-ms 1500 --n 20
+    python scripts/stub_elevation_servers.py --primary-fail-rate 1 --n 20
+
+Usage:
+    python scripts/stub_elevation_servers.py [--serve] [--primary-delay-ms MS]
+        [--secondary-delay-ms MS] [--primary-fail-rate P] [--hedge-ms MS] [--n N]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+PRIMARY_PORT = 8771
+SECONDARY_PORT = 8772
+
+
+def _fake_elevation(lat: float, lon: float) -> float:
+    # Deterministic, so hedged and sequential runs return comparable values
+    return round(500 + 400 * ((lat * 7 + lon * 3) % 1.0), 1)
+
+
+def make_handler(kind: str, delay_ms: float, fail_rate: float):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(delay_ms / 1000.0)
+            if random.random() < fail_rate:
+                self.send_response(503)
+                self.end_headers()
+                return
+
+            qs = parse_qs(urlparse(self.path).query)
+            if kind == "opentopodata":
+                points = [tuple(map(float, p.split(","))) for p in qs["locations"][0].split("|")]
+                body = {
+                    "status": "OK",
+                    "results": [{"elevation": _fake_elevation(lat, lon)} for lat, lon in points],
+                }
+            else:
+                lats = [float(v) for v in qs["latitude"][0].split(",")]
+                lons = [float(v) for v in qs["longitude"][0].split(",")]
+                body = {"elevation": [_fake_elevation(lat, lon) for lat, lon in zip(lats, lons)]}
+
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            try:
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                # Client gave up (e.g. a cancelled hedged request)
+                pass
+
+    return Handler
+
+
+def start_servers(args) -> None:
+    for kind, port, delay, fail in (
+        ("opentopodata", PRIMARY_PORT, args.primary_delay_ms, args.primary_fail_rate),
+        ("open-meteo", SECONDARY_PORT, args.secondary_delay_ms, args.secondary_fail_rate),
+    ):
+        server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(kind, delay, fail))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"{kind:12s} stub on http://127.0.0.1:{port} (delay {delay:.0f} ms, fail rate {fail:.2f})")
+
+
+def run_demo(args) -> None:
+    # Settings are read at import, so configure the environment first
+    os.environ["EDOP_ELEV_PROVIDERS"] = "opentopodata,open-meteo"
+    os.environ["EDOP_OPENTOPODATA_URL"] = f"http://127.0.0.1:{PRIMARY_PORT}/v1/mapzen"
+    os.environ["EDOP_OPEN_METEO_URL"] = f"http://127.0.0.1:{SECONDARY_PORT}/v1/elevation"
+    os.environ["EDOP_ELEV_CACHE_MAX_ITEMS"] = "1"
+    sys.path.insert(0, str(REPO_ROOT))
+
+    from app.db import elevation
+    from app.settings import settings
+
+    for hedge_ms in (0.0, args.hedge_ms):
+        settings.ELEV_HEDGE_MS = hedge_ms
+        latencies, sources = [], {}
+        for i in range(args.n):
+            elevation._ELEV_CACHE.clear()
+            t0 = time.perf_counter()
+            val = elevation.get_elevation_point(16.0 + i * 0.01, -3.0)
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+            src = val.get("elev_source") or "error"
+            sources[src] = sources.get(src, 0) + 1
+        latencies.sort()
+        mode = f"hedged {hedge_ms:.0f}ms" if hedge_ms else "sequential"
+        print(f"{mode:14s} p50={latencies[len(latencies) // 2]:.0f}ms max={latencies[-1]:.0f}ms sources={sources}")
+
+    print(json.dumps(elevation.stats(), indent=2))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--serve", action="store_true", help="Run the stubs until interrupted")
+    ap.add_argument("--primary-delay-ms", type=float, default=1500.0)
+    ap.add_argument("--secondary-delay-ms", type=float, default=50.0)
+    ap.add_argument("--primary-fail-rate", type=float, default=0.0)
+    ap.add_argument("--secondary-fail-rate", type=float, default=0.0)
+    ap.add_argument("--hedge-ms", type=float, default=300.0, help="Hedge budget for the demo's second pass")
+    ap.add_argument("--n", type=int, default=20, help="Lookups per mode in the demo")
+    args = ap.parse_args()
+
+    start_servers(args)
+    if args.serve:
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            return
+    run_demo(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Local stub of the WHG endpoints used by app/api/whg.py.
+
+Serves /suggest/entity, /entity/<id>/api and /reconcile (query + extend) on
+localhost with HTTP/1.1 keep-alive and configurable latency, and counts
+requests and TCP connections, so the client's connection reuse, response
+cache and request coalescing can be checked without touching WHG.
+
+Serve only (point a running API at it):
+
+    python scripts/stub_whg_server.py --serve
+    EDOP_WHG_BASE_URL=http://127.0.0.1:8773 WHG_API_TOKEN=stub uvicorn app.main:app
+
+Or run a self-contained demo against the sync /resolve and /whg-reconcile
+handlers: distinct names sequentially (connection reuse), the same names again
+(cache), many concurrent identical lookups (coalescing), then reconcile queries
+with overlapping candidates (per-place extend cache, Server-Timing):
+
+    python scripts/stub_whg_server.py --delay-ms 200 --n 20 --concurrency 16
+
+Usage:
+    python scripts/stub_whg_server.py [--serve] [--delay-ms MS] [--n N] [--concurrency C]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlparse
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+PORT = 8773
+
+COUNTS = {"requests": 0, "connections": 0}
+_COUNT_LOCK = threading.Lock()
+
+
+def _count(name: str) -> None:
+    with _COUNT_LOCK:
+        COUNTS[name] += 1
+
+
+def _place_id(name: str) -> str:
+    # Deterministic, so repeated lookups of a name return the same place
+    return f"place:{sum(ord(c) for c in name.casefold()) * 7919 % 10_000_000}"
+
+
+def _lonlat(place_id: str):
+    n = int(place_id.split(":")[1])
+    return round((n % 3600) / 10 - 180, 4), round((n % 1700) / 10 - 85, 4)
+
+
+def make_handler(delay_ms: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def setup(self):
+            super().setup()
+            _count("connections")
+
+        def _send(self, body) -> None:
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            try:
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def do_GET(self):
+            _count("requests")
+            time.sleep(delay_ms / 1000.0)
+            url = urlparse(self.path)
+            if url.path == "/suggest/entity":
+                prefix = parse_qs(url.query)["prefix"][0]
+                pid = _place_id(prefix)
+                self._send({"result": [{
+                    "id": pid, "name": prefix.title(), "score": 100,
+                    "description": "Country: XX", "alt_names": [],
+                }]})
+            elif url.path.startswith("/entity/") and url.path.endswith("/api"):
+                pid = unquote(url.path[len("/entity/"):-len("/api")])
+                lon, lat = _lonlat(pid)
+                self._send({
+                    "title": f"Stub {pid}",
+                    "geoms": [{"geojson": {"type": "Point", "coordinates": [lon, lat]}}],
+                    "ccodes": ["XX"], "dataset": "stub", "dataset_id": 1,
+                })
+            else:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+        def do_POST(self):
+            _count("requests")
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            time.sleep(delay_ms / 1000.0)
+            if "extend" in payload:
+                rows = {}
+                for pid in payload["extend"]["ids"]:
+                    lon, lat = _lonlat(pid)
+                    rows[pid] = {
+                        "whg:geometry_wkt": [{"str": f"POINT ({lon} {lat})"}],
+                        "whg:countries_objects": [{"str": json.dumps([{"ccode": "XX"}])}],
+                        "whg:types_objects": [{"str": "[]"}],
+                        "whg:names_summary": [{"str": pid}],
+                    }
+                self._send({"rows": rows})
+            else:
+                out = {}
+                for qid, q in payload.get("queries", {}).items():
+                    # Candidates depend on the first 4 letters only, so similar
+                    # queries return overlapping place IDs (as WHG's fuzzy mode does)
+                    stem = q["query"].casefold()[:4]
+                    out[qid] = {"result": [{
+                        "id": _place_id(f"{stem}{i}"), "name": f"{q['query'].title()} {i}", "score": 90 - i,
+                        "match": False, "alt_names": [], "description": "stub",
+                    } for i in range(q.get("size", 10))]}
+                self._send(out)
+
+    return Handler
+
+
+def start_server(args) -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", PORT), make_handler(args.delay_ms))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"WHG stub on http://127.0.0.1:{PORT} (delay {args.delay_ms:.0f} ms)")
+
+
+def run_demo(args) -> None:
+    # Settings are read at import, so configure the environment first
+    os.environ["EDOP_WHG_BASE_URL"] = f"http://127.0.0.1:{PORT}"
+    os.environ.setdefault("WHG_API_TOKEN", "stub")
+    sys.path.insert(0, str(REPO_ROOT))
+
+    from fastapi import Response
+
+    from app.api import routes, whg
+
+    def phase(label, fn, calls, workers=1):
+        before = dict(COUNTS)
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(fn, calls))
+        ms = (time.perf_counter() - t0) * 1000.0
+        print(f"{label:34s} {len(calls):3d} calls {ms:8.0f} ms  "
+              f"upstream requests {COUNTS['requests'] - before['requests']:3d}  "
+              f"new connections {COUNTS['connections'] - before['connections']:2d}")
+
+    names = [f"Town {i}" for i in range(args.n)]
+    phase("resolve, distinct names", routes.resolve, names)
+    phase("resolve, same names again", routes.resolve, names)
+    phase("resolve, same names, other case", routes.resolve, [n.upper() for n in names])
+    phase(f"resolve, {args.concurrency} concurrent identical", routes.resolve,
+          ["Timbuktu"] * args.concurrency, workers=args.concurrency)
+    phase(f"reconcile, {args.concurrency} concurrent identical",
+          lambda q: routes.whg_reconcile(Response(), q), ["Khiva"] * args.concurrency, workers=args.concurrency)
+
+    # Overlapping candidates: extend only fetches place IDs not seen before
+    for q in ("Samarkand", "Samarra", "Samara", "Bukhara"):
+        response = Response()
+        routes.whg_reconcile(response, q)
+        print(f"reconcile {q!r:12s} Server-Timing: {response.headers['Server-Timing']}")
+
+    print(json.dumps(whg.stats(), indent=2))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--serve", action="store_true", help="Run the stub until interrupted")
+    ap.add_argument("--delay-ms", type=float, default=100.0, help="Latency added to every response")
+    ap.add_argument("--n", type=int, default=20, help="Distinct names in the demo")
+    ap.add_argument("--concurrency", type=int, default=16, help="Concurrent identical lookups in the demo")
+    args = ap.parse_args()
+
+    start_server(args)
+    if args.serve:
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            return
+    run_demo(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -30,6 +30,8 @@ if not api_key:
 import anthropic
 import psycopg
 
+from edop_app import bump_data_version
+
 # Database connection
 DB_PARAMS = {
     "host": os.getenv("PGHOST", "localhost"),
@@ -190,6 +192,9 @@ def main():
         # Rate limiting - be gentle
         time.sleep(0.3)
 
+    if success_count and not args.dry_run:
+        bump_data_version(conn, "eco_wikitext", "summarize_ecoregion_text.py")
+        conn.commit()
     conn.close()
 
     print(f"\n{'='*50}")
@@ -27,6 +27,8 @@ from pathlib import Path
 import psycopg
 from dotenv import load_dotenv
 
+from edop_app import bump_data_version
+
 # ---------------------------------------------------------------------------
 # Configuration
 # ---------------------------------------------------------------------------
@@ -289,6 +291,11 @@ def main():
         print("\n7. Populating basin_ids...")
         populate_basin_ids(conn)
 
+        # City locations feed /api/whc-cities; basin_id the per-cluster city counts
+        bump_data_version(conn, "whc", "update_wh_cities_geom.py")
+        bump_data_version(conn, "basin_clusters", "update_wh_cities_geom.py")
+        conn.commit()
+
         # Print summary
         print_summary(conn)
 
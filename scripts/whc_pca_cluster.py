@@ -25,6 +25,8 @@ from sklearn.cluster import KMeans
 from sklearn.decomposition import PCA
 from sklearn.preprocessing import StandardScaler
 
+from edop_app import bump_data_version
+
 # Configuration
 N_CLUSTERS = 10  # More clusters for 254 cities
 N_PCA_COMPONENTS_FOR_CLUSTERING = 20  # Use more components with larger dataset
@@ -349,6 +351,8 @@ def main():
         print("   - Cluster assignments...")
         persist_clusters(conn, city_ids, labels, dist_to_centroid)
 
+        # /api/whc-cities serves env_cluster from whc_clusters
+        bump_data_version(conn, "whc", "whc_pca_cluster.py")
         conn.commit()
         print("   Committed.")
 
@@ -0,0 +1,31 @@
+-- Data-version registry for HTTP caching
+-- One row per table family served by the API. Batch scripts bump a family's
+-- version after they rewrite its tables (app/db/data_versions.bump, or
+-- scripts/bump_data_version.py by hand); the API polls this table and derives
+-- ETag / Last-Modified from it (app/api/http_cache.py), so conditional
+-- requests are answered with 304 without a query.
+--
+-- Families:
+--   eco              gaz."Realm2023", "Subrealm2023", "Bioregions2023",
+--                    "Ecoregions2017", gaz.bioregion_meta
+--   eco_wikitext     public.eco_wikitext
+--   whc              gaz.wh_cities, whc_clusters
+--   basin_clusters   basin08.cluster_id
+--   societies        gaz.mv_dplace_societies, gaz.mv_dplace_society_facets
+--
+-- Safe to re-run: existing versions are kept.
+
+CREATE TABLE IF NOT EXISTS public.edop_data_versions (
+  family      text PRIMARY KEY,
+  version     bigint NOT NULL DEFAULT 1,
+  updated_at  timestamptz NOT NULL DEFAULT now(),
+  note        text
+);
+
+INSERT INTO public.edop_data_versions (family, note)
+VALUES ('eco', 'initial'),
+       ('eco_wikitext', 'initial'),
+       ('whc', 'initial'),
+       ('basin_clusters', 'initial'),
+       ('societies', 'initial')
+ON CONFLICT (family) DO NOTHING;
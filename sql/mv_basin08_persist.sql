@@ -0,0 +1,41 @@
+-- EDOP Persistence Matrix, materialized
+-- Precomputed copy of v_basin08_persist (sql/persistence_matrix.sql) for the
+-- signature lookups in app/db/signature.py: the lookup-table joins and the
+-- pnv_shares JSON are built once here instead of per request, and area_km2
+-- replaces ST_Area(geom::geography) in the smallest-basin ORDER BY.
+-- /api/signature?geometry=simplified|bbox is served from the precomputed
+-- geojson_s* / bbox columns (tolerances: SIMPLIFY_TOLERANCES in signature.py).
+--
+-- Refresh after basin08 or any lu_* table changes:
+--   python scripts/refresh_basin08_persist.py
+-- Recreate (run this file again) after the column list of v_basin08_persist changes.
+
+DROP MATERIALIZED VIEW IF EXISTS public.mv_basin08_persist;
+
+CREATE MATERIALIZED VIEW public.mv_basin08_persist AS
+SELECT
+  v.*,
+  ST_Area(v.geom::geography) / 1e6 AS area_km2,
+  ARRAY[ST_XMin(v.geom), ST_YMin(v.geom), ST_XMax(v.geom), ST_YMax(v.geom)] AS bbox,
+  ST_AsGeoJSON(ST_SimplifyPreserveTopology(v.geom, 0.0005), 6) AS geojson_s0005,
+  ST_AsGeoJSON(ST_SimplifyPreserveTopology(v.geom, 0.002), 6) AS geojson_s002,
+  ST_AsGeoJSON(ST_SimplifyPreserveTopology(v.geom, 0.01), 6) AS geojson_s01
+FROM public.v_basin08_persist v
+WITH DATA;
+
+-- Unique index: primary-key lookups, and required for REFRESH ... CONCURRENTLY
+CREATE UNIQUE INDEX mv_basin08_persist_id_idx
+  ON public.mv_basin08_persist (id);
+
+CREATE INDEX mv_basin08_persist_geom_gist
+  ON public.mv_basin08_persist USING GIST (geom);
+
+ANALYZE public.mv_basin08_persist;
+
+-- test: Timbuktu
+SELECT id, zone_name, area_km2, bbox,
+  length(geojson_s0005) AS s0005_bytes, length(geojson_s002) AS s002_bytes, length(geojson_s01) AS s01_bytes
+FROM public.mv_basin08_persist
+WHERE ST_Covers(geom, ST_SetSRID(ST_MakePoint(-3.00777252, 16.76618535), 4326))
+ORDER BY area_km2 ASC
+LIMIT 1;
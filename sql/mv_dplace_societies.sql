@@ -0,0 +1,100 @@
+-- D-PLACE society summary + legend facets, materialized
+-- Precomputed rows and legend counts for /api/societies (app/db/societies.py),
+-- so the endpoint reads two small views instead of joining dplace_societies,
+-- dplace_data/dplace_codes (EA042 subsistence, EA034 religion), the 2017/2023
+-- eco/bio/subrealm/realm layers and basin08 per request. The basin join
+-- compares hybas_id = basin_id directly (the old hybas_id::bigint cast kept
+-- the basin08 hybas_id index from being used).
+--
+-- Refresh after any gaz.dplace_* table, the eco layers or basin08 clusters change:
+--   python scripts/refresh_dplace_societies.py
+-- Recreate (run this file again, or --create) after the column list changes.
+
+DROP MATERIALIZED VIEW IF EXISTS gaz.mv_dplace_society_facets;
+DROP MATERIALIZED VIEW IF EXISTS gaz.mv_dplace_societies;
+
+CREATE MATERIALIZED VIEW gaz.mv_dplace_societies AS
+SELECT
+  row_number() OVER (ORDER BY q.bioregion_id, q.name, q.id, q.subsistence, q.religion) AS ord,
+  q.*
+FROM (
+  SELECT s.id, s.name, s.region, s.bioregion_id,
+         m.title AS bioregion_name,
+         ST_X(s.geom) AS lon, ST_Y(s.geom) AS lat,
+         c.name AS subsistence,
+         s.eco_id, e.eco_name,
+         -- Parenthetical content stripped from realm names
+         nullif(trim(split_part(r.realm, '(', 1)), '') AS realm,
+         ba.cluster_id,
+         rel.name AS religion
+  FROM gaz.dplace_societies s
+  LEFT JOIN gaz.bioregion_meta m ON m.bioregion_id = s.bioregion_id
+  LEFT JOIN gaz.dplace_data d ON d.soc_id = s.id AND d.var_id = 'EA042'
+  LEFT JOIN gaz.dplace_codes c ON c.id = d.code_id
+      AND c.name NOT IN ('Missing data', '', 'Missing for at least 1 activity', 'Two or more sources')
+  LEFT JOIN gaz.dplace_data rd ON rd.soc_id = s.id AND rd.var_id = 'EA034'
+  LEFT JOIN gaz.dplace_codes rel ON rel.id = rd.code_id
+      AND rel.name != 'Missing data'
+  LEFT JOIN gaz."Ecoregions2017" e ON e.eco_id = s.eco_id
+  LEFT JOIN gaz."Bioregions2023" b ON b.bioregions = s.bioregion_id
+  LEFT JOIN gaz."Subrealm2023" sr ON sr.subrealmid = b.subrealm_id
+  LEFT JOIN gaz."Realm2023" r ON r.biogeorelm = sr.biogeorelm
+  LEFT JOIN basin08 ba ON ba.hybas_id = s.basin_id
+) q
+WITH DATA;
+
+-- Unique index: required for REFRESH ... CONCURRENTLY; ord is the response order
+CREATE UNIQUE INDEX mv_dplace_societies_ord_idx
+  ON gaz.mv_dplace_societies (ord);
+
+-- Legend facets, one row per entry, ordered within each facet by ord:
+--   bioregion:   distinct bioregions by id (n = societies)
+--   subsistence: EA042 categories by count, descending
+--   religion:    EA034 categories in conceptual order (absent -> moralizing)
+CREATE MATERIALIZED VIEW gaz.mv_dplace_society_facets AS
+WITH bio AS (
+  SELECT bioregion_id,
+         -- Name from the first society row in the bioregion
+         (array_agg(bioregion_name ORDER BY ord))[1] AS name,
+         count(*) AS n
+  FROM gaz.mv_dplace_societies
+  WHERE bioregion_id IS NOT NULL AND bioregion_id::text <> ''
+  GROUP BY bioregion_id
+),
+sub AS (
+  SELECT subsistence, count(*) AS n, min(ord) AS first_ord
+  FROM gaz.mv_dplace_societies
+  WHERE subsistence IS NOT NULL AND subsistence <> ''
+  GROUP BY subsistence
+),
+rel AS (
+  SELECT o.name, o.pos, count(*) AS n
+  FROM gaz.mv_dplace_societies soc
+  JOIN (VALUES ('Absent', 1), ('Otiose', 2), ('Active, but not supporting morality', 3),
+               ('Active, supporting morality', 4)) AS o(name, pos)
+    ON o.name = soc.religion
+  GROUP BY o.name, o.pos
+)
+-- key is jsonb so the bioregion id keeps its column type in the response
+SELECT 'bioregion'::text AS facet, to_jsonb(bioregion_id) AS key, name, n,
+       row_number() OVER (ORDER BY bioregion_id) AS ord
+FROM bio
+UNION ALL
+-- Ties keep first-appearance order, as the Python legend did
+SELECT 'subsistence', to_jsonb(subsistence), subsistence, n,
+       row_number() OVER (ORDER BY n DESC, first_ord)
+FROM sub
+UNION ALL
+SELECT 'religion', to_jsonb(name), name, n,
+       row_number() OVER (ORDER BY pos)
+FROM rel
+WITH DATA;
+
+CREATE UNIQUE INDEX mv_dplace_society_facets_idx
+  ON gaz.mv_dplace_society_facets (facet, ord);
+
+ANALYZE gaz.mv_dplace_societies;
+ANALYZE gaz.mv_dplace_society_facets;
+
+-- test: legend
+SELECT facet, ord, key, name, n FROM gaz.mv_dplace_society_facets ORDER BY facet, ord;
@@ -0,0 +1,56 @@
+-- Representative gazetteer place per basin, materialized
+-- One gaz.edop_gaz place per basin08 basin for /api/gaz-similar (app/api/routes.py),
+-- so similar places are a primary-key join on the ranked basins instead of a
+-- ROW_NUMBER() OVER (PARTITION BY basin_id ORDER BY random()) over every place
+-- in them, and results are reproducible.
+--
+-- Stable choice rule, first wins:
+--   1. source priority: wh_cities, dkatlas, pleiades, then WHG imports
+--   2. places with country codes
+--   3. lowest edop_gaz.id
+-- n_places is kept so clients can show "1 of N places in this basin".
+--
+-- Refresh after gaz.edop_gaz or its basin_id assignments change:
+--   REFRESH MATERIALIZED VIEW CONCURRENTLY gaz.mv_gaz_basin_rep;
+-- Recreate (run this file again) after the choice rule changes.
+
+DROP MATERIALIZED VIEW IF EXISTS gaz.mv_gaz_basin_rep;
+
+CREATE MATERIALIZED VIEW gaz.mv_gaz_basin_rep AS
+SELECT DISTINCT ON (g.basin_id)
+  g.basin_id,
+  g.id AS gaz_id,
+  g.title,
+  g.source,
+  g.ccodes,
+  g.lon,
+  g.lat,
+  b.cluster_id,
+  count(*) OVER (PARTITION BY g.basin_id) AS n_places
+FROM gaz.edop_gaz g
+JOIN public.basin08 b ON b.id = g.basin_id
+WHERE g.basin_id IS NOT NULL
+  AND g.lon IS NOT NULL
+ORDER BY
+  g.basin_id,
+  CASE g.source
+    WHEN 'wh_cities' THEN 0
+    WHEN 'dkatlas' THEN 1
+    WHEN 'pleiades' THEN 2
+    ELSE 3
+  END,
+  (g.ccodes IS NULL),
+  g.id
+WITH DATA;
+
+-- Unique index: the basin_id join in gaz_similar, and required for REFRESH ... CONCURRENTLY
+CREATE UNIQUE INDEX mv_gaz_basin_rep_basin_idx
+  ON gaz.mv_gaz_basin_rep (basin_id);
+
+ANALYZE gaz.mv_gaz_basin_rep;
+
+-- test: basins with the most places
+SELECT basin_id, gaz_id, title, source, n_places
+FROM gaz.mv_gaz_basin_rep
+ORDER BY n_places DESC
+LIMIT 10;